@@ -1,47 +1,227 @@
 import streamlit as st
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
+import os
 import re
+import time
+
+from inference_backends import INFERENCE_BACKEND, create_backend
+from inference_policy import get_execution_policy
+from model_snapshot import MODEL_SNAPSHOT_PATH, peak_rss_mb
+from profiling import get_profiler
+
+# 기분별 기본 감정 키워드 (대화가 없거나 키워드 생성에 실패했을 때)
+DEFAULT_MOOD_KEYWORDS = {
+    "좋음": ["#기쁨", "#활기", "#만족", "#희망", "#평온"],
+    "보통": ["#평범", "#일상", "#차분", "#보통", "#안정"],
+    "나쁨": ["#우울", "#피곤", "#스트레스", "#불안", "#힘듦"]
+}
+DEFAULT_EXTRA_KEYWORDS = ["#감정나눔", "#일상", "#생각", "#마음", "#기분"]
+
+# ✅ 추측 디코딩(speculative decoding) 설정
+# 작은 초안(draft) 모델이 토큰을 미리 제안하고 본 모델이 한 번에 검증함
+# MINDTALK_DRAFT_MODEL 이 비어 있으면 사용하지 않음
+DRAFT_MODEL_NAME = os.environ.get("MINDTALK_DRAFT_MODEL", "")
+# 추측 디코딩을 적용할 호출 종류 (chat, summary)
+SPECULATIVE_CALL_TYPES = {
+    call_type.strip()
+    for call_type in os.environ.get("MINDTALK_SPECULATIVE_CALL_TYPES", "chat,summary").split(",")
+    if call_type.strip()
+}
+
+# 일기 임베딩을 한 번에 계산하는 문장 수
+EMBEDDING_BATCH_SIZE = 16
+
+# ✅ 조기 종료(early stopping) 설정
+# 후처리에서 어차피 버릴 부분은 생성하지 않도록 호출 종류별로 멈출 지점을 정함
+# (MINDTALK_EARLY_STOP=0 이면 max_new_tokens까지 생성)
+EARLY_STOP_ENABLED = os.environ.get("MINDTALK_EARLY_STOP", "1") != "0"
+# 모델이 다음 차례 대화까지 이어 쓰기 시작했다는 신호
+ROLE_MARKERS = ["사용자:"]
+STOP_POLICIES = {
+    # 채팅: 후처리가 남기는 서로 다른 3문장이 끝나면 멈춤
+    "chat": {"stop_sequences": ROLE_MARKERS, "max_sentences": 3},
+    # 요약: 액션아이템 3줄이 끝나면 멈춤 (파싱에서 3개까지만 사용)
+    "summary": {"stop_sequences": ROLE_MARKERS, "list_header": "아이템", "max_list_items": 3},
+    # 누적 요약: 첫 문단만 쓰므로 빈 줄이 나오면 멈춤
+    "memory": {"stop_sequences": ROLE_MARKERS + ["\n\n"]}
+}
+
+def _trim_at_stop_sequences(text: str, stop_sequences: List[str]) -> str:
+    """정지 문자열이 처음 나온 곳부터 잘라냄 (앞쪽 공백/빈 줄은 무시)"""
+    stripped = text.lstrip()
+    for sequence in stop_sequences:
+        index = stripped.find(sequence)
+        if index >= 0:
+            stripped = stripped[:index]
+    return stripped
+
+def _empty_usage() -> Dict:
+    """생성 1회의 사용량 기록 기본값"""
+    return {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "prefill_ms": 0.0,
+        "decode_tokens_per_sec": 0.0,
+        "queue_wait_ms": 0.0,
+        "total_ms": 0.0,
+        "speculative": False,
+        "stop_reason": None,
+        "tokens_budget_unused": 0
+    }
+
+class PromptBuilder:
+    """토큰 예산 안에서 채팅 프롬프트를 조립하는 클래스
+    
+    시스템 프롬프트와 현재 메시지(+ "{ai_name}:" 응답 신호)는 항상 넣고,
+    남은 예산을 대화 기록과 이전 대화 참고에 최신 순으로 나눠 준다.
+    예산이 모자라면 가장 오래된 내용부터 줄이거나 뺀다.
+    """
+    
+    # 이전 대화 참고에 먼저 배정하는 비율 (남으면 대화 기록이 가져감)
+    CONTEXT_SHARE = 0.25
+    # 이보다 적게 남으면 오래된 메시지를 줄여서 넣지 않고 뺌
+    MIN_CONDENSED_TOKENS = 16
+    # 조각을 이어 붙일 때 생기는 토큰 수 차이 여유분
+    SAFETY_MARGIN = 8
+    
+    def __init__(self, count_tokens, truncate_tokens, budget: int):
+        self.count_tokens = count_tokens
+        self.truncate_tokens = truncate_tokens
+        self.budget = budget
+    
+    def _fill(self, items: List[str], budget: int, separator_tokens: int = 1):
+        """최신 항목부터 예산 안에 들어가는 만큼 선택 (넘치는 첫 항목은 줄여서 넣음)"""
+        selected = []
+        used = 0
+        condensed = 0
+        for item in reversed(items):
+            cost = self.count_tokens(item) + separator_tokens
+            if used + cost <= budget:
+                selected.append(item)
+                used += cost
+                continue
+            remaining = budget - used - separator_tokens
+            if remaining >= self.MIN_CONDENSED_TOKENS:
+                selected.append(self.truncate_tokens(item, remaining))
+                used = budget
+                condensed += 1
+            break
+        selected.reverse()
+        return selected, used, condensed
+    
+    def build(self, render_system, context_items: List[str], history_lines: List[str], current_turn: str) -> Dict:
+        """프롬프트 조립
+        
+        render_system(context_text)는 이전 대화 참고를 넣은 시스템 프롬프트를 돌려준다.
+        """
+        system_tokens = self.count_tokens(render_system(""))
+        current_tokens = self.count_tokens(current_turn)
+        available = self.budget - self.SAFETY_MARGIN - system_tokens
+        
+        # 현재 메시지가 예산을 넘을 정도로 길면 앞부분을 줄임 (질문은 보통 끝에 있음)
+        if current_tokens > available:
+            current_turn = self.truncate_tokens(current_turn, max(available, 1), keep="end")
+            current_tokens = self.count_tokens(current_turn)
+        available = max(0, available - current_tokens)
+        
+        # 이전 대화 참고 → 대화 기록 순서로 예산 배정 (남는 예산은 서로 넘겨줌)
+        context_header_tokens = self.count_tokens("이전 대화 참고:") + 4 if context_items else 0
+        context_budget = min(
+            sum(self.count_tokens(item) + 1 for item in context_items) + context_header_tokens,
+            int(available * self.CONTEXT_SHARE)
+        )
+        history, history_used, history_condensed = self._fill(history_lines, available - context_budget)
+        context, context_used, _ = self._fill(
+            context_items, available - history_used - context_header_tokens
+        ) if context_items else ([], 0, 0)
+        
+        context_text = ""
+        if context:
+            context_text = "\n\n이전 대화 참고:\n" + "\n".join(context) + "\n\n"
+        
+        conversation_text = "".join(line + "\n" for line in history)
+        prompt = f"""{render_system(context_text)}
+
+{conversation_text}{current_turn}"""
+        
+        return {
+            "prompt": prompt,
+            "stats": {
+                "budget": self.budget,
+                "system_tokens": system_tokens,
+                "current_tokens": current_tokens,
+                "history_tokens": history_used,
+                "context_tokens": context_used + (context_header_tokens if context else 0),
+                "history_used": len(history),
+                "history_dropped": len(history_lines) - len(history),
+                "context_used": len(context),
+                "context_dropped": len(context_items) - len(context),
+                "condensed": history_condensed
+            }
+        }
 
 class AIModelManager:
     """허깅페이스 skt/A.X-4.0-Light 모델 관리 클래스"""
     
-    def __init__(self):
+    def __init__(self, backend_name: Optional[str] = None):
         self.model_name = "skt/A.X-4.0-Light"
-        self.tokenizer = None
-        self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.max_length = 2048
+        self._token_count_cache = {}
+        self.backend_name = backend_name or INFERENCE_BACKEND
+        self.load_stats = {}
+        
+        backend_options = {}
+        if self.backend_name == "transformers":
+            backend_options = {
+                "draft_model_name": DRAFT_MODEL_NAME,
+                "speculative_call_types": SPECULATIVE_CALL_TYPES,
+                "snapshot_path": MODEL_SNAPSHOT_PATH
+            }
+        elif self.backend_name == "onnxruntime":
+            backend_options = {"snapshot_path": MODEL_SNAPSHOT_PATH}
+        self.backend = create_backend(self.backend_name, self.model_name, self.max_length, **backend_options)
+        # 동시 생성 수와 스레드 수는 프로세스 전체에서 하나의 정책을 공유
+        self.execution_policy = get_execution_policy()
         self._load_model()
     
+    # 기존 코드/벤치마크 호환용 속성 (백엔드에 없으면 None)
+    @property
+    def device(self) -> str:
+        return self.backend.device
+    
+    @property
+    def model(self):
+        return getattr(self.backend, "model", None)
+    
+    @property
+    def tokenizer(self):
+        return getattr(self.backend, "tokenizer", None)
+    
+    @property
+    def draft_model(self):
+        return getattr(self.backend, "draft_model", None)
+    
+    @property
+    def draft_model_name(self) -> str:
+        return getattr(self.backend, "draft_model_name", "")
+    
     def _load_model(self):
         """모델과 토크나이저 로드"""
         try:
-            print(f"🤖 AI 모델 로딩 중... ({self.device})")
-            
-            # 토크나이저 로드
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.model_name,
-                trust_remote_code=True
-            )
-            
-            # 모델 로드
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None,
-                trust_remote_code=True
-            )
+            print(f"🤖 AI 모델 로딩 중... ({self.backend_name}, {self.device})")
+            started = time.perf_counter()
             
-            if self.device == "cpu":
-                self.model = self.model.to(self.device)
+            self.backend.configure_threads(self.execution_policy)
+            self.backend.load()
             
-            # 패딩 토큰 설정
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
-            
-            print("✅ AI 모델 로딩 완료!")
+            # 시작 시간/메모리 확인용 (peak RSS는 프로세스 시작 이후 최대값)
+            self.load_stats = {
+                "source": MODEL_SNAPSHOT_PATH or self.model_name,
+                "load_seconds": round(time.perf_counter() - started, 1),
+                "peak_rss_mb": peak_rss_mb()
+            }
+            print(f"✅ AI 모델 로딩 완료! ({self.load_stats['load_seconds']}초, 최대 메모리 {self.load_stats['peak_rss_mb']:,.0f}MB)")
             
         except Exception as e:
             print(f"❌ AI 모델 로딩 실패: {e}")
@@ -49,46 +229,139 @@ class AIModelManager:
             st.info("💡 인터넷 연결을 확인하거나, 나중에 다시 시도해주세요.")
             raise e
     
-    def generate_response(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7) -> str:
+    def generate_response(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7,
+                          post_process: bool = True, call_type: str = "chat") -> str:
         """텍스트 생성"""
+        return self.generate_with_usage(prompt, max_new_tokens, temperature, post_process, call_type)["text"]
+    
+    def generate_with_usage(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7,
+                            post_process: bool = True, call_type: str = "chat",
+                            speculative: Optional[bool] = None) -> Dict:
+        """텍스트 생성 + 토크나이저 기준 토큰 수와 지연 시간 측정"""
+        usage = _empty_usage()
         try:
-            if not self.model or not self.tokenizer:
-                return "AI 모델이 로드되지 않았습니다."
-            
-            # 입력 토큰화
-            inputs = self.tokenizer.encode(prompt, return_tensors="pt", max_length=self.max_length-max_new_tokens, truncation=True)
-            inputs = inputs.to(self.device)
-            
-            # 생성 설정
-            generation_config = {
-                "max_new_tokens": max_new_tokens,
-                "temperature": temperature,
-                "do_sample": True,
-                "top_p": 0.9,
-                "pad_token_id": self.tokenizer.eos_token_id,
-                "eos_token_id": self.tokenizer.eos_token_id,
-                "repetition_penalty": 1.1
-            }
-            
-            # 텍스트 생성
-            with torch.no_grad():
-                outputs = self.model.generate(inputs, **generation_config)
-            
-            # 디코딩 (입력 부분 제외)
-            generated_text = self.tokenizer.decode(outputs[0][inputs.shape[1]:], skip_special_tokens=True)
-            
-            # 후처리
-            generated_text = self._post_process_response(generated_text)
-            
-            return generated_text
+            if not self.backend.is_loaded():
+                return {"text": "AI 모델이 로드되지 않았습니다.", "usage": usage, "success": False}
+            
+            started = time.perf_counter()
+            profiler = get_profiler()
+            stop_policy = STOP_POLICIES.get(call_type) if EARLY_STOP_ENABLED else None
+            
+            # 텍스트 생성 (동시 생성 수 제한 안에서 실행)
+            with self.execution_policy.slot() as queue_wait_ms:
+                result = self.backend.generate(prompt, max_new_tokens, temperature, call_type, speculative,
+                                               stop_policy=stop_policy)
+            generated_text = result["text"]
+            
+            with profiler.stage(call_type, "post_process"):
+                # 정지 문자열(다음 차례 "사용자:" 등)은 결과에 남기지 않음
+                if stop_policy:
+                    generated_text = _trim_at_stop_sequences(generated_text, stop_policy.get("stop_sequences", []))
+                
+                # 후처리
+                if post_process:
+                    generated_text = self._post_process_response(generated_text)
+                else:
+                    generated_text = generated_text.strip()
+            
+            # 사용량 계산 (프리필 = 첫 토큰이 나올 때까지, 디코드 = 이후 토큰들)
+            prompt_tokens = result["prompt_tokens"]
+            completion_tokens = result["completion_tokens"]
+            decode_seconds = result["decode_seconds"]
+            
+            usage.update({
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prefill_ms": round(result["prefill_ms"], 1),
+                "decode_tokens_per_sec": round((completion_tokens - 1) / decode_seconds, 2) if completion_tokens > 1 and decode_seconds > 0 else 0.0,
+                "queue_wait_ms": round(queue_wait_ms, 1),
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                "stop_reason": result.get("stop_reason"),
+                # 조기 종료 때 쓰지 않고 남은 생성 한도 (실제로 아낀 토큰이 아니라 그 상한값.
+                # 정책 없이도 EOS로 더 일찍 끝났을 수 있음)
+                "tokens_budget_unused": max(0, max_new_tokens - completion_tokens) if result.get("stop_reason") else 0
+            })
+            usage.update(result.get("extra", {}))
+            
+            # 단계별 측정값 (토큰화/토큰→문자열은 백엔드에서 따로 기록)
+            profiler.record(call_type, "queue_wait", queue_wait_ms)
+            profiler.record(call_type, "prefill", result["prefill_ms"], prompt_tokens)
+            profiler.record(call_type, "decode", decode_seconds * 1000, max(0, completion_tokens - 1))
+            profiler.record(call_type, "total", usage["total_ms"], completion_tokens)
+            
+            return {"text": generated_text, "usage": usage, "success": True}
             
         except Exception as e:
             print(f"텍스트 생성 오류: {e}")
-            return "죄송해요. 답변을 생성하는 중에 문제가 생겼어요."
+            return {"text": "죄송해요. 답변을 생성하는 중에 문제가 생겼어요.", "usage": usage, "success": False}
+    
+    def stream_response(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7,
+                        call_type: str = "chat") -> Iterator[str]:
+        """생성되는 문장을 조각 단위로 받기 (후처리 없음)"""
+        with self.execution_policy.slot():
+            yield from self.backend.stream(prompt, max_new_tokens, temperature, call_type)
+    
+    def embedding_model_id(self) -> str:
+        """저장된 임베딩이 어떤 모델로 계산됐는지 구분하는 이름 (모델이 바뀌면 다시 계산)"""
+        return f"{self.backend_name}:{self.model_name}"
+    
+    def embed_texts(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE):
+        """문장 임베딩을 배치로 계산 (L2 정규화된 float32 배열, 실패하면 None)"""
+        try:
+            if not self.backend.is_loaded() or not texts:
+                return None
+            
+            import numpy as np
+            
+            batches = []
+            for start in range(0, len(texts), batch_size):
+                # 배치마다 자리를 받아서 채팅 생성이 오래 밀리지 않게 함
+                with self.execution_policy.slot():
+                    batches.append(self.backend.embed(texts[start:start + batch_size]))
+            return np.concatenate(batches, axis=0)
+        except NotImplementedError as e:
+            print(f"💡 {e}")
+            return None
+        except Exception as e:
+            print(f"임베딩 계산 오류: {e}")
+            return None
+    
+    def count_tokens(self, text: str) -> int:
+        """토크나이저 기준 토큰 수 (같은 문장은 한 번만 토큰화)"""
+        try:
+            if not self.backend.is_loaded() or not text:
+                return 0
+            count = self._token_count_cache.get(text)
+            if count is None:
+                if len(self._token_count_cache) > 4096:
+                    self._token_count_cache.clear()
+                count = self.backend.count_tokens(text)
+                self._token_count_cache[text] = count
+            return count
+        except Exception:
+            return 0
+    
+    def truncate_to_tokens(self, text: str, max_tokens: int, keep: str = "start") -> str:
+        """토큰 수 기준으로 문장 자르기 (keep="end"면 뒷부분을 남김)"""
+        try:
+            token_ids = self.backend.encode(text)
+            if len(token_ids) <= max_tokens:
+                return text
+            # 말줄임표 자리 1토큰을 남겨둠
+            max_tokens = max(1, max_tokens - 1)
+            if keep == "end":
+                return "…" + self.backend.decode(token_ids[-max_tokens:])
+            return self.backend.decode(token_ids[:max_tokens]) + "…"
+        except Exception:
+            return text
     
     def _post_process_response(self, text: str) -> str:
         """응답 후처리"""
         try:
+            # 모델이 다음 차례 대화까지 이어 쓴 부분 제거
+            text = _trim_at_stop_sequences(text, ROLE_MARKERS)
+            
             # 불필요한 공백 제거
             text = text.strip()
             
@@ -108,7 +381,7 @@ class AIModelManager:
             # 최대 길이 제한 (3문장 이내)
             sentences = text.split('.')
             if len(sentences) > 3:
-                text = '. '.join(sentences[:3]) + '.'
+                text = '. '.join(sentence.strip() for sentence in sentences[:3]) + '.'
             
             return text
             
@@ -117,8 +390,11 @@ class AIModelManager:
     
     def get_ai_response(self, user_message: str, conversation_history: List[Dict], 
                        context: List[Dict] = None, current_mood: str = "보통", 
-                       ai_name: str = "루나") -> Dict:
-        """AI 응답 생성 with 개선된 프롬프트"""
+                       ai_name: str = "루나", memory_summary: str = "") -> Dict:
+        """AI 응답 생성 with 개선된 프롬프트
+        
+        memory_summary는 conversation_history보다 앞선 대화를 접어 둔 누적 요약이다.
+        """
         
         if not user_message or not user_message.strip():
             return {
@@ -128,22 +404,23 @@ class AIModelManager:
             }
         
         try:
-            # 컨텍스트 처리
-            context_text = ""
+            # 컨텍스트 처리 (뒤쪽 5개까지 후보, 실제로 넣을지는 토큰 예산으로 결정)
+            # 지난 일기 검색 결과는 관련도가 높은 것이 뒤에 오도록 들어옴
+            context_items = []
             if context and isinstance(context, list):
                 try:
-                    recent_context = context[-2:]
-                    context_summaries = []
-                    for ctx in recent_context:
+                    for ctx in context[-5:]:
                         if isinstance(ctx, dict) and 'summary' in ctx and 'action_items' in ctx:
                             action_items = ctx.get('action_items', [])
                             if isinstance(action_items, list):
-                                context_summaries.append(f"지난번에 이야기했던 것: {ctx['summary']}")
-                    
-                    if context_summaries:
-                        context_text = "\n\n이전 대화 참고:\n" + "\n".join(context_summaries) + "\n\n"
+                                when = f"{ctx['date']}에" if ctx.get('date') else "지난번에"
+                                context_items.append(f"{when} 이야기했던 것: {ctx['summary']}")
                 except Exception:
-                    context_text = ""
+                    context_items = []
+            
+            # 오늘 대화 중 접어 둔 앞부분 (가장 최신 참고 항목으로 넣음)
+            if memory_summary:
+                context_items.append(f"오늘 앞에서 나눈 이야기: {memory_summary}")
             
             # 기분별 설정
             mood_styles = {
@@ -163,20 +440,20 @@ class AIModelManager:
             
             mood_config = mood_styles.get(current_mood, mood_styles["보통"])
             
-            # 대화 히스토리 준비
-            conversation_text = ""
+            # 대화 히스토리 준비 (최근 20개까지 후보, 실제로 넣을지는 토큰 예산으로 결정)
+            history_lines = []
             if conversation_history and isinstance(conversation_history, list):
-                for msg in conversation_history[-5:]:  # 최근 5개만
+                for msg in conversation_history[-20:]:
                     if isinstance(msg, dict):
                         role = msg.get("role", "")
                         content = msg.get("content", "")
                         if role == "user":
-                            conversation_text += f"사용자: {content}\n"
+                            history_lines.append(f"사용자: {content}")
                         elif role == "assistant":
-                            conversation_text += f"{ai_name}: {content}\n"
+                            history_lines.append(f"{ai_name}: {content}")
             
             # 프롬프트 구성
-            system_prompt = f"""당신은 10대를 위한 따뜻하고 공감적인 AI 친구 {ai_name}입니다.
+            render_system = lambda context_text: f"""당신은 10대를 위한 따뜻하고 공감적인 AI 친구 {ai_name}입니다.
 
 핵심 원칙:
 - 친구처럼 편하게 대화하되, 존댓말을 사용하세요
@@ -207,21 +484,25 @@ class AIModelManager:
 
 간결하고 자연스러운 대화를 해주세요."""
 
-            # 전체 프롬프트
-            full_prompt = f"""{system_prompt}
-
-{conversation_text}사용자: {user_message}
-{ai_name}:"""
+            # 전체 프롬프트 (토큰 예산을 넘으면 오래된 기록부터 줄임, 현재 메시지는 항상 유지)
+            max_new_tokens = 150
+            with get_profiler().stage("chat", "prompt_build") as sample:
+                builder = PromptBuilder(self.count_tokens, self.truncate_to_tokens, self.max_length - max_new_tokens)
+                built = builder.build(render_system, context_items, history_lines,
+                                      f"사용자: {user_message}\n{ai_name}:")
+                stats = built["stats"]
+                sample["tokens"] = (stats["system_tokens"] + stats["current_tokens"]
+                                    + stats["history_tokens"] + stats["context_tokens"])
 
             # AI 응답 생성
-            ai_response = self.generate_response(full_prompt, max_new_tokens=150, temperature=0.7)
-            
-            # 토큰 수 추정 (대략적)
-            tokens_used = len(full_prompt.split()) + len(ai_response.split())
+            generation = self.generate_with_usage(built["prompt"], max_new_tokens=max_new_tokens,
+                                                  temperature=0.7, call_type="chat")
             
             return {
-                "response": ai_response,
-                "tokens_used": tokens_used,
+                "response": generation["text"],
+                "tokens_used": generation["usage"]["total_tokens"],
+                "usage": generation["usage"],
+                "prompt_stats": built["stats"],
                 "success": True
             }
             
@@ -241,46 +522,52 @@ class AIModelManager:
                 "success": False
             }
     
-    def generate_conversation_summary(self, messages: List[Dict]) -> Dict:
-        """대화 요약 생성"""
+    def generate_conversation_summary(self, messages: List[Dict], current_mood: str = "보통",
+                                      memory_summary: str = "", folded_until: int = 0) -> Dict:
+        """대화 요약 생성 (요약 + 감정 키워드 5개 + 액션아이템 3개를 한 번의 생성으로)
+        
+        memory_summary가 있으면 messages[:folded_until]은 그 요약으로 대신하고 이후 메시지만 읽는다.
+        """
         try:
             if not messages or not isinstance(messages, list):
-                return {
-                    "summary": "대화 내용이 없어요",
-                    "keywords": ["#감정나눔"],
-                    "action_items": ["오늘도 고생 많았어요"],
-                    "success": False
-                }
+                return self._default_summary_result("대화 내용이 없어요", current_mood)
+            
+            if not memory_summary:
+                folded_until = 0
             
             user_messages = []
-            for msg in messages:
+            for msg in messages[folded_until:]:
                 try:
                     if isinstance(msg, dict) and msg.get("role") == "user" and msg.get("content"):
                         user_messages.append(msg["content"])
                 except Exception:
                     continue
             
-            if not user_messages:
-                return {
-                    "summary": "사용자 메시지가 없어요",
-                    "keywords": ["#감정나눔"],
-                    "action_items": ["오늘도 고생 많았어요"],
-                    "success": False
-                }
+            if not user_messages and not memory_summary:
+                return self._default_summary_result("사용자 메시지가 없어요", current_mood)
             
             conversation_text = "\n".join(user_messages)
             
             if len(conversation_text) > 1500:
-                conversation_text = conversation_text[:1500] + "..."
+                if memory_summary:
+                    # 앞부분은 누적 요약에 담겨 있으므로 최신 부분을 남김
+                    conversation_text = "..." + conversation_text[-1500:]
+                else:
+                    conversation_text = conversation_text[:1500] + "..."
+            
+            if memory_summary:
+                conversation_text = f"(앞선 대화 요약) {memory_summary}\n{conversation_text}"
             
             prompt = f"""다음 대화 내용을 분석해서 아래 형식으로 응답해주세요:
 
 대화 내용:
 {conversation_text}
 
+현재 기분: {current_mood}
+
 분석 요청:
 1. 오늘 있었던 일을 1-2줄로 요약
-2. 대화에서 느껴진 감정 키워드 5개 추출 (예: #기쁨, #불안, #성취감 등)
+2. 사용자가 실제로 느꼈을 구체적인 감정 키워드 5개를 # 붙인 해시태그로 추출 (예: #기쁨, #불안, #성취감 등)
 3. 사용자에게 도움이 될 따뜻하고 친근한 조언 3개 제안 (친구 같은 말투로, ~해요/~랍니다 교차 사용)
 
 응답 형식:
@@ -291,116 +578,134 @@ class AIModelManager:
 - [~랍니다 말투의 친근한 조언]
 - [~해요 말투의 격려 메시지]"""
 
-            result = self.generate_response(prompt, max_new_tokens=300, temperature=0.3)
-            
-            # 응답 파싱
-            lines = result.strip().split('\n')
-            summary = ""
-            keywords = []
-            action_items = []
-            
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('요약:'):
-                    summary = line.replace('요약:', '').strip()
-                elif line.startswith('감정키워드:'):
-                    keyword_text = line.replace('감정키워드:', '').strip()
-                    keywords = [k.strip() for k in keyword_text.split(',') if k.strip()]
-                elif line.startswith('액션아이템:'):
-                    current_section = "actions"
-                elif current_section == "actions" and line.startswith('-'):
-                    action_item = line.replace('-', '').strip()
-                    if action_item:
-                        action_items.append(action_item)
-            
-            # 기본값 설정
-            if not summary:
-                summary = "오늘의 감정을 나누었어요"
-            if not keywords:
-                keywords = ["#감정나눔"]
-            if not action_items:
-                action_items = ["오늘도 고생 많았어요"]
-            
-            keywords = keywords[:5]
-            action_items = action_items[:3]
+            # 구조화된 응답이므로 3문장 제한 후처리는 적용하지 않음
+            generation = self.generate_with_usage(prompt, max_new_tokens=300, temperature=0.3,
+                                                  post_process=False, call_type="summary")
+            
+            parsed = self._parse_summary_response(generation["text"])
+            
+            # 항목별 기본값 설정 (파싱에 실패한 항목만 대체)
+            summary = parsed["summary"] or "오늘의 감정을 나누었어요"
+            keywords = self._fill_keywords(parsed["keywords"], current_mood)
+            action_items = parsed["action_items"][:3] or ["오늘도 고생 많았어요"]
             
             return {
                 "summary": summary,
                 "keywords": keywords,
                 "action_items": action_items,
+                "usage": generation["usage"],
                 "success": True
             }
             
         except Exception as e:
             print(f"대화 요약 생성 오류: {e}")
-            return {
-                "summary": "요약을 만드는 중에 문제가 생겼어요",
-                "keywords": ["#감정나눔"],
-                "action_items": ["오늘도 고생 많았어요"],
-                "success": False
-            }
-
-# 유틸리티 함수들
-def check_harmful_content(text: str) -> bool:
-    """유해 콘텐츠 검사"""
-    if not text or not isinstance(text, str):
-        return False
+            return self._default_summary_result("요약을 만드는 중에 문제가 생겼어요", current_mood)
     
-    try:
-        text_lower = text.lower().replace(" ", "")
-        harmful_patterns = [
-            "자살", "죽고싶", "자해", "죽고싶어", "사라지고싶", "끝내고싶", 
-            "살기싫", "살고싶지", "죽어버리", "죽었으면", "베고싶", "자살하고"
-        ]
-        
-        return any(pattern in text_lower for pattern in harmful_patterns)
-    except Exception:
-        return False
+    def update_conversation_memory(self, previous_summary: str, new_messages: List[Dict],
+                                   ai_name: str = "루나") -> Dict:
+        """누적 대화 요약에 새 메시지들을 합쳐서 다시 요약 (새 메시지만 읽음)"""
+        try:
+            lines = []
+            for msg in new_messages or []:
+                if isinstance(msg, dict) and msg.get("content"):
+                    speaker = "사용자" if msg.get("role") == "user" else ai_name
+                    lines.append(f"{speaker}: {msg['content']}")
+            
+            if not lines:
+                return {"summary": previous_summary, "success": False}
+            
+            prompt = f"""다음은 지금까지의 대화 요약과 새로 나눈 대화예요. 두 내용을 합쳐서 사용자에게 있었던 일과 감정을 중심으로 3-4문장으로 다시 요약해주세요.
 
-def check_violence_content(text: str) -> bool:
-    """폭력 콘텐츠 검사"""
-    if not text or not isinstance(text, str):
-        return False
-    
-    try:
-        text_lower = text.lower().replace(" ", "")
-        violence_patterns = [
-            "때리고싶", "죽이고싶", "칼", "총", "성폭행", "강간", "폭행", 
-            "때렸다", "맞았다", "협박", "폭력", "성추행"
-        ]
-        
-        return any(pattern in text_lower for pattern in violence_patterns)
-    except Exception:
-        return False
+지금까지의 요약:
+{previous_summary or "(없음)"}
 
-def check_content_with_local_model(text: str) -> dict:
-    """로컬 모델을 사용한 콘텐츠 검사 (기본 키워드 검사 사용)"""
-    if not text or not isinstance(text, str):
-        return {
-            "flagged": False,
-            "self_harm": False,
-            "violence": False,
-            "error": "Empty or invalid text"
-        }
+새로 나눈 대화:
+{chr(10).join(lines)}
+
+요약:"""
+            
+            generation = self.generate_with_usage(prompt, max_new_tokens=160, temperature=0.3,
+                                                  post_process=False, call_type="memory")
+            summary = generation["text"].strip().split("\n\n")[0].strip()
+            
+            if not generation["success"] or not summary:
+                return {"summary": previous_summary, "success": False}
+            
+            return {"summary": summary, "usage": generation["usage"], "success": True}
+        
+        except Exception as e:
+            print(f"대화 메모리 요약 오류: {e}")
+            return {"summary": previous_summary, "success": False}
     
-    try:
-        is_self_harm = check_harmful_content(text)
-        is_violence = check_violence_content(text)
+    def _parse_summary_response(self, text: str) -> Dict:
+        """요약 응답 파싱 (요약/감정키워드/액션아이템을 항목별로 추출)"""
+        summary = ""
+        keywords = []
+        action_items = []
+        current_section = None
+        
+        for raw_line in (text or "").strip().split('\n'):
+            # 마크다운 강조(**요약**:) 등 장식 제거
+            line = raw_line.strip().replace('**', '')
+            if not line:
+                continue
+            
+            header = re.match(r'^(요약|감정\s*키워드|키워드|액션\s*아이템|조언)\s*[:：]\s*(.*)$', line)
+            if header:
+                name, rest = header.group(1).replace(' ', ''), header.group(2).strip()
+                if name == '요약':
+                    current_section = "summary"
+                    if rest:
+                        summary = rest
+                elif name in ('감정키워드', '키워드'):
+                    current_section = "keywords"
+                    keywords.extend(re.findall(r'#[^\s,#]+', rest))
+                else:
+                    current_section = "actions"
+                    if rest:
+                        action_items.append(rest)
+                continue
+            
+            if current_section == "summary" and not summary:
+                summary = line
+            elif current_section == "keywords" and len(keywords) < 5:
+                keywords.extend(re.findall(r'#[^\s,#]+', line))
+            elif current_section == "actions":
+                item = re.sub(r'^([-•*]|\d+[.)])\s*', '', line).strip()
+                if item:
+                    action_items.append(item)
+        
+        # 키워드 줄이 없더라도 본문에 해시태그가 있으면 사용
+        if not keywords:
+            keywords = re.findall(r'#[^\s,#]+', text or "")
+        
+        unique_keywords = []
+        for keyword in keywords:
+            if keyword not in unique_keywords:
+                unique_keywords.append(keyword)
         
         return {
-            "flagged": is_self_harm or is_violence,
-            "self_harm": is_self_harm,
-            "violence": is_violence,
-            "success": True
+            "summary": summary,
+            "keywords": unique_keywords,
+            "action_items": action_items
         }
-        
-    except Exception as e:
+    
+    def _fill_keywords(self, keywords: List[str], current_mood: str) -> List[str]:
+        """감정 키워드를 5개로 맞추기 (부족하면 기분별 기본 키워드로 채움)"""
+        keywords = list(keywords[:5])
+        for extra in DEFAULT_MOOD_KEYWORDS.get(current_mood, DEFAULT_EXTRA_KEYWORDS) + DEFAULT_EXTRA_KEYWORDS:
+            if len(keywords) >= 5:
+                break
+            if extra not in keywords:
+                keywords.append(extra)
+        return keywords
+    
+    @staticmethod
+    def _default_summary_result(summary: str, current_mood: str) -> Dict:
+        """요약 실패 시 기본 결과 (추론 워커 클라이언트도 같은 결과를 씀)"""
         return {
-            "flagged": check_harmful_content(text) or check_violence_content(text),
-            "self_harm": check_harmful_content(text),
-            "violence": check_violence_content(text),
-            "error": str(e),
-            "fallback": True
+            "summary": summary,
+            "keywords": list(DEFAULT_MOOD_KEYWORDS.get(current_mood, DEFAULT_EXTRA_KEYWORDS)),
+            "action_items": ["오늘도 고생 많았어요"],
+            "success": False
         }
@@ -0,0 +1,561 @@
+"""마음톡 성능 측정 스크립트
+
+사용법:
+    python benchmarks.py speculative --runs 5
+    python benchmarks.py backends --backends transformers,onnxruntime,fake
+    python benchmarks.py load --snapshot models/ax-4.0-light
+    python benchmarks.py safety --runs 2000
+    python benchmarks.py vector_search --entries 50000 --dim 3072
+    python benchmarks.py session_memory --sessions 1000 --entries 1000
+    python benchmarks.py search --entries 100000
+    python benchmarks.py analytics --entries 100000
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from profiling import percentile
+
+# ✅ 측정용 예시 입력
+SAMPLE_CHAT_PROMPT = """당신은 10대를 위한 따뜻하고 공감적인 AI 친구 루나입니다.
+응답은 2-3문장으로 간결하게 해주세요.
+
+사용자: 오늘 수학시험을 망쳐서 너무 속상해요. 열심히 공부했는데 왜 이럴까요?
+루나:"""
+
+SAMPLE_SUMMARY_PROMPT = """다음 대화 내용을 분석해서 아래 형식으로 응답해주세요:
+
+대화 내용:
+오늘 수학시험을 망쳐서 너무 속상해요.
+그래도 친구가 같이 떡볶이 먹자고 해서 조금 기분이 풀렸어요.
+내일은 영어 단어 시험이 있어서 걱정돼요.
+
+응답 형식:
+요약: [1-2줄 요약]
+감정키워드: #키워드1, #키워드2, #키워드3, #키워드4, #키워드5
+액션아이템:
+- [조언]
+- [조언]
+- [조언]"""
+
+def _print_table(title: str, rows: List[Dict]):
+    print(f"\n=== {title} ===")
+    if not rows:
+        print("(결과 없음)")
+        return
+    columns = list(rows[0].keys())
+    widths = {column: max(len(str(column)), *(len(str(row[column])) for row in rows)) for column in columns}
+    print("  ".join(str(column).ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+# ✅ 추측 디코딩 vs 일반 샘플링
+def bench_speculative(args):
+    """초안 모델을 쓴 추측 디코딩과 기존 샘플링 경로의 CPU 지연 시간 비교"""
+    from ai_models import AIModelManager
+
+    manager = AIModelManager()
+    if manager.draft_model is None:
+        print("⚠️ 초안 모델이 없어요. MINDTALK_DRAFT_MODEL 환경변수를 설정해주세요.")
+        return
+
+    cases = [
+        ("chat", SAMPLE_CHAT_PROMPT, 150, 0.7, True),
+        ("summary", SAMPLE_SUMMARY_PROMPT, 300, 0.3, False)
+    ]
+
+    rows = []
+    for call_type, prompt, max_new_tokens, temperature, post_process in cases:
+        for speculative in (False, True):
+            # 첫 실행은 워밍업으로 버림
+            manager.generate_with_usage(prompt, 8, temperature, post_process, call_type, speculative)
+
+            latencies, speeds, acceptance = [], [], []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                result = manager.generate_with_usage(prompt, max_new_tokens, temperature,
+                                                     post_process, call_type, speculative)
+                latencies.append((time.perf_counter() - started) * 1000)
+                speeds.append(result["usage"]["decode_tokens_per_sec"])
+                if speculative:
+                    acceptance.append(result["usage"].get("acceptance_rate", 0.0))
+
+            rows.append({
+                "call_type": call_type,
+                "mode": "speculative" if speculative else "sampling",
+                "p50_ms": round(statistics.median(latencies), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "tokens/sec": round(statistics.mean(speeds), 2),
+                "acceptance": round(statistics.mean(acceptance), 3) if acceptance else "-"
+            })
+
+    _print_table(f"추측 디코딩 비교 (device={manager.device}, draft={manager.draft_model_name}, runs={args.runs})", rows)
+
+# ✅ 추론 백엔드별 지연 시간 비교
+def bench_backends(args):
+    """같은 프롬프트로 백엔드별 로딩 시간, 지연 시간, 생성 속도 비교"""
+    from ai_models import AIModelManager
+
+    rows = []
+    for backend_name in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        load_started = time.perf_counter()
+        try:
+            manager = AIModelManager(backend_name)
+        except Exception as e:
+            print(f"⚠️ {backend_name} 백엔드를 불러오지 못했어요: {e}")
+            continue
+        load_seconds = time.perf_counter() - load_started
+
+        for call_type, prompt, max_new_tokens, temperature, post_process in (
+            ("chat", SAMPLE_CHAT_PROMPT, 150, 0.7, True),
+            ("summary", SAMPLE_SUMMARY_PROMPT, 300, 0.3, False)
+        ):
+            manager.generate_with_usage(prompt, 8, temperature, post_process, call_type)
+
+            latencies, prefills, speeds = [], [], []
+            for _ in range(args.runs):
+                result = manager.generate_with_usage(prompt, max_new_tokens, temperature, post_process, call_type)
+                latencies.append(result["usage"]["total_ms"])
+                prefills.append(result["usage"]["prefill_ms"])
+                speeds.append(result["usage"]["decode_tokens_per_sec"])
+
+            rows.append({
+                "backend": backend_name,
+                "call_type": call_type,
+                "load_s": round(load_seconds, 1),
+                "prefill_ms": round(statistics.median(prefills), 1),
+                "p50_ms": round(statistics.median(latencies), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "tokens/sec": round(statistics.mean(speeds), 2)
+            })
+
+        del manager
+
+    _print_table(f"추론 백엔드 비교 (runs={args.runs})", rows)
+
+# ✅ 모델 로딩 시간/최대 메모리 (허브 캐시 vs 로컬 스냅샷)
+def _measure_load(snapshot_path: str, backend_name: str, results):
+    """새 프로세스에서 모델을 한 번 불러오고 시간과 최대 메모리를 기록"""
+    # 스냅샷 설정은 import 시점에 읽으므로 import 전에 지정
+    os.environ["MINDTALK_MODEL_SNAPSHOT"] = snapshot_path
+    os.environ["MINDTALK_MODEL_WARMUP"] = "0"
+
+    import_started = time.perf_counter()
+    from ai_models import AIModelManager
+    from model_snapshot import peak_rss_mb
+
+    import_seconds = time.perf_counter() - import_started
+    rss_before_load = peak_rss_mb()
+    manager = AIModelManager(backend_name)
+
+    results.put({
+        "import_s": round(import_seconds, 1),
+        "load_s": manager.load_stats["load_seconds"],
+        "rss_before_mb": rss_before_load,
+        "peak_rss_mb": manager.load_stats["peak_rss_mb"]
+    })
+
+def bench_load(args):
+    """로딩 방식별 콜드 스타트 시간과 최대 메모리 비교 (측정마다 새 프로세스)"""
+    modes = [("hub", "")]
+    if args.snapshot:
+        modes.append(("snapshot", args.snapshot))
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for mode, snapshot_path in modes:
+        for run in range(args.runs):
+            results = context.Queue()
+            process = context.Process(target=_measure_load, args=(snapshot_path, args.load_backend, results))
+            process.start()
+            process.join()
+            if process.exitcode != 0 or results.empty():
+                print(f"⚠️ {mode} 로딩 실패 (exit={process.exitcode})")
+                break
+            rows.append({"mode": mode, "run": run + 1, **results.get()})
+
+    _print_table(f"모델 로딩 비교 (backend={args.load_backend}, runs={args.runs})", rows)
+
+# ✅ 안전 키워드 검사 (기존 키워드별 `in` 검사 vs Aho–Corasick 한 번 순회)
+# (입력, 기대 카테고리) - 띄어쓰기/자모 분리/반복 글자/기호 끼워 넣기 변형 포함
+SAFETY_CORPUS = [
+    ("오늘 학교에서 친구랑 떡볶이 먹었어요", set()),
+    ("시험 망쳐서 너무 속상해요", set()),
+    ("그냥 죽고 싶어요", {"self_harm"}),
+    ("죽고싶어어어어", {"self_harm"}),
+    ("죽 고 싶 다", {"self_harm"}),
+    ("ㅈㅏㅅㅏㄹ 생각이 나요", {"self_harm"}),
+    ("자.해.하고 싶은 날", {"self_harm"}),
+    ("요즘 살기 싫어", {"self_harm"}),
+    ("다 끝내고 싶다는 생각만 들어", {"self_harm"}),
+    ("형한테 맞았다", {"violence"}),
+    ("걔를 때리고 싶다", {"violence"}),
+    ("누가 협박 메시지를 보냈어", {"violence"}),
+    ("너무 화나서 죽이고 싶어, 나도 죽고 싶고", {"self_harm", "violence"}),
+    ("ＡＢＣ 자해", {"self_harm"}),
+    ("손목이 아파요", set()),
+    ("손목시계 샀어", set()),
+    ("극단적인 다이어트 중", set()),
+    ("손목을 긋고 싶어", {"self_harm"}),
+    ("극단적인 선택을 할까 봐 무서워", {"self_harm"}),
+    ("남자 해외여행 가고 싶다", set()),
+    ("여자 해변에서 놀았어", set()),
+    ("모자 해서 나갔어", set()),
+    ("저 자리 자 해도 돼?", set()),
+    ("오늘 칼국수 먹었어", set()),
+    ("총 3개 샀어", set()),
+    ("칼로 찌르고 싶어", {"violence"}),
+    ("내일 소풍 가서 사진 찍을 거예요 " * 20, set()),
+]
+
+def _legacy_safety_scan(text: str) -> set:
+    """이전 방식: 공백 제거 후 키워드마다 `in`으로 다시 훑음"""
+    text_lower = text.lower().replace(" ", "")
+    categories = set()
+    if any(pattern in text_lower for pattern in [
+        "자살", "죽고싶", "자해", "죽고싶어", "사라지고싶", "끝내고싶",
+        "살기싫", "살고싶지", "죽어버리", "죽었으면", "베고싶", "자살하고"
+    ]):
+        categories.add("self_harm")
+    if any(pattern in text_lower for pattern in [
+        "때리고싶", "죽이고싶", "칼", "총", "성폭행", "강간", "폭행",
+        "때렸다", "맞았다", "협박", "폭력", "성추행"
+    ]):
+        categories.add("violence")
+    return categories
+
+def bench_safety(args):
+    """검사 정확도(예시 문장)와 문장당 검사 시간 비교"""
+    from safety_scanner import scan_text
+
+    rows = []
+    for name, scan in (
+        ("legacy", _legacy_safety_scan),
+        ("automaton", lambda text: set(scan_text(text)["categories"]))
+    ):
+        missed = [text for text, expected in SAFETY_CORPUS if scan(text) != expected]
+
+        # 실제 대화는 대부분 위험 키워드가 없으므로 걸리지 않는 문장과 걸리는 문장을 나눠서 잼
+        timings = {"clean": [], "flagged": []}
+        for group, texts in (
+            ("clean", [text for text, expected in SAFETY_CORPUS if not expected]),
+            ("flagged", [text for text, expected in SAFETY_CORPUS if expected])
+        ):
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                for text in texts:
+                    scan(text)
+                timings[group].append((time.perf_counter() - started) * 1_000_000 / len(texts))
+
+        rows.append({
+            "scanner": name,
+            "correct": f"{len(SAFETY_CORPUS) - len(missed)}/{len(SAFETY_CORPUS)}",
+            "clean_p50_us": round(statistics.median(timings["clean"]), 1),
+            "clean_p95_us": round(percentile(timings["clean"], 95), 1),
+            "flagged_p50_us": round(statistics.median(timings["flagged"]), 1),
+            "flagged_p95_us": round(percentile(timings["flagged"], 95), 1)
+        })
+        for text in missed:
+            print(f"⚠️ {name} 오답: {text[:30]}")
+
+    _print_table(f"안전 키워드 검사 (문장당, runs={args.runs})", rows)
+
+# ✅ 일기 의미 검색 인덱스 (전체 비교 vs IVF)
+def bench_vector_search(args):
+    """임의로 만든 군집형 임베딩으로 검색 지연 시간과 정확도(recall@5) 측정"""
+    import numpy as np
+    from semantic_search import IVF_MIN_ENTRIES, VectorIndex
+
+    entries = args.entries or 50000
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(1, entries // 100), args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), entries)]
+    vectors += 0.7 * rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    build_started = time.perf_counter()
+    index = VectorIndex()
+    index.build(np.arange(entries), vectors)
+    build_seconds = time.perf_counter() - build_started
+
+    exact_matrix = vectors.astype(np.float16).astype(np.float32)
+    latencies, hits = [], 0
+    for _ in range(args.runs):
+        query = vectors[rng.integers(entries)] + 0.05 * rng.standard_normal(args.dim).astype(np.float32)
+        query /= np.linalg.norm(query)
+
+        started = time.perf_counter()
+        found = [diary_id for diary_id, _ in index.search(query, 5)]
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        exact = np.argsort(-(exact_matrix @ query))[:5]
+        hits += len(set(found) & set(exact.tolist()))
+
+    _print_table(f"의미 검색 (entries={entries}, dim={args.dim}, runs={args.runs})", [{
+        "mode": "dense" if entries < IVF_MIN_ENTRIES else "ivf",
+        "build_s": round(build_seconds, 2),
+        "memory_mb": round(index.vectors.nbytes / 1024 / 1024, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "recall@5": round(hits / (5 * args.runs), 3)
+    }])
+
+# ✅ 세션별 일기 목록 메모리 (대화 내용 포함 dict vs DiaryRecord)
+SAMPLE_KEYWORDS = ["#기쁨", "#안도", "#걱정", "#설렘", "#피곤", "#속상함", "#뿌듯함", "#외로움", "#화남", "#평온"]
+
+def _legacy_load_diaries(db_path: str) -> List[Dict]:
+    """이전 방식: 대화 내용까지 전부 dict로 읽음"""
+    import json
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('''
+    SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages, id
+    FROM diary_entries ORDER BY date, time
+    ''').fetchall()
+    conn.close()
+    return [{
+        'date': row[0], 'time': row[1], 'mood': row[2], 'summary': row[3],
+        'keywords': json.loads(row[4]) if row[4] else [],
+        'suggested_keywords': json.loads(row[5]) if row[5] else [],
+        'action_items': json.loads(row[6]) if row[6] else [],
+        'chat_messages': json.loads(row[7]) if row[7] else [],
+        'id': row[8]
+    } for row in rows]
+
+def bench_session_memory(args):
+    """세션 몇 개가 일기 목록을 각자 불러왔을 때의 메모리를 재고 --sessions개로 환산
+
+    세션마다 같은 크기의 목록을 들고 있으므로 표본 세션(--sample-sessions개)에서 잰
+    세션당 증가량으로 전체를 추정한다 (intern된 문자열은 첫 세션에만 잡힘).
+    """
+    import random
+    import tempfile
+    import tracemalloc
+    from datetime import date, timedelta
+
+    import database
+
+    entries = args.entries or 1000
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database.DB_PATH = os.path.join(temp_dir, "bench.db")
+        database.init_database()
+        start = date(2020, 1, 1)
+        for i in range(entries):
+            database.save_diary_to_db({
+                'date': (start + timedelta(days=i)).isoformat(),
+                'time': f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+                'mood': rng.choice(["좋음", "보통", "나쁨"]),
+                'summary': f"{i}번째 날, 친구랑 학교 끝나고 떡볶이를 먹고 시험 얘기를 했다.",
+                'keywords': rng.sample(SAMPLE_KEYWORDS, 3),
+                'suggested_keywords': rng.sample(SAMPLE_KEYWORDS, 5),
+                'action_items': ["잠들기 전에 오늘 좋았던 일 하나 떠올려 보기", "내일 시험 범위 10분만 훑어보기"],
+                'chat_messages': [
+                    {"role": "user" if turn % 2 == 0 else "assistant",
+                     "content": f"{turn}번째 메시지: 오늘 있었던 일을 이야기하고 공감하는 대화 내용이에요."}
+                    for turn in range(12)
+                ]
+            })
+
+        rows = []
+        for name, load in (
+            ("dict + transcript", lambda: _legacy_load_diaries(database.DB_PATH)),
+            ("DiaryRecord", database.load_diaries_from_db),
+            ("shared snapshot", database.load_diaries_snapshot)
+        ):
+            sessions = []
+            tracemalloc.start()
+            started = time.perf_counter()
+            sessions.append(load())
+            load_ms = (time.perf_counter() - started) * 1000
+            first_bytes = tracemalloc.get_traced_memory()[0]
+            for _ in range(max(1, args.sample_sessions) - 1):
+                sessions.append(load())
+            total_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            extra_sessions = len(sessions) - 1
+            per_session = (total_bytes - first_bytes) / extra_sessions if extra_sessions else first_bytes
+            projected = first_bytes + per_session * (args.sessions - 1)
+            rows.append({
+                "entries": name,
+                "load_ms": round(load_ms, 1),
+                "first_session_mb": round(first_bytes / 1024 / 1024, 2),
+                "per_session_mb": round(per_session / 1024 / 1024, 2),
+                f"{args.sessions}_sessions_mb": round(projected / 1024 / 1024, 1)
+            })
+            del sessions
+
+    _print_table(f"세션별 일기 목록 메모리 (entries={entries}, sessions={args.sessions})", rows)
+
+# ✅ 일기 검색 (색인 검색 vs 이전 방식의 전체 훑기)
+# 검색어 하나(한 쪽)를 찾는 데 걸려도 되는 시간 (10만 개 기준, p95)
+SEARCH_LATENCY_BUDGET_MS = 50
+SEARCH_WORDS = ["친구랑", "떡볶이를", "수학", "시험을", "학원에서", "엄마랑", "노래방", "숙제를", "운동장에서",
+                "동생이랑", "버스에서", "도서관", "편의점", "고양이", "영어", "발표를", "급식이", "축구를"]
+
+def bench_search(args):
+    """10만 개 일기에서 검색어/필터 한 쪽(10개) 찾는 시간 (p95가 예산을 넘으면 실패로 끝남)"""
+    import json
+    import random
+    import sqlite3
+    import tempfile
+    from datetime import date, timedelta
+
+    import database
+
+    entries = args.entries or 100000
+    rng = random.Random(0)
+    cases = [
+        ("긴 검색어 (색인)", {"query": "떡볶이를"}),
+        ("드문 검색어 (색인)", {"query": "4321번째"}),
+        ("짧은 검색어 (LIKE)", {"query": "수학"}),
+        ("기분 + 날짜 필터", {"moods": ["나쁨"], "date_from": "2021-01-01", "date_to": "2021-12-31"}),
+        ("검색어 + 감정 필터", {"query": "친구랑", "emotion": "#기쁨"}),
+        ("둘째 쪽", {"query": "시험을", "offset": 10}),
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database.DB_PATH = os.path.join(temp_dir, "bench.db")
+        database.init_database()
+        start = date(2000, 1, 1)
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.executemany('''
+        INSERT INTO diary_entries (date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages)
+        VALUES (?, ?, ?, ?, ?, '[]', '[]', '[]')
+        ''', [(
+            (start + timedelta(days=i // 3)).isoformat(),
+            f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            rng.choice(["좋음", "보통", "나쁨"]),
+            " ".join(rng.sample(SEARCH_WORDS, 6)) + f" {i}번째 날",
+            json.dumps(rng.sample(SAMPLE_KEYWORDS, 3), ensure_ascii=False)
+        ) for i in range(entries)])
+        conn.commit()
+        conn.close()
+        all_entries = database.load_diaries_from_db()
+
+        rows = []
+        over_budget = []
+        for name, filters in cases:
+            timings, legacy_timings = [], []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                database.search_diaries_in_db(**filters)
+                timings.append((time.perf_counter() - started) * 1000)
+
+                # 이전 방식: 세션의 일기 전체를 파이썬으로 훑음 (검색어만 지원)
+                keyword = filters.get("query", "").lower()
+                started = time.perf_counter()
+                [entry for entry in all_entries
+                 if keyword in entry['summary'].lower() or keyword in " ".join(entry['keywords']).lower()]
+                legacy_timings.append((time.perf_counter() - started) * 1000)
+
+            p95 = percentile(timings, 95)
+            if p95 > SEARCH_LATENCY_BUDGET_MS:
+                over_budget.append(name)
+            rows.append({
+                "case": name,
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(p95, 2),
+                "legacy_scan_ms": round(statistics.median(legacy_timings), 2),
+                "budget": "✅" if p95 <= SEARCH_LATENCY_BUDGET_MS else "❌"
+            })
+
+    _print_table(f"일기 검색 (entries={entries}, runs={args.runs}, 예산 p95 {SEARCH_LATENCY_BUDGET_MS}ms)", rows)
+    if over_budget:
+        print(f"❌ 예산 초과: {', '.join(over_budget)}")
+        raise SystemExit(1)
+
+ANALYTICS_BUDGET_MS = 50
+
+def bench_analytics(args):
+    """10만 개 일기의 기분 분석 시간
+
+    일기를 하나 쓰고 하나 지운 뒤처럼 데이터 버전과 일기 목록을 바꿔 다시 계산하는 시간(쓰기 직후 첫 통계 화면,
+    그동안 다른 세션은 기다림)과 캐시에서 읽는 시간을 보여주고, 다시 계산 p95가 예산을 넘으면 실패로 끝난다.
+    프로세스가 뜬 뒤 처음 한 번 모든 일기를 변환하는 시간은 참고로만 보여준다.
+    """
+    import random
+    from datetime import date, timedelta
+
+    import diary_analytics
+    from diary_record import DiaryRecord
+
+    entries = args.entries or 100000
+    rng = random.Random(0)
+    start = date(2000, 1, 1)
+
+    def make_record(i):
+        return DiaryRecord(
+            i, (start + timedelta(days=i // 3)).isoformat(),
+            f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            rng.choice(["좋음", "보통", "나쁨"]), "", rng.sample(SAMPLE_KEYWORDS, rng.randrange(1, 4))
+        )
+
+    records = tuple(make_record(i) for i in range(entries))
+    snapshot = {"records": records}
+    diary_analytics.load_diaries_snapshot = lambda: snapshot["records"]
+    diary_analytics.get_data_version = lambda: -1
+    analytics = diary_analytics.MoodAnalytics()
+
+    started = time.perf_counter()
+    analytics.get()
+    first_timings = [(time.perf_counter() - started) * 1000]
+
+    compute_timings, cached_timings = [], []
+    for run in range(args.runs):
+        # 일기를 하나 쓰고 가장 오래된 일기를 하나 지운 직후처럼 목록과 데이터 버전을 바꿔서 다시 계산하게 함
+        snapshot["records"] = snapshot["records"][1:] + (make_record(entries + run),)
+        diary_analytics.get_data_version = lambda: run
+        started = time.perf_counter()
+        analytics.get()
+        compute_timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        analytics.get()
+        cached_timings.append((time.perf_counter() - started) * 1000)
+
+    rows = [
+        {"case": name, "p50_ms": round(statistics.median(timings), 2), "p95_ms": round(percentile(timings, 95), 2)}
+        for name, timings in (
+            ("처음 계산 (프로세스당 한 번)", first_timings),
+            ("다시 계산 (쓰기 후)", compute_timings),
+            ("캐시에서 읽기", cached_timings)
+        )
+    ]
+    _print_table(f"기분 분석 (entries={entries}, runs={args.runs}, 다시 계산 예산 p95 {ANALYTICS_BUDGET_MS}ms)", rows)
+    if percentile(compute_timings, 95) > ANALYTICS_BUDGET_MS:
+        print("❌ 예산 초과: 다시 계산")
+        raise SystemExit(1)
+
+BENCHMARKS = {
+    "speculative": bench_speculative,
+    "backends": bench_backends,
+    "load": bench_load,
+    "safety": bench_safety,
+    "vector_search": bench_vector_search,
+    "session_memory": bench_session_memory,
+    "search": bench_search,
+    "analytics": bench_analytics
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="마음톡 성능 측정")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS.keys()))
+    parser.add_argument("--runs", type=int, default=5, help="측정 반복 횟수")
+    parser.add_argument("--backends", default="transformers,onnxruntime,fake", help="비교할 추론 백엔드 (backends 측정용)")
+    parser.add_argument("--snapshot", default="", help="비교할 로컬 모델 스냅샷 폴더 (load 측정용)")
+    parser.add_argument("--load-backend", default="transformers", help="로딩을 측정할 추론 백엔드 (load 측정용)")
+    parser.add_argument("--entries", type=int, default=0, help="일기 수 (vector_search 기본 50000, session_memory 기본 1000, search/analytics 기본 100000)")
+    parser.add_argument("--dim", type=int, default=3072, help="임베딩 차원 (vector_search 측정용)")
+    parser.add_argument("--sessions", type=int, default=1000, help="환산할 동시 접속 세션 수 (session_memory 측정용)")
+    parser.add_argument("--sample-sessions", type=int, default=5, help="실제로 불러와 볼 세션 수 (session_memory 측정용)")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+if __name__ == "__main__":
+    main()
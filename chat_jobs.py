@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# ✅ 백그라운드 답장 생성 설정
+# 동시에 답장을 만드는 스레드 수 (실제 모델 동시 실행 수는 ExecutionPolicy가 다시 제한함)
+CHAT_JOB_WORKERS = int(os.environ.get("MINDTALK_CHAT_JOB_WORKERS", "4"))
+# 끝났는데 아무 세션도 가져가지 않은 결과를 들고 있는 시간 (초, 브라우저를 닫은 세션 등)
+CHAT_JOB_RESULT_TTL = float(os.environ.get("MINDTALK_CHAT_JOB_TTL", "600"))
+
+class ChatJobQueue:
+    """대화 답장 생성을 스크립트 스레드 밖에서 돌리는 작업 큐
+
+    submit()은 바로 작업 id를 돌려주고, 세션은 그 id만 들고 있다가 poll()로 결과를 가져간다.
+    작업은 세션이 아니라 이 큐가 들고 있으므로 다시 실행(rerun)되거나 다른 화면에 다녀와도
+    결과가 남아 있다. 가져가지 않은 결과는 CHAT_JOB_RESULT_TTL이 지나면 버린다.
+    """
+
+    def __init__(self, max_workers: int = CHAT_JOB_WORKERS, result_ttl: float = CHAT_JOB_RESULT_TTL):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mindtalk-chat-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.result_ttl = result_ttl
+
+    def submit(self, fn: Callable[..., Dict], *args, **kwargs) -> str:
+        """작업을 넣고 작업 id 반환 (fn은 get_ai_response 형식의 dict를 돌려줘야 함)"""
+        self._expire()
+        job_id = uuid.uuid4().hex
+        job = {"submitted_at": time.time(), "finished_at": None, "result": None}
+        with self._lock:
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job: Dict, fn: Callable[..., Dict], args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"답장 생성 작업 오류: {e}")
+            result = {"success": False, "response": f"답장을 만드는 중에 문제가 생겼어요: {e}"}
+        with self._lock:
+            job["result"] = result
+            job["finished_at"] = time.time()
+
+    def poll(self, job_id: str) -> Optional[Dict]:
+        """끝났으면 결과를 꺼내서 반환 (아직이면 None, 한 번 꺼낸 결과는 지움)
+
+        결과에는 작업을 넣고 끝날 때까지 걸린 시간(job_ms)이 들어 있다.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {"success": False, "response": "답장을 찾을 수 없어요. 다시 보내주세요.", "job_ms": 0.0}
+            if job["finished_at"] is None:
+                return None
+            del self._jobs[job_id]
+        return dict(job["result"], job_ms=(job["finished_at"] - job["submitted_at"]) * 1000)
+
+    def discard(self, job_id: str):
+        """결과가 더 이상 필요 없는 작업 (생성은 끝까지 돌고 결과만 버림)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["finished_at"] is not None:
+                del self._jobs[job_id]
+            elif job is not None:
+                job["discarded"] = True
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None
+                and (job.get("discarded") or now - job["finished_at"] > self.result_ttl)
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+# ✅ 대화 메시지 HTML 캐시 설정
+# Streamlit은 다시 실행할 때마다 main.py를 새로 실행하므로 캐시는 import되는 이 모듈에 둠
+# (프로세스 전체에서 공유, 내용이 같은 메시지는 세션이 달라도 재사용)
+MESSAGE_HTML_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=MESSAGE_HTML_CACHE_SIZE)
+def render_message_html(role: str, content: str, ai_name: str) -> str:
+    """메시지 한 개의 HTML (같은 메시지는 다시 만들지 않고 재사용)"""
+    # 빈 줄이 있으면 여러 메시지를 묶은 HTML 블록이 중간에 끊기므로 줄바꿈은 <br>로 바꿈
+    content = content.replace("\n", "<br>")
+    if role == "user":
+        return f'<div class="user-message">{content}</div>'
+    return f'<div class="ai-message"><b>{ai_name}</b>: {content}</div>'
@@ -0,0 +1,62 @@
+import threading
+from typing import Dict, List
+
+# ✅ 대화 메모리 설정
+# 최근 KEEP_RECENT_MESSAGES 개는 원문 그대로 두고, 그보다 오래된 메시지가
+# FOLD_EVERY_MESSAGES 개 쌓일 때마다 누적 요약에 합침
+KEEP_RECENT_MESSAGES = 6
+FOLD_EVERY_MESSAGES = 4
+
+class ConversationMemory:
+    """긴 대화의 오래된 메시지를 누적 요약으로 접어 두는 세션별 메모리"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.summary = ""
+        self.folded_until = 0
+
+    def snapshot(self) -> Dict:
+        """현재 요약과 요약에 포함된 메시지 수"""
+        with self._lock:
+            return {"summary": self.summary, "folded_until": self.folded_until}
+
+    def is_folding(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def maybe_fold(self, messages: List[Dict], ai_model, ai_name: str = "루나") -> bool:
+        """오래된 메시지가 충분히 쌓였으면 백그라운드에서 요약에 합침 (새 메시지만 처리)"""
+        if self.is_folding():
+            return False
+
+        with self._lock:
+            fold_end = len(messages) - KEEP_RECENT_MESSAGES
+            if fold_end - self.folded_until < FOLD_EVERY_MESSAGES:
+                return False
+            previous_summary = self.summary
+            new_messages = list(messages[self.folded_until:fold_end])
+
+        self._thread = threading.Thread(
+            target=self._fold,
+            args=(ai_model, previous_summary, new_messages, fold_end, ai_name),
+            name="mindtalk-memory-fold",
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _fold(self, ai_model, previous_summary: str, new_messages: List[Dict], fold_end: int, ai_name: str):
+        try:
+            result = ai_model.update_conversation_memory(previous_summary, new_messages, ai_name)
+            if result.get("success"):
+                with self._lock:
+                    self.summary = result["summary"]
+                    self.folded_until = fold_end
+        except Exception as e:
+            print(f"대화 메모리 요약 오류: {e}")
+
+    def wait(self, timeout: float = None):
+        """진행 중인 요약이 있으면 끝날 때까지 기다림 (일기 저장 직전에 사용)"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
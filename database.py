@@ -1,11 +1,79 @@
 import sqlite3
 import json
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
+from diary_record import DiaryRecord
+from diary_stats import apply_diary_event
+
 # ✅ SQLite 데이터베이스 설정 및 초기화
 DB_PATH = "mindtalk_diary.db"
 
+# ✅ 일기 검색 설정
+# trigram 색인은 글자 3개 이상인 검색어에만 쓸 수 있음 (더 짧으면 LIKE로 찾음)
+FTS_MIN_QUERY_LENGTH = 3
+# 검색어가 들어간 일기가 이보다 많으면 색인 대신 날짜순 인덱스를 따라 훑다가 한 쪽이 차면 멈춤
+# (흔한 검색어는 결과 전체를 정렬하는 것보다 빠르고, 드문 검색어는 색인으로 찾는 게 빠름)
+FTS_DENSE_MATCHES = 2000
+# 전문 검색 색인을 쓸 수 있는지 (init_database에서 확인)
+_fts_enabled = False
+
+# ✅ 세션끼리 공유하는 읽기 캐시
+# 일기/휴지통 테이블에 쓸 때마다 올라가는 버전 (이 서버 프로세스 안에서만 의미가 있음)
+_data_version = 0
+# 사용량 기록 버전 (생성할 때마다 바뀌므로 일기 데이터 버전과 따로 셈)
+_usage_version = 0
+_read_cache = {}
+_read_cache_lock = threading.Lock()
+
+def get_data_version():
+    """일기/휴지통 데이터 버전 (값이 같으면 마지막으로 읽은 뒤 바뀐 게 없음)"""
+    return _data_version
+
+def bump_data_version():
+    """일기/휴지통 테이블에 쓴 뒤 호출 (공유 캐시를 무효화)"""
+    global _data_version
+    with _read_cache_lock:
+        _data_version += 1
+        _read_cache.clear()
+
+def bump_usage_version():
+    """usage_log에 쓴 뒤 호출 (일별 사용량 공유 캐시를 무효화)"""
+    global _usage_version
+    with _read_cache_lock:
+        _usage_version += 1
+        for name in [name for name in _read_cache if isinstance(name, tuple) and name[0] == "daily_usage"]:
+            del _read_cache[name]
+
+def _cached_read(name, loader):
+    """지금 데이터 버전에서 한 번만 읽고 모든 세션이 같은 결과를 공유"""
+    with _read_cache_lock:
+        version = _data_version
+        cached = _read_cache.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    value = loader()
+    with _read_cache_lock:
+        # 읽는 도중에 다른 세션이 썼으면 저장하지 않음 (다음 읽기에서 다시 읽음)
+        if _data_version == version:
+            _read_cache[name] = (version, value)
+    return value
+
+def load_diaries_snapshot():
+    """모든 세션이 공유하는 일기 목록 (tuple이므로 고치지 말고 바꿀 땐 새로 만들 것)"""
+    return _cached_read("diaries", lambda: tuple(load_diaries_from_db()))
+
+def load_daily_usage_snapshot(days=30):
+    """모든 세션이 공유하는 일별 사용량 (tuple, 사용량을 기록했거나 날짜가 바뀌었을 때만 다시 읽음)"""
+    name = ("daily_usage", days, datetime.now().strftime('%Y-%m-%d'), _usage_version)
+    return _cached_read(name, lambda: tuple(load_daily_usage_from_db(days)))
+
+def load_deleted_entries_snapshot():
+    """모든 세션이 공유하는 휴지통 목록 (tuple)"""
+    return _cached_read("deleted_entries", lambda: tuple(load_deleted_entries_from_db()))
+
 def init_database():
     """데이터베이스 초기화 및 테이블 생성"""
     try:
@@ -66,6 +134,50 @@ def init_database():
         )
         ''')
         
+        # AI 사용량 기록 테이블 생성 (요청마다 한 줄씩 추가만 함)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usage_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            call_type TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            prefill_ms REAL DEFAULT 0,
+            decode_tokens_per_sec REAL DEFAULT 0,
+            total_ms REAL DEFAULT 0,
+            queue_wait_ms REAL DEFAULT 0,
+            tokens_budget_unused INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_usage_log_created_at ON usage_log (created_at)')
+        
+        # 이전 버전 테이블에 없는 컬럼 추가
+        cursor.execute('PRAGMA table_info(usage_log)')
+        usage_columns = {row[1] for row in cursor.fetchall()}
+        if 'queue_wait_ms' not in usage_columns:
+            cursor.execute('ALTER TABLE usage_log ADD COLUMN queue_wait_ms REAL DEFAULT 0')
+        if 'tokens_saved' in usage_columns and 'tokens_budget_unused' not in usage_columns:
+            # 예전 이름 (아낀 토큰이 아니라 남은 생성 한도라서 이름을 바꿈)
+            cursor.execute('ALTER TABLE usage_log RENAME COLUMN tokens_saved TO tokens_budget_unused')
+        elif 'tokens_budget_unused' not in usage_columns:
+            cursor.execute('ALTER TABLE usage_log ADD COLUMN tokens_budget_unused INTEGER NOT NULL DEFAULT 0')
+        
+        # 일기 검색 색인 (날짜순 목록/필터용 인덱스 + 전문 검색)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_diary_entries_date ON diary_entries (date, time)')
+        _create_search_index(cursor)
+        
+        # 일기 임베딩 테이블 생성 (의미 검색용, float16 바이트로 저장)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS diary_embeddings (
+            diary_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            dim INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
         conn.commit()
         conn.close()
         return True
@@ -73,8 +185,51 @@ def init_database():
         print(f"데이터베이스 초기화 오류: {e}")
         return False
 
+def _create_search_index(cursor):
+    """일기 요약/감정 키워드 전문 검색 색인 (FTS5 trigram, 일기 테이블이 바뀌면 트리거로 함께 갱신)
+
+    SQLite에 FTS5가 없으면 색인 없이 LIKE로 검색한다.
+    """
+    global _fts_enabled
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'diary_search'")
+        index_exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS diary_search USING fts5(
+            summary, keywords, content='diary_entries', content_rowid='id', tokenize='trigram'
+        )
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS diary_search_insert AFTER INSERT ON diary_entries BEGIN
+            INSERT INTO diary_search (rowid, summary, keywords) VALUES (new.id, new.summary, new.keywords);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS diary_search_delete AFTER DELETE ON diary_entries BEGIN
+            INSERT INTO diary_search (diary_search, rowid, summary, keywords) VALUES ('delete', old.id, old.summary, old.keywords);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS diary_search_update AFTER UPDATE ON diary_entries BEGIN
+            INSERT INTO diary_search (diary_search, rowid, summary, keywords) VALUES ('delete', old.id, old.summary, old.keywords);
+            INSERT INTO diary_search (rowid, summary, keywords) VALUES (new.id, new.summary, new.keywords);
+        END
+        ''')
+        
+        # 이전 버전에서 쓰던 DB면 기존 일기로 색인을 채움
+        if not index_exists:
+            cursor.execute("INSERT INTO diary_search (diary_search) VALUES ('rebuild')")
+        _fts_enabled = True
+    except sqlite3.OperationalError as e:
+        print(f"전문 검색 색인을 쓸 수 없어서 LIKE로 검색해요: {e}")
+        # FTS5가 없는 SQLite에서 트리거가 남아 있으면 일기 저장이 실패하므로 지움
+        for trigger in ('diary_search_insert', 'diary_search_delete', 'diary_search_update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        _fts_enabled = False
+
 def save_diary_to_db(diary_entry):
-    """일기를 데이터베이스에 저장"""
+    """일기를 데이터베이스에 저장 (저장한 일기 id, 실패하면 False)"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
@@ -93,22 +248,37 @@ def save_diary_to_db(diary_entry):
             json.dumps(diary_entry.get('action_items', []), ensure_ascii=False),
             json.dumps(diary_entry.get('chat_messages', []), ensure_ascii=False)
         ))
+        diary_id = cursor.lastrowid
         
         conn.commit()
         conn.close()
-        return True
+        bump_data_version()
+        return diary_id
     except Exception as e:
         print(f"일기 저장 오류: {e}")
         return False
 
+def _row_to_diary(row):
+    """diary_entries 조회 결과 한 줄을 DiaryRecord로 변환 (마지막 열은 id, 대화 내용은 읽지 않음)"""
+    return DiaryRecord(
+        row[7],
+        row[0],
+        row[1],
+        row[2],
+        row[3],
+        json.loads(row[4]) if row[4] else [],
+        json.loads(row[5]) if row[5] else [],
+        json.loads(row[6]) if row[6] else []
+    )
+
 def load_diaries_from_db():
-    """데이터베이스에서 모든 일기 불러오기"""
+    """데이터베이스에서 모든 일기 불러오기 (대화 내용 제외)"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('''
-        SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages
+        SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, id
         FROM diary_entries 
         ORDER BY date, time
         ''')
@@ -116,43 +286,114 @@ def load_diaries_from_db():
         rows = cursor.fetchall()
         conn.close()
         
-        diaries = []
-        for row in rows:
-            diary = {
-                'date': row[0],
-                'time': row[1],
-                'mood': row[2],
-                'summary': row[3],
-                'keywords': json.loads(row[4]) if row[4] else [],
-                'suggested_keywords': json.loads(row[5]) if row[5] else [],
-                'action_items': json.loads(row[6]) if row[6] else [],
-                'chat_messages': json.loads(row[7]) if row[7] else []
-            }
-            diaries.append(diary)
-        
-        return diaries
+        return [_row_to_diary(row) for row in rows]
     except Exception as e:
         print(f"일기 불러오기 오류: {e}")
         return []
 
+def load_chat_messages_from_db(diary_id):
+    """일기 하나의 대화 내용 (세션에는 들고 있지 않으므로 볼 때만 읽음)"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('SELECT chat_messages FROM diary_entries WHERE id = ?', (int(diary_id),))
+        row = cursor.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row and row[0] else []
+    except Exception as e:
+        print(f"대화 내용 불러오기 오류: {e}")
+        return []
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_diaries_in_db(query='', moods=None, date_from=None, date_to=None, emotion=None, limit=10, offset=0):
+    """검색어와 필터(기분, 날짜 범위, 감정 키워드)에 맞는 일기를 최신순으로 한 쪽만 찾기
+
+    반환값: (DiaryRecord 목록, 다음 쪽이 있는지)
+    글자 3개 이상인 드문 검색어는 전문 검색 색인으로 찾고, 짧거나 흔한 검색어는
+    날짜순 인덱스를 따라 LIKE로 훑는다.
+    """
+    try:
+        query = (query or '').strip()
+        source = 'diary_entries d'
+        conditions = []
+        params = []
+        
+        use_index = False
+        if query and _fts_enabled and len(query) >= FTS_MIN_QUERY_LENGTH:
+            match = '"' + query.replace('"', '""') + '"'
+            conn = sqlite3.connect(DB_PATH)
+            match_count = conn.execute('SELECT COUNT(*) FROM diary_search WHERE diary_search MATCH ?', (match,)).fetchone()[0]
+            conn.close()
+            if match_count == 0:
+                return [], False
+            use_index = match_count < FTS_DENSE_MATCHES
+        
+        if use_index:
+            source = 'diary_search s JOIN diary_entries d ON d.id = s.rowid'
+            conditions.append('diary_search MATCH ?')
+            params.append(match)
+        elif query:
+            pattern = f"%{_escape_like(query)}%"
+            conditions.append("(d.summary LIKE ? ESCAPE '\\' OR d.keywords LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        
+        if moods:
+            conditions.append(f"d.mood IN ({','.join('?' * len(moods))})")
+            params.extend(moods)
+        if date_from:
+            conditions.append('d.date >= ?')
+            params.append(str(date_from))
+        if date_to:
+            conditions.append('d.date <= ?')
+            params.append(str(date_to))
+        if emotion:
+            # 키워드는 JSON 배열로 저장되어 있으므로 따옴표까지 맞춰서 찾음
+            conditions.append("d.keywords LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(json.dumps(emotion, ensure_ascii=False))}%")
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        # 다음 쪽이 있는지 알려고 한 개 더 읽음 (전체 개수는 세지 않음)
+        cursor.execute(f'''
+        SELECT d.date, d.time, d.mood, d.summary, d.keywords, d.suggested_keywords, d.action_items, d.id
+        FROM {source}
+        {where}
+        ORDER BY d.date DESC, d.time DESC
+        LIMIT ? OFFSET ?
+        ''', params + [limit + 1, offset])
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_row_to_diary(row) for row in rows[:limit]], len(rows) > limit
+    except Exception as e:
+        print(f"일기 검색 오류: {e}")
+        return [], False
+
 def delete_diary_from_db(diary_entry):
     """데이터베이스에서 일기 삭제하고 휴지통으로 이동"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
-        # 원본 일기 찾기
-        cursor.execute('''
-        SELECT rowid FROM diary_entries 
-        WHERE date = ? AND time = ? AND summary = ?
-        ''', (diary_entry['date'], diary_entry['time'], diary_entry['summary']))
+        # 원본 일기 찾기 (세션의 일기에는 대화 내용이 없으므로 DB에서 함께 읽음)
+        # id가 있으면 id로 찾음 (같은 분에 같은 요약인 일기가 여럿일 수 있음)
+        if diary_entry.get('id') is not None:
+            cursor.execute('SELECT rowid, chat_messages FROM diary_entries WHERE rowid = ?', (diary_entry['id'],))
+        else:
+            cursor.execute('''
+            SELECT rowid, chat_messages FROM diary_entries 
+            WHERE date = ? AND time = ? AND summary = ?
+            ''', (diary_entry['date'], diary_entry['time'], diary_entry['summary']))
         
         result = cursor.fetchone()
         if not result:
             conn.close()
             return False
         
-        original_id = result[0]
+        original_id, chat_messages = result
         
         # 휴지통으로 이동
         deleted_date = datetime.now().strftime('%Y년 %m월 %d일 %H시 %M분')
@@ -171,29 +412,31 @@ def delete_diary_from_db(diary_entry):
             json.dumps(diary_entry.get('keywords', []), ensure_ascii=False),
             json.dumps(diary_entry.get('suggested_keywords', []), ensure_ascii=False),
             json.dumps(diary_entry.get('action_items', []), ensure_ascii=False),
-            json.dumps(diary_entry.get('chat_messages', []), ensure_ascii=False),
+            chat_messages,
             deleted_date,
             auto_delete_date
         ))
         
-        # 원본에서 삭제
+        # 원본에서 삭제 (임베딩은 복원될 때 새 id로 다시 계산됨)
         cursor.execute('DELETE FROM diary_entries WHERE rowid = ?', (original_id,))
+        cursor.execute('DELETE FROM diary_embeddings WHERE diary_id = ?', (original_id,))
         
         conn.commit()
         conn.close()
+        bump_data_version()
         return True
     except Exception as e:
         print(f"일기 삭제 오류: {e}")
         return False
 
 def load_deleted_entries_from_db():
-    """데이터베이스에서 휴지통 항목들 불러오기"""
+    """데이터베이스에서 휴지통 항목들 불러오기 (대화 내용 제외)"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
         cursor.execute('''
-        SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages, deleted_date, auto_delete_date
+        SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, deleted_date, auto_delete_date
         FROM deleted_entries 
         ORDER BY deleted_date DESC
         ''')
@@ -211,9 +454,8 @@ def load_deleted_entries_from_db():
                 'keywords': json.loads(row[4]) if row[4] else [],
                 'suggested_keywords': json.loads(row[5]) if row[5] else [],
                 'action_items': json.loads(row[6]) if row[6] else [],
-                'chat_messages': json.loads(row[7]) if row[7] else [],
-                'deleted_date': row[8],
-                'auto_delete_date': row[9]
+                'deleted_date': row[7],
+                'auto_delete_date': row[8]
             }
             deleted_entries.append(entry)
         
@@ -228,21 +470,18 @@ def restore_from_trash_db(trash_entry):
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
-        # 원본으로 복원
+        # 원본으로 복원 (대화 내용은 세션에 없으므로 휴지통 행에서 그대로 옮김)
         cursor.execute('''
         INSERT INTO diary_entries 
         (date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            trash_entry['date'],
-            trash_entry['time'],
-            trash_entry['mood'],
-            trash_entry['summary'],
-            json.dumps(trash_entry.get('keywords', []), ensure_ascii=False),
-            json.dumps(trash_entry.get('suggested_keywords', []), ensure_ascii=False),
-            json.dumps(trash_entry.get('action_items', []), ensure_ascii=False),
-            json.dumps(trash_entry.get('chat_messages', []), ensure_ascii=False)
-        ))
+        SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages
+        FROM deleted_entries
+        WHERE date = ? AND time = ? AND summary = ? AND deleted_date = ?
+        LIMIT 1
+        ''', (trash_entry['date'], trash_entry['time'], trash_entry['summary'], trash_entry['deleted_date']))
+        if cursor.rowcount == 0:
+            conn.close()
+            return False
         
         # 휴지통에서 삭제
         cursor.execute('''
@@ -252,6 +491,7 @@ def restore_from_trash_db(trash_entry):
         
         conn.commit()
         conn.close()
+        bump_data_version()
         return True
     except Exception as e:
         print(f"일기 복원 오류: {e}")
@@ -270,11 +510,26 @@ def permanent_delete_from_trash_db(trash_entry):
         
         conn.commit()
         conn.close()
+        bump_data_version()
         return True
     except Exception as e:
         print(f"영구 삭제 오류: {e}")
         return False
 
+def empty_trash_db():
+    """휴지통 전체 영구 삭제"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM deleted_entries')
+        conn.commit()
+        conn.close()
+        bump_data_version()
+        return True
+    except Exception as e:
+        print(f"휴지통 비우기 오류: {e}")
+        return False
+
 def clean_expired_trash_db():
     """만료된 휴지통 항목 자동 삭제"""
     try:
@@ -303,6 +558,8 @@ def clean_expired_trash_db():
         
         conn.commit()
         conn.close()
+        if expired_dates:
+            bump_data_version()
         return True
     except Exception as e:
         print(f"휴지통 정리 오류: {e}")
@@ -363,16 +620,21 @@ def save_token_usage_to_db(tokens):
         return False
 
 def load_token_usage_from_db():
-    """데이터베이스에서 토큰 사용량 불러오기"""
+    """데이터베이스에서 토큰 사용량 불러오기 (사용량 기록이 있으면 그 합계 사용)"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(total_tokens), 0) FROM usage_log')
+        ledger_count, ledger_total = cursor.fetchone()
+        
         cursor.execute('SELECT total_tokens FROM token_usage WHERE id = 1')
         result = cursor.fetchone()
         conn.close()
         
-        if result:
+        if ledger_count:
+            return ledger_total
+        elif result:
             return result[0]
         else:
             return 0
@@ -380,6 +642,220 @@ def load_token_usage_from_db():
         print(f"토큰 사용량 불러오기 오류: {e}")
         return 0
 
+def record_usage_to_db(call_type, usage):
+    """AI 생성 1회의 사용량을 기록 (수정 없이 추가만 함)"""
+    try:
+        if not usage:
+            return False
+        
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT INTO usage_log 
+        (call_type, prompt_tokens, completion_tokens, total_tokens, prefill_ms, decode_tokens_per_sec, total_ms, queue_wait_ms, tokens_budget_unused)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            call_type,
+            int(usage.get('prompt_tokens', 0)),
+            int(usage.get('completion_tokens', 0)),
+            int(usage.get('total_tokens', 0)),
+            float(usage.get('prefill_ms', 0.0)),
+            float(usage.get('decode_tokens_per_sec', 0.0)),
+            float(usage.get('total_ms', 0.0)),
+            float(usage.get('queue_wait_ms', 0.0)),
+            int(usage.get('tokens_budget_unused', 0))
+        ))
+        
+        conn.commit()
+        conn.close()
+        bump_usage_version()
+        return True
+    except Exception as e:
+        print(f"사용량 기록 오류: {e}")
+        return False
+
+def load_daily_usage_from_db(days=30):
+    """최근 N일 동안의 일별 사용량 집계 불러오기 (최신 날짜 먼저)"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+        cursor.execute('''
+        SELECT date(created_at, 'localtime') AS day,
+               COUNT(*),
+               SUM(prompt_tokens),
+               SUM(completion_tokens),
+               SUM(total_tokens),
+               AVG(prefill_ms),
+               AVG(CASE WHEN decode_tokens_per_sec > 0 THEN decode_tokens_per_sec END),
+               AVG(total_ms),
+               MAX(total_ms),
+               AVG(queue_wait_ms),
+               MAX(queue_wait_ms),
+               SUM(tokens_budget_unused)
+        FROM usage_log
+        WHERE created_at >= ?
+        GROUP BY day
+        ORDER BY day DESC
+        ''', (since,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        daily_usage = []
+        for row in rows:
+            daily_usage.append({
+                'date': row[0],
+                'requests': row[1],
+                'prompt_tokens': row[2] or 0,
+                'completion_tokens': row[3] or 0,
+                'total_tokens': row[4] or 0,
+                'avg_prefill_ms': round(row[5] or 0.0, 1),
+                'avg_decode_tokens_per_sec': round(row[6] or 0.0, 2),
+                'avg_total_ms': round(row[7] or 0.0, 1),
+                'max_total_ms': round(row[8] or 0.0, 1),
+                'avg_queue_wait_ms': round(row[9] or 0.0, 1),
+                'max_queue_wait_ms': round(row[10] or 0.0, 1),
+                'tokens_budget_unused': row[11] or 0
+            })
+        
+        return daily_usage
+    except Exception as e:
+        print(f"일별 사용량 불러오기 오류: {e}")
+        return []
+
+# ✅ 일기 임베딩 (의미 검색용)
+def load_diaries_by_ids_from_db(diary_ids):
+    """id 목록 순서대로 일기 불러오기 (삭제된 일기는 빠짐)"""
+    try:
+        if not diary_ids:
+            return []
+        
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        placeholders = ','.join('?' * len(diary_ids))
+        cursor.execute(f'''
+        SELECT date, time, mood, summary, keywords, suggested_keywords, action_items, id
+        FROM diary_entries
+        WHERE id IN ({placeholders})
+        ''', [int(diary_id) for diary_id in diary_ids])
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        diaries_by_id = {row[7]: _row_to_diary(row) for row in rows}
+        return [diaries_by_id[int(diary_id)] for diary_id in diary_ids if int(diary_id) in diaries_by_id]
+    except Exception as e:
+        print(f"일기 불러오기 오류: {e}")
+        return []
+
+def load_diary_summaries_from_db():
+    """검색 인덱스용 일기 요약 목록 (대화 내용은 불러오지 않음)"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT id, date, summary, keywords, action_items
+        FROM diary_entries
+        ORDER BY date, time
+        ''')
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [{
+            'id': row[0],
+            'date': row[1],
+            'summary': row[2],
+            'keywords': json.loads(row[3]) if row[3] else [],
+            'action_items': json.loads(row[4]) if row[4] else []
+        } for row in rows]
+    except Exception as e:
+        print(f"일기 요약 불러오기 오류: {e}")
+        return []
+
+def load_diaries_without_embedding_from_db(model_id, limit=256):
+    """아직 임베딩이 없는(또는 다른 모델로 계산된) 일기 (id, 요약, 감정 키워드) 목록"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT d.id, d.summary, d.keywords
+        FROM diary_entries d
+        LEFT JOIN diary_embeddings e ON e.diary_id = d.id AND e.model = ?
+        WHERE e.diary_id IS NULL
+        ORDER BY d.id
+        LIMIT ?
+        ''', (model_id, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row[0], row[1], json.loads(row[2]) if row[2] else []) for row in rows]
+    except Exception as e:
+        print(f"임베딩 대상 일기 불러오기 오류: {e}")
+        return []
+
+def save_diary_embeddings_to_db(model_id, diary_ids, vectors):
+    """일기 임베딩 저장 (float16 바이트, 같은 일기는 덮어씀)"""
+    try:
+        import numpy as np
+        
+        vectors = np.asarray(vectors, dtype=np.float16)
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+        INSERT OR REPLACE INTO diary_embeddings (diary_id, model, dim, vector)
+        VALUES (?, ?, ?, ?)
+        ''', [
+            (int(diary_id), model_id, int(vector.shape[0]), vector.tobytes())
+            for diary_id, vector in zip(diary_ids, vectors)
+        ])
+        
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"임베딩 저장 오류: {e}")
+        return False
+
+def load_diary_embeddings_from_db(model_id):
+    """저장된 임베딩 전체 (id 배열, float16 행렬), 없으면 (None, None)"""
+    try:
+        import numpy as np
+        
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT e.diary_id, e.dim, e.vector
+        FROM diary_embeddings e
+        JOIN diary_entries d ON d.id = e.diary_id
+        WHERE e.model = ?
+        ORDER BY e.diary_id
+        ''', (model_id,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if not rows:
+            return None, None
+        
+        dim = rows[0][1]
+        rows = [row for row in rows if row[1] == dim]
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        matrix = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.float16).reshape(len(rows), dim)
+        return ids, matrix
+    except Exception as e:
+        print(f"임베딩 불러오기 오류: {e}")
+        return None, None
+
 # ✅ 데이터 저장/로딩 함수들
 def save_data_to_db():
     """모든 세션 데이터를 SQLite에 저장"""
@@ -391,8 +867,7 @@ def save_data_to_db():
         save_setting_to_db('consecutive_days', st.session_state.get('consecutive_days', 0))
         save_setting_to_db('last_entry_date', st.session_state.get('last_entry_date', ''))
         
-        # 토큰 사용량 저장
-        save_token_usage_to_db(st.session_state.get('token_usage', 0))
+        # 토큰 사용량은 생성할 때마다 usage_log에 기록되므로 따로 저장하지 않음
         
         return True
     except Exception as e:
@@ -403,11 +878,13 @@ def load_data_from_db():
     """SQLite에서 모든 데이터 불러오기"""
     import streamlit as st
     try:
-        # 일기 데이터 불러오기
-        st.session_state.diary_entries = load_diaries_from_db()
+        # 일기 데이터 불러오기 (그 뒤로 바뀐 게 없으면 다른 세션/탭이 읽은 목록을 그대로 공유)
+        # 통계는 세션 버전이 바뀌었으니 다음에 읽을 때 새로 만들어짐
+        st.session_state.diary_entries = load_diaries_snapshot()
+        st.session_state.diary_version = st.session_state.get('diary_version', 0) + 1
         
         # 휴지통 데이터 불러오기
-        st.session_state.deleted_entries = load_deleted_entries_from_db()
+        st.session_state.deleted_entries = load_deleted_entries_snapshot()
         
         # 설정 불러오기
         st.session_state.ai_name = load_setting_from_db('ai_name', '루나')
@@ -430,9 +907,10 @@ def move_to_trash(diary_entry):
     try:
         # SQLite에서 삭제하고 휴지통으로 이동
         if delete_diary_from_db(diary_entry):
-            # 세션에서도 업데이트
-            st.session_state.diary_entries = load_diaries_from_db()
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
+            # 세션에서도 업데이트 (통계는 이 일기만 빼서 갱신)
+            st.session_state.diary_entries = load_diaries_snapshot()
+            st.session_state.deleted_entries = load_deleted_entries_snapshot()
+            apply_diary_event(st.session_state, "remove", diary_entry)
             return True
         return False
     except Exception as e:
@@ -444,9 +922,10 @@ def restore_from_trash(trash_entry):
     import streamlit as st
     try:
         if restore_from_trash_db(trash_entry):
-            # 세션에서도 업데이트
-            st.session_state.diary_entries = load_diaries_from_db()
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
+            # 세션에서도 업데이트 (통계는 이 일기만 더해서 갱신)
+            st.session_state.diary_entries = load_diaries_snapshot()
+            st.session_state.deleted_entries = load_deleted_entries_snapshot()
+            apply_diary_event(st.session_state, "add", trash_entry)
             return True
         return False
     except Exception as e:
@@ -459,7 +938,7 @@ def permanent_delete_from_trash(trash_entry):
     try:
         if permanent_delete_from_trash_db(trash_entry):
             # 세션에서도 업데이트
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
+            st.session_state.deleted_entries = load_deleted_entries_snapshot()
             return True
         return False
     except Exception as e:
@@ -472,7 +951,7 @@ def clean_expired_trash():
     try:
         if clean_expired_trash_db():
             # 세션에서도 업데이트
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
+            st.session_state.deleted_entries = load_deleted_entries_snapshot()
         return True
     except Exception as e:
         print(f"휴지통 정리 오류: {e}")
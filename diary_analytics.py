@@ -0,0 +1,330 @@
+import threading
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database import get_data_version, load_diaries_snapshot
+from diary_record import DiaryRecord
+from profiling import get_profiler
+
+# ✅ 기분 흐름 분석 설정
+# 기분 점수 (평균을 내면 -1 ~ 1 사이)
+MOOD_SCORES = {"좋음": 1.0, "보통": 0.0, "나쁨": -1.0}
+# 기분 흐름을 볼 이동 평균 기간 (일)
+ROLLING_WINDOWS = (7, 30)
+# 기분 흐름 그래프에 보여줄 기간 (마지막 일기 날짜부터 거꾸로, 일)
+TREND_CHART_DAYS = 180
+# 감정 키워드 추세를 볼 최근 달 수, 추세를 계산할 최소 등장 횟수, 보여줄 개수
+KEYWORD_TREND_MONTHS = 6
+KEYWORD_TREND_MIN_COUNT = 3
+TOP_TREND_KEYWORDS = 5
+# 함께 자주 나온 감정 키워드 쌍 개수
+TOP_KEYWORD_PAIRS = 10
+WEEKDAY_NAMES = ["월", "화", "수", "목", "금", "토", "일"]
+# 시간대 이름과 시작 시각
+TIME_OF_DAY_BUCKETS = [("새벽", 0), ("아침", 6), ("오후", 12), ("저녁", 18)]
+
+def _fixed_width_bytes(values: List[str], width: int) -> Optional[bytes]:
+    """값이 모두 width글자의 ASCII면 이어 붙인 바이트 (아니면 None)
+
+    값마다 길이를 확인하므로 길이가 다른 값 하나가 뒤의 값들을 밀어 잘못 읽게 하지 않는다.
+    """
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    if not (lengths == width).all():
+        return None
+    raw = "".join(values).encode("utf-8")
+    return raw if len(raw) == width * len(values) else None
+
+def _parse_dates(dates: List[str]) -> np.ndarray:
+    """'YYYY-MM-DD' 목록 → 1970-01-01부터 지난 날 수 (형식이 다르면 -1)
+
+    모두 10글자의 ASCII면 이어 붙인 바이트를 고정 길이 배열로 보고 한 번에 변환한다.
+    """
+    raw = _fixed_width_bytes(dates, 10)
+    if raw is not None:
+        try:
+            return np.frombuffer(raw, dtype="S10").astype("datetime64[D]").astype(np.int64)
+        except ValueError:
+            pass
+    # 잘못된 날짜가 섞여 있을 때만 하나씩 확인
+    parsed = pd.to_datetime(pd.Series(dates), format="%Y-%m-%d", errors="coerce")
+    return np.where(parsed.notna(), parsed.to_numpy().astype("datetime64[D]").astype(np.int64), -1)
+
+def _parse_hours(times: List[str]) -> np.ndarray:
+    """'HH:MM' 목록 → 시 배열 (형식이 다르면 -1)
+
+    모두 5글자의 ASCII면 이어 붙인 바이트를 (일기 수 × 5) 배열로 보고 앞 두 자리만 읽는다.
+    다른 길이가 섞여 있으면 값마다 앞 두 글자를 잘라 숫자인지 확인한다.
+    """
+    raw = _fixed_width_bytes(times, 5)
+    if raw is not None:
+        digits = np.frombuffer(raw, dtype=np.uint8).reshape(len(times), 5)[:, :2].astype(np.int64) - ord("0")
+        hours = digits[:, 0] * 10 + digits[:, 1]
+        valid = (digits >= 0).all(axis=1) & (digits <= 9).all(axis=1) & (hours < 24)
+        return np.where(valid, hours, -1)
+
+    prefixes = pd.Series(times, dtype=object).str.slice(0, 2)
+    hours = pd.to_numeric(prefixes.where(prefixes.str.fullmatch(r"[0-9]{2}", na=False)), errors="coerce")
+    return hours.where(hours < 24, -1).to_numpy(dtype=np.int64)
+
+def _mood_scores(moods: List[str]) -> np.ndarray:
+    """기분 목록 → 점수 배열 (모르는 기분은 NaN)
+
+    값마다 해시로 번호를 붙인 뒤(pd.factorize) 서로 다른 기분 몇 개만 기분 표에서 찾는다.
+    """
+    codes, names = pd.factorize(pd.Series(moods, dtype=object))
+    get_score = MOOD_SCORES.get
+    lookup = np.array([get_score(name, np.nan) for name in names] + [np.nan], dtype=np.float64)
+    return lookup[codes]
+
+def _name_ranks(keywords: np.ndarray) -> np.ndarray:
+    """키워드 번호 → 이름 순서 (번호는 일기가 들어온 순서로 붙으므로 동점 정리/쌍 순서는 이름으로 정함)"""
+    ranks = np.empty(len(keywords), dtype=np.int64)
+    ranks[np.argsort(keywords.astype(str), kind="stable")] = np.arange(len(keywords))
+    return ranks
+
+def _score_table(groups: np.ndarray, scores: np.ndarray, size: int, labels: List[str]) -> pd.DataFrame:
+    """그룹(요일/시간대)별 일기 수와 평균 기분 점수"""
+    counts = np.bincount(groups, minlength=size)
+    scored = ~np.isnan(scores)
+    score_sums = np.bincount(groups[scored], weights=scores[scored], minlength=size)
+    score_counts = np.bincount(groups[scored], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = np.where(score_counts > 0, score_sums / score_counts, np.nan)
+    return pd.DataFrame({"일기 수": counts, "평균 기분": np.round(averages, 2)}, index=labels)
+
+def _rolling_mood(day_numbers: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+    """날짜별 기분 점수의 7일/30일 이동 평균 (일기를 안 쓴 날은 기간 안에 쓴 일기로만 평균)
+
+    날짜별 합계/개수를 bincount로 만들고 누적합의 차로 기간 합계를 구한다.
+    """
+    scored = ~np.isnan(scores)
+    first_day = day_numbers.min()
+    span = int(day_numbers.max() - first_day) + 1
+    offsets = day_numbers[scored] - first_day
+    score_cumsum = np.concatenate(([0.0], np.cumsum(np.bincount(offsets, weights=scores[scored], minlength=span))))
+    count_cumsum = np.concatenate(([0], np.cumsum(np.bincount(offsets, minlength=span))))
+
+    chart_days = min(span, TREND_CHART_DAYS)
+    ends = np.arange(span - chart_days, span) + 1
+    columns = {}
+    for window in ROLLING_WINDOWS:
+        starts = np.maximum(ends - window, 0)
+        window_counts = count_cumsum[ends] - count_cumsum[starts]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            columns[f"{window}일 평균"] = np.where(
+                window_counts > 0, (score_cumsum[ends] - score_cumsum[starts]) / window_counts, np.nan
+            )
+
+    index = pd.DatetimeIndex((first_day + ends - 1).astype("datetime64[D]"), name="날짜")
+    return pd.DataFrame(columns, index=index)
+
+def _keyword_trends(months: np.ndarray, combo_codes: np.ndarray, combo_rows: np.ndarray,
+                    keyword_codes: np.ndarray, keywords: np.ndarray, combo_count: int) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+    """최근 몇 달 동안 달마다 그 키워드가 나온 일기 비율의 기울기 (한 달에 몇 %p씩 늘었는지)
+
+    (달 × 조합) 개수표에 (조합 × 키워드) 행렬을 곱해 (달 × 키워드) 개수표를 만들고,
+    모든 키워드의 최소제곱 기울기를 한 번에 계산한다.
+    """
+    first_month = months.max() - KEYWORD_TREND_MONTHS + 1
+    recent = months >= first_month
+    month_entries = np.bincount(months[recent] - first_month, minlength=KEYWORD_TREND_MONTHS)
+    active = month_entries > 0
+    if active.sum() < 2 or not len(keywords):
+        return [], []
+
+    month_combos = np.bincount(
+        (months[recent] - first_month) * combo_count + combo_codes[recent],
+        minlength=KEYWORD_TREND_MONTHS * combo_count
+    ).reshape(KEYWORD_TREND_MONTHS, combo_count)
+    counts = np.stack([
+        np.bincount(keyword_codes, weights=month_combos[month, combo_rows], minlength=len(keywords))
+        for month in range(KEYWORD_TREND_MONTHS)
+    ])
+
+    shares = counts[active] / month_entries[active, None] * 100
+    t = np.flatnonzero(active).astype(np.float64)
+    t -= t.mean()
+    slopes = (t @ (shares - shares.mean(axis=0))) / (t @ t)
+
+    candidates = np.flatnonzero(counts.sum(axis=0) >= KEYWORD_TREND_MIN_COUNT)
+    ordered = candidates[np.lexsort((_name_ranks(keywords)[candidates], slopes[candidates]))]
+    rising = [(keywords[code], round(float(slopes[code]), 1)) for code in ordered[::-1][:TOP_TREND_KEYWORDS] if slopes[code] > 0]
+    falling = [(keywords[code], round(float(slopes[code]), 1)) for code in ordered[:TOP_TREND_KEYWORDS] if slopes[code] < 0]
+    return rising, falling
+
+def _keyword_pairs(combo_codes: np.ndarray, combo_rows: np.ndarray, keyword_codes: np.ndarray,
+                   keywords: np.ndarray, combo_count: int) -> List[Tuple[str, str, int]]:
+    """한 일기에 함께 나온 감정 키워드 쌍과 횟수 (많은 순)
+
+    (일기 × 키워드) 행렬을 X = C·K로 나눠 두었으므로 동시 출현 행렬 XᵀX = Kᵀ·diag(조합별 일기 수)·K이다.
+    조합 안의 키워드 쌍을 쌍 번호로 바꿔 조합별 일기 수만큼 더한다 (키워드 수²짜리 표를 만들지 않음).
+    """
+    combo_weights = np.bincount(combo_codes, minlength=combo_count)
+    max_length = int(np.bincount(combo_rows).max()) if len(combo_rows) else 0
+    keyword_count = len(keywords)
+    pair_codes, pair_weights = [], []
+    for distance in range(1, max_length):
+        same_combo = combo_rows[:-distance] == combo_rows[distance:]
+        first, second = keyword_codes[:-distance][same_combo], keyword_codes[distance:][same_combo]
+        different = first != second
+        pair_codes.append(np.minimum(first, second)[different] * keyword_count + np.maximum(first, second)[different])
+        pair_weights.append(combo_weights[combo_rows[:-distance][same_combo][different]])
+    if not pair_codes:
+        return []
+
+    pairs, inverse = np.unique(np.concatenate(pair_codes), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate(pair_weights))
+    # 쌍 안의 순서와 동점 순서는 키워드 이름 순
+    ranks = _name_ranks(keywords)
+    first_ranks, second_ranks = ranks[pairs // keyword_count], ranks[pairs % keyword_count]
+    low, high = np.minimum(first_ranks, second_ranks), np.maximum(first_ranks, second_ranks)
+    by_name = keywords[np.argsort(ranks)]
+    top = np.lexsort((high, low, -counts))[:TOP_KEYWORD_PAIRS]
+    return [(by_name[low[i]], by_name[high[i]], int(counts[i])) for i in top if counts[i] > 0]
+
+class DiaryColumns:
+    """일기 id별 열 배열 (날짜, 기분 점수, 시, 키워드 조합 번호)
+
+    일기 내용은 id마다 바뀌지 않으므로 (삭제 후 복원하면 새 id) 데이터 버전이 바뀌면 새로 생긴 일기만
+    변환해서 붙이고 없어진 일기는 뺀다. 감정 키워드는 (일기 → 키워드 조합) + (조합 × 키워드) 두 희소 행렬로
+    나눠 두며, 조합/키워드 번호표는 늘어나기만 한다. 같은 조합이 여러 일기에 반복되므로
+    키워드 단위 계산은 서로 다른 조합 수만큼만 하면 된다.
+    """
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.day_numbers = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0, dtype=np.float64)
+        self.hours = np.zeros(0, dtype=np.int64)
+        self.combo_codes = np.zeros(0, dtype=np.int64)
+        # 조합 × 키워드 행렬의 COO 좌표 (조합 번호, 키워드 번호)
+        self.combo_rows = np.zeros(0, dtype=np.int64)
+        self.keyword_codes = np.zeros(0, dtype=np.int64)
+        self.keywords = np.zeros(0, dtype=object)
+        self._combos = {}
+        self._keywords = {}
+
+    @property
+    def combo_count(self) -> int:
+        return len(self._combos)
+
+    def update(self, entries: Sequence[DiaryRecord]):
+        """entries와 같은 일기 집합이 되도록 새 일기는 변환해서 붙이고 없어진 일기는 뺌"""
+        ids = np.fromiter((entry.id for entry in entries), dtype=np.int64, count=len(entries))
+        kept = np.isin(self.ids, ids)
+        added = np.flatnonzero(~np.isin(ids, self.ids))
+        if kept.all() and not len(added):
+            return
+
+        new_entries = entries if len(added) == len(entries) else [entries[position] for position in added]
+        if new_entries:
+            new_columns = (
+                _parse_dates([entry.date for entry in new_entries]),
+                _mood_scores([entry.mood for entry in new_entries]),
+                _parse_hours([entry.time for entry in new_entries]),
+                self._combo_codes([entry.keywords for entry in new_entries])
+            )
+        else:
+            new_columns = (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+        # 변환이 모두 끝난 뒤에 한꺼번에 바꿈 (중간에 실패해도 열 길이가 어긋나지 않게)
+        self.ids = np.concatenate([self.ids[kept], ids[added]])
+        self.day_numbers, self.scores, self.hours, self.combo_codes = (
+            np.concatenate([column[kept], new_column])
+            for column, new_column in zip((self.day_numbers, self.scores, self.hours, self.combo_codes), new_columns)
+        )
+
+    def _combo_codes(self, keyword_lists: List[Tuple[str, ...]]) -> np.ndarray:
+        """키워드 목록 → 조합 번호 (처음 보는 조합/키워드는 번호표에 추가)"""
+        codes, combos = pd.factorize(pd.Series(keyword_lists, dtype=object))
+        # 키워드 목록이 없는 일기(-1)는 빈 조합으로
+        lookup = np.fromiter((self._combo_code(tuple(combo)) for combo in chain(combos, [()])),
+                             dtype=np.int64, count=len(combos) + 1)
+        return lookup[codes]
+
+    def _combo_code(self, combo: Tuple[str, ...]) -> int:
+        code = self._combos.get(combo)
+        if code is not None:
+            return code
+        code = self._combos[combo] = len(self._combos)
+        # 한 일기에 같은 키워드가 두 번 있어도 한 번으로 (추세 비율/쌍 횟수를 부풀리지 않게)
+        combo = tuple(dict.fromkeys(combo))
+        new_keywords = [keyword for keyword in combo if keyword not in self._keywords]
+        for keyword in new_keywords:
+            self._keywords[keyword] = len(self._keywords)
+        if new_keywords:
+            self.keywords = np.concatenate([self.keywords, np.array(new_keywords, dtype=object)])
+        self.combo_rows = np.concatenate([self.combo_rows, np.full(len(combo), code, dtype=np.int64)])
+        self.keyword_codes = np.concatenate([
+            self.keyword_codes, np.array([self._keywords[keyword] for keyword in combo], dtype=np.int64)
+        ])
+        return code
+
+def _analytics_from_columns(columns: DiaryColumns) -> Optional[Dict]:
+    """열 배열로 기분 흐름, 요일/시간대별 기분, 감정 키워드 추세와 함께 나온 키워드 계산 (일기가 없으면 None)"""
+    day_numbers, scores, hours, combo_codes = columns.day_numbers, columns.scores, columns.hours, columns.combo_codes
+    valid = day_numbers >= 0
+    if not valid.any():
+        return None
+    if not valid.all():
+        day_numbers, scores, hours, combo_codes = day_numbers[valid], scores[valid], hours[valid], combo_codes[valid]
+    months = day_numbers.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+    timed = hours >= 0
+    bucket_starts = np.array([start for _, start in TIME_OF_DAY_BUCKETS])
+    keyword_args = (combo_codes, columns.combo_rows, columns.keyword_codes, columns.keywords, columns.combo_count)
+
+    rising, falling = _keyword_trends(months, *keyword_args)
+    return {
+        "rolling": _rolling_mood(day_numbers, scores),
+        # 1970-01-01이 목요일이므로 +3 하면 월요일이 0
+        "weekday": _score_table((day_numbers + 3) % 7, scores, 7, WEEKDAY_NAMES),
+        "time_of_day": _score_table(
+            np.searchsorted(bucket_starts, hours[timed], side="right") - 1, scores[timed],
+            len(TIME_OF_DAY_BUCKETS), [name for name, _ in TIME_OF_DAY_BUCKETS]
+        ),
+        "rising_keywords": rising,
+        "falling_keywords": falling,
+        "keyword_pairs": _keyword_pairs(*keyword_args)
+    }
+
+def compute_mood_analytics(entries: Sequence[DiaryRecord], columns: Optional[DiaryColumns] = None) -> Optional[Dict]:
+    """기분 흐름, 요일/시간대별 기분, 감정 키워드 추세와 함께 나온 키워드 (일기가 없으면 None)
+
+    일기 목록을 열 단위 NumPy 배열로 바꾼 뒤 모든 계산을 배열 연산으로 한다.
+    지난번 columns를 넘기면 그 뒤로 새로 생긴 일기만 변환한다.
+    """
+    try:
+        if not entries:
+            return None
+        columns = columns if columns is not None else DiaryColumns()
+        columns.update(entries)
+        return _analytics_from_columns(columns)
+    except Exception as e:
+        print(f"기분 분석 오류: {e}")
+        return None
+
+class MoodAnalytics:
+    """DB의 일기로 기분 분석을 계산해 두는 분석기
+
+    결과는 프로세스 전체에서 공유하고, 일기가 추가/삭제/복원되어 데이터 버전이 바뀌었을 때만 다시 계산한다.
+    다시 계산할 때는 열 배열을 이어서 써서 새로 생긴 일기만 변환한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = DiaryColumns()
+        self._result = None
+        self.signature = None
+
+    def get(self) -> Optional[Dict]:
+        signature = get_data_version()
+        with self._lock:
+            if signature != self.signature:
+                with get_profiler().stage("analytics", "compute"):
+                    self._result = compute_mood_analytics(load_diaries_snapshot(), self._columns)
+                self.signature = signature
+            return self._result
@@ -0,0 +1,256 @@
+import calendar as cal
+import html
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ✅ 감정 달력 설정
+WEEKDAY_NAMES = ["월", "화", "수", "목", "금", "토", "일"]
+MOOD_EMOJIS = {"좋음": "😊", "보통": "😐", "나쁨": "😔"}
+MOOD_BACKGROUNDS = {"좋음": "#ffe4e6", "보통": "#e3f2fd", "나쁨": "#f3e5f5"}
+MOOD_BORDERS = {"좋음": "#ffb3ba", "보통": "#90caf9", "나쁨": "#ce93d8"}
+EMPTY_BACKGROUND = "#f8f9fa"
+EMPTY_BORDER = "#ddd"
+
+# ✅ 한 해 기분 지도 설정
+# 기분 순서 (하루에 일기 수가 같은 기분이 여럿이면 앞쪽 기분을 대표 기분으로)
+HEATMAP_MOODS = ("좋음", "보통", "나쁨")
+HEATMAP_COLORS = {"좋음": "#ff8a9a", "보통": "#64b5f6", "나쁨": "#ba68c8"}
+HEATMAP_EMPTY = "#ebedf0"
+# 그날 쓴 일기 수에 따른 진하기 (1개, 2개, 3개 이상)
+HEATMAP_OPACITY = (0.45, 0.7, 1.0)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _parse_date(date_str: str) -> Optional[Tuple[int, int, int]]:
+    """'YYYY-MM-DD' → (연, 월, 일), 형식이 다르면 None (strptime보다 훨씬 빠름)"""
+    try:
+        if len(date_str) != 10 or date_str[4] != '-' or date_str[7] != '-':
+            return None
+        return int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10])
+    except (TypeError, ValueError):
+        return None
+
+class MonthIndex:
+    """(연, 월) → 일 → 그날 일기 목록 색인
+
+    일기 목록으로 한 번 만들고, 새 일기는 add()로 바로 반영한다.
+    달을 바꿀 때는 딕셔너리 조회 한 번이면 된다.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self._months = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: Dict):
+        parsed = _parse_date(entry.get('date', ''))
+        if parsed is None:
+            return
+        year, month, day = parsed
+        self._months.setdefault((year, month), {}).setdefault(day, []).append(entry)
+
+    def month(self, year: int, month: int) -> Dict[int, List[Dict]]:
+        """그 달의 {일: [일기, ...]} (일기가 없으면 빈 딕셔너리)"""
+        return self._months.get((year, month), {})
+
+def _date_ordinals(dates: List[str]) -> np.ndarray:
+    """'YYYY-MM-DD' 목록 → date.toordinal() 배열 (형식이 다르면 0)"""
+    try:
+        days = np.array(dates, dtype="datetime64[D]")
+        return np.where(np.isnat(days), 0, days.astype(np.int64) + EPOCH_ORDINAL)
+    except ValueError:
+        # 잘못된 날짜가 섞여 있을 때만 하나씩 확인
+        ordinals = []
+        for date_str in dates:
+            parsed = _parse_date(date_str)
+            try:
+                ordinals.append(date(*parsed).toordinal() if parsed else 0)
+            except ValueError:
+                ordinals.append(0)
+        return np.array(ordinals, dtype=np.int64)
+
+class DayMoodGrid:
+    """날짜별 기분 집계 배열 (행: 날짜 서수 - first_ordinal, 열: HEATMAP_MOODS 순서의 기분별 일기 수 + 그 밖의 기분)
+
+    처음 한 번만 전체 일기로 만들고, 이후에는 저장/삭제/복원 때마다 add()/remove()로 그날 칸만 고친다.
+    version이 세션의 diary_version과 다르면 새로 만든다 (DiaryStats와 같은 방식).
+    """
+
+    def __init__(self, entries: List[Dict], version: int = 0):
+        self.version = version
+        self.first_ordinal = 0
+        self.counts = np.zeros((0, len(HEATMAP_MOODS) + 1), dtype=np.int32)
+
+        ordinals = _date_ordinals([entry.get('date') or '' for entry in entries])
+        valid = ordinals > 0
+        if not valid.any():
+            return
+
+        mood_columns = {mood: column for column, mood in enumerate(HEATMAP_MOODS)}
+        moods = np.array([mood_columns.get(entry.get('mood'), len(HEATMAP_MOODS)) for entry in entries])
+        ordinals = ordinals[valid]
+        self.first_ordinal = int(ordinals.min())
+        days = int(ordinals.max()) - self.first_ordinal + 1
+        columns = self.counts.shape[1]
+        # (날짜, 기분) 칸 번호로 한 번에 셈
+        self.counts = np.bincount(
+            (ordinals - self.first_ordinal) * columns + moods[valid], minlength=days * columns
+        ).astype(np.int32).reshape(days, columns)
+
+    def _row(self, entry: Dict, grow: bool) -> Optional[Tuple[int, int]]:
+        """일기가 들어갈 (행, 열), 배열 밖의 날짜면 grow일 때 배열을 늘림"""
+        parsed = _parse_date(entry.get('date', ''))
+        if parsed is None:
+            return None
+        try:
+            ordinal = date(*parsed).toordinal()
+        except ValueError:
+            return None
+        column = HEATMAP_MOODS.index(entry.get('mood')) if entry.get('mood') in HEATMAP_MOODS else len(HEATMAP_MOODS)
+
+        if not len(self.counts):
+            if not grow:
+                return None
+            self.first_ordinal = ordinal
+            self.counts = np.zeros((1, self.counts.shape[1]), dtype=np.int32)
+        if ordinal < self.first_ordinal:
+            if not grow:
+                return None
+            padding = np.zeros((self.first_ordinal - ordinal, self.counts.shape[1]), dtype=np.int32)
+            self.counts = np.concatenate([padding, self.counts])
+            self.first_ordinal = ordinal
+        row = ordinal - self.first_ordinal
+        if row >= len(self.counts):
+            if not grow:
+                return None
+            padding = np.zeros((row - len(self.counts) + 1, self.counts.shape[1]), dtype=np.int32)
+            self.counts = np.concatenate([self.counts, padding])
+        return row, column
+
+    def add(self, entry: Dict):
+        position = self._row(entry, grow=True)
+        if position is not None:
+            self.counts[position] += 1
+
+    def remove(self, entry: Dict):
+        position = self._row(entry, grow=False)
+        if position is not None and self.counts[position] > 0:
+            self.counts[position] -= 1
+
+    def years(self) -> List[int]:
+        """일기가 있는 해 목록"""
+        rows = np.flatnonzero(self.counts.sum(axis=1))
+        if not len(rows):
+            return []
+        first = date.fromordinal(self.first_ordinal + int(rows[0])).year
+        last = date.fromordinal(self.first_ordinal + int(rows[-1])).year
+        return list(range(first, last + 1))
+
+    def days(self, start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """start ~ end(포함) 날짜별 (일기 수, 대표 기분 번호) 배열 (일기가 없거나 모르는 기분뿐이면 대표 기분 -1)"""
+        length = end.toordinal() - start.toordinal() + 1
+        window = np.zeros((length, self.counts.shape[1]), dtype=np.int32)
+        offset = start.toordinal() - self.first_ordinal
+        source_start, source_end = max(offset, 0), min(offset + length, len(self.counts))
+        if source_start < source_end:
+            window[source_start - offset:source_end - offset] = self.counts[source_start:source_end]
+
+        known = window[:, :len(HEATMAP_MOODS)]
+        dominant = np.where(known.sum(axis=1) > 0, known.argmax(axis=1), -1)
+        return window.sum(axis=1), dominant
+
+def _year_heatmap(year: int, counts: np.ndarray, dominant: np.ndarray, today: date) -> str:
+    """한 해 기분 지도 (열: 주, 행: 요일) CSS 그리드
+
+    counts/dominant는 DayMoodGrid.days(1월 1일, 12월 31일)의 결과.
+    """
+    first_day = date(year, 1, 1)
+    weeks = (first_day.weekday() + len(counts) + 6) // 7
+    # 1월 1일 앞의 빈칸 (월요일부터 시작)
+    cells = ["<i class='mt-day' style='visibility: hidden;'></i>"] * first_day.weekday()
+
+    for offset, (count, mood_index) in enumerate(zip(counts.tolist(), dominant.tolist())):
+        day = first_day + timedelta(days=offset)
+        if count:
+            mood = HEATMAP_MOODS[mood_index] if mood_index >= 0 else ""
+            color = HEATMAP_COLORS.get(mood, EMPTY_BORDER)
+            opacity = HEATMAP_OPACITY[min(count, len(HEATMAP_OPACITY)) - 1]
+            title = f"{day.isoformat()} {MOOD_EMOJIS.get(mood, '')} {mood} · 일기 {count}개"
+            style = f"background: {color}; opacity: {opacity};"
+        else:
+            title = f"{day.isoformat()} · 일기 없음"
+            style = f"background: {HEATMAP_EMPTY};"
+        if day == today:
+            style += " outline: 2px solid #1e88e5; outline-offset: -1px;"
+        cells.append(f"<i class='mt-day' title='{html.escape(title, quote=True)}' style='{style}'></i>")
+
+    return (
+        f"<div style='display: grid; grid-template-rows: repeat(7, auto); grid-auto-flow: column; "
+        f"grid-template-columns: repeat({weeks}, minmax(0, 1fr)); gap: 2px; margin: 0.25rem 0 1rem;'>"
+        + "".join(cells)
+        + "</div>"
+    )
+
+def render_mood_heatmap(grid: DayMoodGrid, years: List[int], today: Optional[date] = None) -> str:
+    """여러 해의 기분 지도를 HTML 한 덩어리로 만듦 (두 해 이상이면 해마다 제목을 붙임)"""
+    today = today or date.today()
+    parts = ["<style>.mt-day { display: block; aspect-ratio: 1; border-radius: 2px; }</style>"]
+    for year in years:
+        counts, dominant = grid.days(date(year, 1, 1), date(year, 12, 31))
+        if len(years) > 1:
+            parts.append(f"<div style='font-weight: 600; margin-top: 0.5rem;'>{year}년 · 일기 {int(counts.sum())}개</div>")
+        parts.append(_year_heatmap(year, counts, dominant, today))
+    return "".join(parts)
+
+def render_month_grid(year: int, month: int, month_entries: Dict[int, List[Dict]],
+                      today: Optional[date] = None) -> str:
+    """한 달 달력을 CSS 그리드 HTML 한 덩어리로 만듦 (날짜 칸마다 요소를 만들지 않음)"""
+    today = today or date.today()
+    cells = [
+        f"<div style='text-align: center; font-weight: bold; padding: 10px; background: {EMPTY_BACKGROUND}; border-radius: 5px;'>{name}</div>"
+        for name in WEEKDAY_NAMES
+    ]
+
+    for week in cal.monthcalendar(year, month):
+        for day in week:
+            if day == 0:
+                cells.append("<div style='height: 80px;'></div>")
+                continue
+
+            mood_emoji = ""
+            bg_color = EMPTY_BACKGROUND
+            border_color = EMPTY_BORDER
+            tooltip_text = "이날은 일기를 쓰지 않았어요."
+
+            day_entries = month_entries.get(day)
+            if day_entries:
+                # 하루의 첫 번째 일기를 기준으로 대표 기분 설정
+                mood = day_entries[0]['mood']
+                mood_emoji = MOOD_EMOJIS.get(mood, "")
+                bg_color = MOOD_BACKGROUNDS.get(mood, EMPTY_BACKGROUND)
+                border_color = MOOD_BORDERS.get(mood, EMPTY_BORDER)
+
+                # 툴팁에 표시할 모든 키워드 수집
+                all_keywords = []
+                for entry in day_entries:
+                    all_keywords.extend(entry.get('keywords', []))
+                tooltip_text = ", ".join(dict.fromkeys(all_keywords)) if all_keywords else "선택한 감정 키워드가 없어요."
+
+            # 오늘 날짜 표시
+            today_mark = " 🔵" if (year, month, day) == (today.year, today.month, today.day) else ""
+
+            cells.append(
+                f"<div title='{html.escape(tooltip_text, quote=True)}' style='background: {bg_color}; padding: 15px; "
+                f"text-align: center; border-radius: 8px; border: 2px solid {border_color}; height: 80px; "
+                f"display: flex; flex-direction: column; justify-content: center; align-items: center; cursor: help;'>"
+                f"<div style='font-weight: bold; font-size: 16px;'>{day}{today_mark}</div>"
+                f"<div style='font-size: 24px; margin-top: 5px;'>{mood_emoji}</div>"
+                f"</div>"
+            )
+
+    return (
+        "<div style='display: grid; grid-template-columns: repeat(7, minmax(0, 1fr)); gap: 8px; margin: 0.5rem 0 1rem;'>"
+        + "".join(cells)
+        + "</div>"
+    )
@@ -0,0 +1,63 @@
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+def _interned(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """감정 키워드처럼 자주 반복되는 문자열은 세션끼리 같은 객체를 쓰도록 intern"""
+    return tuple(sys.intern(value) for value in values or () if isinstance(value, str))
+
+class DiaryRecord:
+    """세션에 들고 있는 일기 한 개 (대화 내용 없이 화면에 필요한 값만)
+
+    모든 세션이 일기 전체를 복사해 들고 있으므로 dict 대신 __slots__ 객체로 가볍게 보관하고,
+    날짜/시간/기분/키워드 문자열은 intern해서 공유한다. 대화 내용은 필요할 때
+    load_chat_messages_from_db(id)로 읽는다.
+    기존 화면 코드가 그대로 동작하도록 entry['mood'], entry.get('keywords')처럼 읽을 수 있다.
+    """
+
+    __slots__ = ("id", "date", "time", "mood", "summary", "keywords", "suggested_keywords", "action_items")
+
+    def __init__(self, id: Optional[int], date: str, time: str, mood: str, summary: str,
+                 keywords: Iterable[str] = (), suggested_keywords: Iterable[str] = (),
+                 action_items: Iterable[str] = ()):
+        self.id = id
+        self.date = sys.intern(date or "")
+        self.time = sys.intern(time or "")
+        self.mood = sys.intern(mood or "")
+        self.summary = summary or ""
+        self.keywords = _interned(keywords)
+        self.suggested_keywords = _interned(suggested_keywords)
+        self.action_items = tuple(action_items or ())
+
+    @classmethod
+    def from_dict(cls, entry: Dict) -> "DiaryRecord":
+        return cls(
+            entry.get('id'), entry.get('date', ''), entry.get('time', ''), entry.get('mood', ''),
+            entry.get('summary', ''), entry.get('keywords'), entry.get('suggested_keywords'),
+            entry.get('action_items')
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'date': self.date,
+            'time': self.time,
+            'mood': self.mood,
+            'summary': self.summary,
+            'keywords': list(self.keywords),
+            'suggested_keywords': list(self.suggested_keywords),
+            'action_items': list(self.action_items)
+        }
+
+    def __repr__(self) -> str:
+        return f"DiaryRecord(id={self.id!r}, date={self.date!r}, time={self.time!r}, mood={self.mood!r})"
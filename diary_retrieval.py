@@ -0,0 +1,160 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import get_data_version, load_diary_summaries_from_db
+
+# ✅ 지난 일기 검색(BM25) 설정
+BM25_K1 = 1.5
+BM25_B = 0.75
+# 대화에 넣을 지난 일기 수와 토큰 예산 (PromptBuilder가 다시 예산 안에서 줄일 수 있음)
+RETRIEVAL_TOP_K = 3
+RETRIEVAL_TOKEN_BUDGET = 240
+# 이 점수보다 낮으면 관련 없는 일기로 보고 넣지 않음
+RETRIEVAL_MIN_SCORE = 0.5
+# 세션별로 기억하는 검색 결과 수
+SESSION_CACHE_SIZE = 32
+
+_WORD_PATTERN = re.compile(r"[가-힣a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """BM25용 토큰 (단어 + 한글 단어의 글자 2개 묶음)
+
+    조사가 붙어도("시험을", "시험이") 같은 일기를 찾을 수 있도록 글자 묶음을 함께 쓴다.
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall((text or "").lower()):
+        tokens.append(word)
+        if len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+def diary_search_text(diary: Dict) -> str:
+    """검색 대상 문장 (요약 + 감정 키워드 + 조언)"""
+    return " ".join([diary.get('summary', '')] + diary.get('keywords', []) + diary.get('action_items', []))
+
+class BM25Index:
+    """지난 일기 요약 BM25 역색인"""
+
+    def __init__(self, diaries: List[Dict]):
+        self.diaries = diaries
+        self._postings = {}
+        self._lengths = []
+
+        for position, diary in enumerate(diaries):
+            term_counts = Counter(tokenize(diary_search_text(diary)))
+            self._lengths.append(sum(term_counts.values()))
+            for term, count in term_counts.items():
+                self._postings.setdefault(term, []).append((position, count))
+
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_count = len(diaries)
+        self._idf = {
+            term: math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, top_k: int) -> List[Tuple[Dict, float]]:
+        """(일기, 점수) 목록, 점수 높은 순"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for position, count in self._postings[term]:
+                length_norm = 1 - BM25_B + BM25_B * self._lengths[position] / (self._average_length or 1)
+                scores[position] = scores.get(position, 0.0) + idf * count * (BM25_K1 + 1) / (count + BM25_K1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.diaries[position], score) for position, score in ranked]
+
+class RetrievalCache:
+    """세션별 검색 결과 캐시 (최근에 쓴 SESSION_CACHE_SIZE개만 기억)
+
+    세션 상태에 들어 있지만 ChatJobQueue 스레드에서 읽고 쓰므로 잠금으로 보호한다.
+    """
+
+    def __init__(self, max_size: int = SESSION_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self.max_size = max_size
+
+    def get(self, key) -> Optional[List[Dict]]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key, result: List[Dict]):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+class DiaryRetriever:
+    """DB의 지난 일기로 BM25 인덱스를 만들고 현재 메시지와 관련된 일기를 고르는 검색기
+
+    인덱스는 프로세스 전체에서 공유하고, 일기가 추가/삭제/복원되어 데이터 버전이 바뀌었을 때만 다시 만든다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self.signature = None
+
+    def _current_index(self) -> Tuple[BM25Index, int]:
+        signature = get_data_version()
+        with self._lock:
+            if self._index is None or signature != self.signature:
+                self._index = BM25Index(load_diary_summaries_from_db())
+                self.signature = signature
+            return self._index, self.signature
+
+    def retrieve(self, query: str, count_tokens: Optional[Callable[[str], int]] = None,
+                 top_k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+                 cache: Optional[RetrievalCache] = None) -> List[Dict]:
+        """현재 메시지와 관련된 지난 일기 (get_ai_response의 context 형식)
+
+        토큰 예산 안에 들어가는 만큼만 고르고, 덜 관련된 것부터 앞에 둔다
+        (PromptBuilder는 목록의 뒤쪽 항목을 먼저 넣음).
+        cache에 세션별 RetrievalCache를 넘기면 같은 메시지/같은 DB 상태의 결과를 재사용한다.
+        """
+        try:
+            index, signature = self._current_index()
+            cache_key = (query.strip(), signature, top_k, token_budget)
+            if cache is not None:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            selected = []
+            used_tokens = 0
+            for diary, score in index.search(query, top_k * 3):
+                if score < RETRIEVAL_MIN_SCORE or len(selected) >= top_k:
+                    break
+                tokens = count_tokens(diary['summary']) if count_tokens else len(diary['summary'])
+                if used_tokens + tokens > token_budget:
+                    continue
+                used_tokens += tokens
+                selected.append({
+                    'date': diary['date'],
+                    'summary': diary['summary'],
+                    'action_items': diary.get('action_items', []),
+                    'score': round(score, 2)
+                })
+            selected.reverse()
+
+            if cache is not None:
+                cache.put(cache_key, selected)
+            return selected
+        except Exception as e:
+            print(f"지난 일기 검색 오류: {e}")
+            return []
@@ -0,0 +1,109 @@
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# ✅ 감정 통계 설정
+# 자주 쓴 감정 키워드로 보여줄 개수
+POPULAR_KEYWORD_COUNT = 10
+
+class DiaryStats:
+    """기분별 개수, 감정 키워드 개수, 일기 쓴 날짜를 들고 있는 통계
+
+    처음 한 번만 전체 일기로 만들고, 이후에는 저장/삭제/복원 때마다 add()/remove()로
+    해당 일기만 반영한다. version이 세션의 diary_version과 다르면 새로 만든다.
+    """
+
+    def __init__(self, entries: List[Dict], version: int = 0):
+        self.version = version
+        self.total = 0
+        self.mood_counts = Counter()
+        self.keyword_counts = Counter()
+        self.date_counts = Counter()
+        self._first_date = None
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: Dict):
+        self.total += 1
+        self.mood_counts[entry.get('mood', '알 수 없음')] += 1
+        self.keyword_counts.update(entry.get('keywords', []))
+        entry_date = entry.get('date')
+        if entry_date:
+            self.date_counts[entry_date] += 1
+            if self._first_date is not None and entry_date < self._first_date:
+                self._first_date = entry_date
+
+    def remove(self, entry: Dict):
+        self.total = max(0, self.total - 1)
+        _decrement(self.mood_counts, entry.get('mood', '알 수 없음'))
+        for keyword in entry.get('keywords', []):
+            _decrement(self.keyword_counts, keyword)
+        entry_date = entry.get('date')
+        if entry_date and _decrement(self.date_counts, entry_date) and entry_date == self._first_date:
+            # 첫 날짜가 사라졌으면 다음에 물어볼 때 다시 찾음
+            self._first_date = None
+
+    @property
+    def first_date(self) -> Optional[str]:
+        """가장 오래된 일기 날짜 ('YYYY-MM-DD')"""
+        if self._first_date is None and self.date_counts:
+            self._first_date = min(self.date_counts)
+        return self._first_date
+
+    def consecutive_days(self, today: Optional[date] = None) -> int:
+        """오늘(오늘 안 썼으면 어제)부터 거꾸로 며칠 연속으로 일기를 썼는지 (연속된 날 수만큼만 확인)"""
+        day = today or date.today()
+        if day.isoformat() not in self.date_counts:
+            day -= timedelta(days=1)
+
+        consecutive = 0
+        while day.isoformat() in self.date_counts:
+            consecutive += 1
+            day -= timedelta(days=1)
+        return consecutive
+
+    def emotion_stats(self) -> Optional[Dict]:
+        """기분 분포와 자주 쓴 감정 키워드 (generate_emotion_stats 형식)"""
+        total = sum(self.mood_counts.values())
+        if not total:
+            return None
+
+        mood_stats = [
+            {'mood': mood, 'count': count, 'percentage': round(count / total * 100, 1)}
+            for mood, count in self.mood_counts.items()
+        ]
+        return {
+            'mood_stats': sorted(mood_stats, key=lambda x: x['count'], reverse=True),
+            'popular_keywords': self.popular_keywords()
+        }
+
+    def popular_keywords(self, limit: int = POPULAR_KEYWORD_COUNT) -> List[Tuple[str, int]]:
+        return self.keyword_counts.most_common(limit)
+
+def _decrement(counter: Counter, key) -> bool:
+    """개수를 하나 줄이고 0이 되면 지움 (지웠으면 True)"""
+    if counter.get(key, 0) <= 1:
+        counter.pop(key, None)
+        return True
+    counter[key] -= 1
+    return False
+
+# 일기 목록에서 만들어 세션에 들고 있는 집계들 (add/remove/version을 가진 객체)
+INCREMENTAL_VIEW_KEYS = ('diary_stats', 'day_mood_grid')
+
+def apply_diary_event(session_state, event: str, entry: Dict):
+    """세션 일기 목록에 일기가 추가("add")되거나 빠진("remove") 뒤 통계/집계를 갱신하고 버전을 올림
+
+    집계가 지금 버전과 맞으면 그 일기만 반영하고, 아니면 다음에 읽을 때 새로 만들어진다.
+    """
+    version = session_state.get('diary_version', 0)
+    for key in INCREMENTAL_VIEW_KEYS:
+        view = session_state.get(key)
+        if view is None or view.version != version:
+            continue
+        if event == "add":
+            view.add(entry)
+        else:
+            view.remove(entry)
+        view.version = version + 1
+    session_state['diary_version'] = version + 1
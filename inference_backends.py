@@ -0,0 +1,593 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from profiling import get_profiler
+
+# ✅ 추론 백엔드 설정
+# MINDTALK_INFERENCE_BACKEND: transformers(기본) | onnxruntime | fake
+INFERENCE_BACKEND = os.environ.get("MINDTALK_INFERENCE_BACKEND", "transformers")
+# ONNX로 내보낸 그래프를 저장/재사용할 폴더 (비어 있으면 처음 로딩 때 내보냄)
+ONNX_MODEL_PATH = os.environ.get("MINDTALK_ONNX_PATH", "onnx_model")
+
+# 임베딩 계산에 쓰는 최대 토큰 수 (일기 요약은 보통 이보다 짧음)
+EMBEDDING_MAX_TOKENS = 256
+FAKE_EMBEDDING_DIM = 64
+
+# 목록 항목으로 보는 줄 (- 조언, • 조언, 1. 조언)
+_LIST_ITEM_PATTERN = re.compile(r'^([-•*]|\d+[.)])\s*\S')
+
+def find_stop_reason(text: str, policy: Optional[Dict]) -> Optional[str]:
+    """생성 중인 문장이 정지 정책에 걸리면 그 이유를 돌려줌 (계속 생성해도 되면 None)
+
+    policy 항목:
+    - stop_sequences: 나오면 바로 멈출 문자열 (예: 다음 차례의 "사용자:")
+    - max_sentences: '.'로 끝난 서로 다른 문장이 이만큼 나오면 멈춤
+    - list_header / max_list_items: 머리말 아래 목록 줄이 이만큼 완성되면 멈춤
+    """
+    if not policy or not text:
+        return None
+
+    stripped = text.lstrip()
+    for sequence in policy.get("stop_sequences", ()):
+        if sequence in stripped:
+            return "stop_sequence"
+
+    max_sentences = policy.get("max_sentences")
+    if max_sentences:
+        # 마지막 조각은 아직 끝나지 않은 문장
+        completed = {sentence.strip() for sentence in text.split('.')[:-1] if sentence.strip()}
+        if len(completed) >= max_sentences:
+            return "max_sentences"
+
+    list_header = policy.get("list_header")
+    max_list_items = policy.get("max_list_items")
+    if list_header and max_list_items:
+        header_index = text.find(list_header)
+        if header_index >= 0:
+            # 머리말 줄과 아직 끝나지 않은 마지막 줄은 제외
+            lines = text[header_index:].split('\n')[1:-1]
+            items = [line for line in lines if _LIST_ITEM_PATTERN.match(line.strip())]
+            if len(items) >= max_list_items:
+                return "max_list_items"
+
+    return None
+
+class InferenceBackend:
+    """추론 백엔드 공통 인터페이스 (load, generate, stream, count_tokens)"""
+
+    name = "base"
+    device = "cpu"
+
+    def __init__(self, model_name: str, max_length: int = 2048):
+        self.model_name = model_name
+        self.max_length = max_length
+
+    def load(self):
+        """모델과 토크나이저 로드"""
+        raise NotImplementedError
+
+    def configure_threads(self, policy):
+        """실행 정책에 맞춰 추론 스레드 수 설정 (load 전에 호출)"""
+        pass
+
+    def is_loaded(self) -> bool:
+        raise NotImplementedError
+
+    def encode(self, text: str) -> List[int]:
+        raise NotImplementedError
+
+    def decode(self, token_ids: List[int]) -> str:
+        raise NotImplementedError
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encode(text)) if text else 0
+
+    def generate(self, prompt: str, max_new_tokens: int, temperature: float,
+                 call_type: str = "chat", speculative: Optional[bool] = None,
+                 stop_policy: Optional[Dict] = None) -> Dict:
+        """텍스트 생성
+
+        반환값: text(후처리 전 생성 문장), prompt_tokens, completion_tokens,
+        prefill_ms(첫 토큰까지), decode_seconds(이후 토큰 생성 시간), stop_reason(정지 정책으로
+        일찍 멈췄으면 그 이유), extra(백엔드별 추가 정보)
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: str, max_new_tokens: int, temperature: float,
+               call_type: str = "chat") -> Iterator[str]:
+        """생성되는 문장을 조각 단위로 내보냄"""
+        raise NotImplementedError
+
+    def embed(self, texts: List[str]):
+        """문장 임베딩 (L2 정규화된 float32 배열, 문장 수 × 차원)"""
+        raise NotImplementedError(f"{self.name} 백엔드는 임베딩을 지원하지 않아요")
+
+class _TimingStreamer:
+    """generate()가 첫 생성 토큰을 내보내는 시점을 기록하는 스트리머 (프리필 시간 측정용)"""
+
+    def __init__(self):
+        self._prompt_seen = False
+        self.first_token_at = None
+
+    def put(self, value):
+        # 첫 호출은 프롬프트 전체, 이후 호출부터 생성 토큰
+        if not self._prompt_seen:
+            self._prompt_seen = True
+        elif self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def end(self):
+        pass
+
+class _PolicyStoppingCriteria:
+    """정지 정책에 걸리면 generate()를 멈추는 StoppingCriteria
+
+    매 단계 전체 생성 문장을 다시 디코딩하지 않고 새 토큰만 디코딩해 이어 붙임.
+    토큰 하나만 따로 디코딩하면 앞 공백이 사라지거나 한글이 바이트 중간에서 잘리므로,
+    직전 토큰 몇 개(prefix_offset~read_offset)를 앞에 붙여 디코딩한 뒤 늘어난 부분만 씀
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, policy: Dict):
+        self.tokenizer = tokenizer
+        self.policy = policy
+        self.reason = None
+        self.text = ""
+        self.prefix_offset = prompt_length
+        self.read_offset = prompt_length
+
+    def _append_new_text(self, token_ids) -> bool:
+        """새 토큰을 디코딩해 self.text에 붙임 (붙은 글자가 없으면 False)"""
+        prefix_text = self.tokenizer.decode(token_ids[self.prefix_offset:self.read_offset], skip_special_tokens=True)
+        full_text = self.tokenizer.decode(token_ids[self.prefix_offset:], skip_special_tokens=True)
+        # 다음 토큰까지 봐야 완성되는 글자(바이트 조각)면 기다림
+        if len(full_text) <= len(prefix_text) or full_text.endswith("\ufffd"):
+            return False
+        self.text += full_text[len(prefix_text):]
+        self.prefix_offset = self.read_offset
+        self.read_offset = len(token_ids)
+        return True
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        if self.reason is None and self._append_new_text(input_ids[0].tolist()):
+            self.reason = find_stop_reason(self.text, self.policy)
+        return torch.full((input_ids.shape[0],), self.reason is not None, dtype=torch.bool, device=input_ids.device)
+
+class _ForwardCounter:
+    """모델 forward 호출 횟수를 스레드별로 세는 훅 (추측 디코딩 수락률 계산용)"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, module, args):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self) -> int:
+        return getattr(self._local, "count", 0)
+
+# ✅ transformers 백엔드 (AutoModelForCausalLM + model.generate)
+class TransformersBackend(InferenceBackend):
+    """허깅페이스 transformers 모델로 생성하는 기본 백엔드"""
+
+    name = "transformers"
+
+    def __init__(self, model_name: str, max_length: int = 2048,
+                 draft_model_name: str = "", speculative_call_types=None, snapshot_path: str = ""):
+        super().__init__(model_name, max_length)
+        import torch
+
+        # 미리 받아 둔 스냅샷이 있으면 허브 대신 그 폴더에서 로드
+        self.snapshot_path = snapshot_path
+
+        self.tokenizer = None
+        self.model = None
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.draft_model_name = draft_model_name
+        self.draft_model = None
+        self.draft_tokenizer = None
+        self.speculative_call_types = set(speculative_call_types or ())
+        self._main_forward_counter = _ForwardCounter()
+        self._draft_forward_counter = _ForwardCounter()
+
+    def _source_options(self) -> Dict:
+        """from_pretrained에 넘길 로딩 위치 (스냅샷이면 검사 후 오프라인 로드)"""
+        if not self.snapshot_path:
+            return {"pretrained_model_name_or_path": self.model_name}
+
+        from model_snapshot import VERIFY_CHECKSUMS, validate_snapshot
+
+        problems = validate_snapshot(self.snapshot_path, verify_checksums=VERIFY_CHECKSUMS)
+        if problems:
+            raise RuntimeError("모델 스냅샷에 문제가 있어요: " + ", ".join(problems))
+        return {"pretrained_model_name_or_path": self.snapshot_path, "local_files_only": True}
+
+    def load(self):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        source = self._source_options()
+
+        # 토크나이저 로드
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            **source,
+            trust_remote_code=True
+        )
+
+        # 모델 로드
+        # safetensors는 메모리 매핑으로 읽고, low_cpu_mem_usage로 빈 모델을 먼저 만들지 않아서
+        # 가중치가 메모리에 두 번 올라가지 않음 (CPU에서는 이미 CPU에 있으므로 .to() 복사도 생략)
+        self.model = AutoModelForCausalLM.from_pretrained(
+            **source,
+            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+            device_map="auto" if self.device == "cuda" else None,
+            low_cpu_mem_usage=True,
+            use_safetensors=True if self.snapshot_path else None,
+            trust_remote_code=True
+        )
+
+        self._prepare_tokenizer()
+
+        if self.draft_model_name:
+            self._load_draft_model()
+
+    def configure_threads(self, policy):
+        policy.configure_torch()
+
+    def _prepare_tokenizer(self):
+        # 패딩 토큰 설정
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        # 예산을 넘는 프롬프트가 들어와도 마지막 질문과 응답 신호는 잘리지 않도록 앞에서부터 자름
+        self.tokenizer.truncation_side = "left"
+
+    def _load_draft_model(self):
+        """추측 디코딩용 초안 모델 로드 (실패해도 일반 생성으로 계속 동작)"""
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        try:
+            print(f"🤖 초안 모델 로딩 중... ({self.draft_model_name})")
+
+            draft_tokenizer = AutoTokenizer.from_pretrained(
+                self.draft_model_name,
+                trust_remote_code=True
+            )
+            draft_model = AutoModelForCausalLM.from_pretrained(
+                self.draft_model_name,
+                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+                device_map="auto" if self.device == "cuda" else None,
+                low_cpu_mem_usage=True,
+                trust_remote_code=True
+            )
+
+            # 어휘가 같으면 토큰 단위로 바로 검증, 다르면 텍스트 기준(universal assisted generation)으로 검증
+            if draft_tokenizer.get_vocab() == self.tokenizer.get_vocab():
+                self.draft_tokenizer = None
+            else:
+                print("💡 초안 모델의 토크나이저가 달라서 텍스트 기준으로 검증해요.")
+                self.draft_tokenizer = draft_tokenizer
+
+            self.model.register_forward_pre_hook(self._main_forward_counter)
+            draft_model.register_forward_pre_hook(self._draft_forward_counter)
+            self.draft_model = draft_model
+
+            print("✅ 초안 모델 로딩 완료!")
+
+        except Exception as e:
+            print(f"⚠️ 초안 모델 로딩 실패, 일반 생성을 사용해요: {e}")
+            self.draft_model = None
+            self.draft_tokenizer = None
+
+    def is_loaded(self) -> bool:
+        return self.model is not None and self.tokenizer is not None
+
+    def encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, token_ids: List[int]) -> str:
+        return self.tokenizer.decode(token_ids, skip_special_tokens=True)
+
+    def _use_speculative(self, call_type: str, speculative: Optional[bool]) -> bool:
+        """이번 호출에 추측 디코딩을 쓸지 결정 (speculative 인자가 있으면 설정보다 우선)"""
+        if self.draft_model is None:
+            return False
+        if speculative is not None:
+            return speculative
+        return call_type in self.speculative_call_types
+
+    def _encode_prompt(self, prompt: str, max_new_tokens: int):
+        inputs = self.tokenizer.encode(prompt, return_tensors="pt", max_length=self.max_length-max_new_tokens, truncation=True)
+        return inputs.to(self.device)
+
+    def _generation_config(self, max_new_tokens: int, temperature: float) -> Dict:
+        return {
+            "max_new_tokens": max_new_tokens,
+            "temperature": temperature,
+            "do_sample": True,
+            "top_p": 0.9,
+            "pad_token_id": self.tokenizer.eos_token_id,
+            "eos_token_id": self.tokenizer.eos_token_id,
+            "repetition_penalty": 1.1
+        }
+
+    def generate(self, prompt: str, max_new_tokens: int, temperature: float,
+                 call_type: str = "chat", speculative: Optional[bool] = None,
+                 stop_policy: Optional[Dict] = None) -> Dict:
+        import torch
+        from transformers import StoppingCriteriaList
+
+        profiler = get_profiler()
+
+        # 입력 토큰화
+        with profiler.stage(call_type, "tokenize") as sample:
+            inputs = self._encode_prompt(prompt, max_new_tokens)
+            sample["tokens"] = int(inputs.shape[1])
+
+        # 생성 설정
+        timing_streamer = _TimingStreamer()
+        generation_config = self._generation_config(max_new_tokens, temperature)
+        generation_config["streamer"] = timing_streamer
+
+        # 후처리에서 버릴 부분은 아예 생성하지 않도록 정지 조건 추가
+        stopping_criteria = None
+        if stop_policy:
+            stopping_criteria = _PolicyStoppingCriteria(self.tokenizer, inputs.shape[1], stop_policy)
+            generation_config["stopping_criteria"] = StoppingCriteriaList([stopping_criteria])
+
+        # 추측 디코딩 (초안 모델이 제안한 토큰을 본 모델이 검증)
+        use_speculative = self._use_speculative(call_type, speculative)
+        if use_speculative:
+            generation_config["assistant_model"] = self.draft_model
+            if self.draft_tokenizer is not None:
+                generation_config["tokenizer"] = self.tokenizer
+                generation_config["assistant_tokenizer"] = self.draft_tokenizer
+            self._main_forward_counter.reset()
+            self._draft_forward_counter.reset()
+
+        # 텍스트 생성
+        generate_started = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model.generate(inputs, **generation_config)
+        generate_finished = time.perf_counter()
+
+        # 디코딩 (입력 부분 제외)
+        new_tokens = outputs[0][inputs.shape[1]:]
+        completion_tokens = int(new_tokens.shape[0])
+        first_token_at = timing_streamer.first_token_at or generate_finished
+
+        extra = {"speculative": use_speculative}
+        if use_speculative:
+            # 검증 1회마다 (수락된 초안 토큰 + 본 모델 토큰 1개)가 나오므로
+            # 수락된 초안 토큰 = 생성 토큰 - 본 모델 forward 횟수 (근사치)
+            draft_tokens = self._draft_forward_counter.count
+            accepted_tokens = max(0, completion_tokens - self._main_forward_counter.count)
+            extra.update({
+                "draft_tokens": draft_tokens,
+                "accepted_draft_tokens": accepted_tokens,
+                "acceptance_rate": round(accepted_tokens / draft_tokens, 3) if draft_tokens else 0.0
+            })
+
+        # 토큰 → 문자열
+        with profiler.stage(call_type, "detokenize") as sample:
+            text = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+            sample["tokens"] = completion_tokens
+
+        return {
+            "text": text,
+            "prompt_tokens": int(inputs.shape[1]),
+            "completion_tokens": completion_tokens,
+            "prefill_ms": (first_token_at - generate_started) * 1000,
+            "decode_seconds": generate_finished - first_token_at,
+            "stop_reason": stopping_criteria.reason if stopping_criteria else None,
+            "extra": extra
+        }
+
+    def stream(self, prompt: str, max_new_tokens: int, temperature: float,
+               call_type: str = "chat") -> Iterator[str]:
+        import torch
+        from transformers import TextIteratorStreamer
+
+        inputs = self._encode_prompt(prompt, max_new_tokens)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        generation_config = self._generation_config(max_new_tokens, temperature)
+        generation_config["streamer"] = streamer
+
+        def _run():
+            with torch.no_grad():
+                self.model.generate(inputs, **generation_config)
+
+        thread = threading.Thread(target=_run, name="mindtalk-stream", daemon=True)
+        thread.start()
+        for chunk in streamer:
+            yield chunk
+        thread.join()
+
+    def embed(self, texts: List[str]):
+        import numpy as np
+        import torch
+
+        # 임베딩은 문장 앞부분을 남기고 자름 (프롬프트용 truncation_side="left" 설정은 건드리지 않음)
+        token_ids = [self.encode(text or " ")[:EMBEDDING_MAX_TOKENS] for text in texts]
+        inputs = self.tokenizer.pad({"input_ids": token_ids}, padding=True, return_tensors="pt")
+        inputs = {key: value.to(self.device) for key, value in inputs.items()}
+
+        with torch.inference_mode():
+            outputs = self.model(**inputs, output_hidden_states=True, use_cache=False)
+
+        # 마지막 은닉층을 실제 토큰 위치만 평균 (mean pooling)
+        hidden = outputs.hidden_states[-1].float()
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        pooled = torch.nn.functional.normalize(pooled, dim=-1)
+        return pooled.cpu().numpy().astype(np.float32)
+
+# ✅ ONNX Runtime 백엔드 (CPU 서빙용, KV 캐시 IO 바인딩)
+class OnnxRuntimeBackend(TransformersBackend):
+    """optimum으로 내보낸 ONNX 그래프를 ONNX Runtime CPU에서 실행하는 백엔드
+
+    그래프는 KV 캐시 입출력(use_cache)을 포함해서 내보내고, IO 바인딩으로
+    캐시 텐서를 매 토큰마다 복사하지 않고 재사용한다.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_name: str, max_length: int = 2048, onnx_path: str = ONNX_MODEL_PATH,
+                 snapshot_path: str = ""):
+        # 추측 디코딩은 transformers 백엔드에서만 지원
+        super().__init__(model_name, max_length, snapshot_path=snapshot_path)
+        self.device = "cpu"
+        self.onnx_path = onnx_path
+        self.intra_op_threads = 0
+        self.inter_op_threads = 0
+
+    def configure_threads(self, policy):
+        # 전처리/후처리에 쓰는 torch와 ONNX Runtime 세션 모두 같은 스레드 수를 씀
+        policy.configure_torch()
+        self.intra_op_threads = policy.intra_op_threads
+        self.inter_op_threads = policy.inter_op_threads
+
+    def load(self):
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError as e:
+            raise ImportError("ONNX Runtime 백엔드를 쓰려면 optimum[onnxruntime] 패키지가 필요해요.") from e
+        from transformers import AutoTokenizer
+
+        session_options = onnxruntime.SessionOptions()
+        if self.intra_op_threads:
+            session_options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            session_options.inter_op_num_threads = self.inter_op_threads
+
+        exported = os.path.isdir(self.onnx_path) and any(
+            name.endswith(".onnx") for name in os.listdir(self.onnx_path)
+        )
+        # 그래프를 처음 내보낼 때는 스냅샷(있으면)에서 원본 가중치를 읽음
+        source = {"pretrained_model_name_or_path": self.onnx_path} if exported else self._source_options()
+
+        self.tokenizer = AutoTokenizer.from_pretrained(**source, trust_remote_code=True)
+        self.model = ORTModelForCausalLM.from_pretrained(
+            **source,
+            export=not exported,
+            use_cache=True,
+            use_io_binding=True,
+            provider="CPUExecutionProvider",
+            session_options=session_options,
+            trust_remote_code=True
+        )
+
+        # 처음 내보낸 그래프는 저장해서 다음 시작부터 재사용
+        if not exported:
+            print(f"💾 ONNX 그래프 저장 중... ({self.onnx_path})")
+            self.model.save_pretrained(self.onnx_path)
+            self.tokenizer.save_pretrained(self.onnx_path)
+
+        self._prepare_tokenizer()
+
+    def embed(self, texts: List[str]):
+        # 내보낸 그래프는 로짓과 KV 캐시만 출력해서 은닉 상태를 꺼낼 수 없음
+        raise NotImplementedError("onnxruntime 백엔드는 임베딩을 지원하지 않아요")
+
+# ✅ 테스트용 가짜 백엔드 (모델 없이 항상 같은 결과)
+class FakeBackend(InferenceBackend):
+    """모델 없이 입력에 따라 항상 같은 응답을 돌려주는 테스트용 백엔드 (글자 1개 = 토큰 1개)"""
+
+    name = "fake"
+
+    def __init__(self, model_name: str = "fake", max_length: int = 2048):
+        super().__init__(model_name, max_length)
+        self._loaded = False
+
+    def load(self):
+        self._loaded = True
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def encode(self, text: str) -> List[int]:
+        return [ord(char) for char in text]
+
+    def decode(self, token_ids: List[int]) -> str:
+        return "".join(chr(token_id) for token_id in token_ids)
+
+    def _respond(self, prompt: str) -> str:
+        if "감정키워드:" in prompt and "액션아이템:" in prompt:
+            return ("요약: 오늘 있었던 일을 함께 이야기했어요.\n"
+                    "감정키워드: #기쁨, #안도, #걱정, #설렘, #피곤\n"
+                    "액션아이템:\n"
+                    "- 오늘 하루 수고한 나를 칭찬해봐요\n"
+                    "- 따뜻한 물 한 잔 마시는 것도 좋답니다\n"
+                    "- 내일도 천천히 해봐요")
+        if prompt.rstrip().endswith("요약:"):
+            return "사용자는 오늘 있었던 일과 감정을 이야기했어요."
+
+        # 마지막 사용자 메시지를 짧게 되짚는 응답
+        user_lines = re.findall(r"^사용자: (.*)$", prompt, flags=re.M)
+        topic = user_lines[-1].strip()[:20] if user_lines else "오늘 이야기"
+        return f"{topic}에 대해 이야기해줘서 고마워요. 그때 기분이 어땠어요?"
+
+    def generate(self, prompt: str, max_new_tokens: int, temperature: float,
+                 call_type: str = "chat", speculative: Optional[bool] = None,
+                 stop_policy: Optional[Dict] = None) -> Dict:
+        with get_profiler().stage(call_type, "tokenize") as sample:
+            prompt_ids = self.encode(prompt)[-(self.max_length - max_new_tokens):]
+            sample["tokens"] = len(prompt_ids)
+        response = self._respond(prompt)
+
+        # 한 글자(토큰)씩 "생성"하면서 정지 정책 확인
+        text = ""
+        stop_reason = None
+        for char in response[:max_new_tokens]:
+            text += char
+            stop_reason = find_stop_reason(text, stop_policy)
+            if stop_reason:
+                break
+
+        return {
+            "text": text,
+            "prompt_tokens": len(prompt_ids),
+            "completion_tokens": len(text),
+            "prefill_ms": 0.0,
+            "decode_seconds": 0.0,
+            "stop_reason": stop_reason,
+            "extra": {"speculative": False}
+        }
+
+    def stream(self, prompt: str, max_new_tokens: int, temperature: float,
+               call_type: str = "chat") -> Iterator[str]:
+        text = self.generate(prompt, max_new_tokens, temperature, call_type)["text"]
+        for word in re.findall(r"\S+\s*", text):
+            yield word
+
+    def embed(self, texts: List[str]):
+        import numpy as np
+
+        # 글자 2개 묶음(bigram)을 해시해서 세는 간단한 임베딩 (같은 단어가 많을수록 가까움)
+        vectors = np.zeros((len(texts), FAKE_EMBEDDING_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            compact = re.sub(r"\s+", "", text or "")
+            for i in range(len(compact) - 1):
+                bucket = (ord(compact[i]) * 31 + ord(compact[i + 1])) % FAKE_EMBEDDING_DIM
+                vectors[row, bucket] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-6)
+
+def create_backend(name: str, model_name: str, max_length: int = 2048, **options) -> InferenceBackend:
+    """설정 이름으로 백엔드 생성"""
+    if name == "transformers":
+        return TransformersBackend(model_name, max_length, **options)
+    if name == "onnxruntime":
+        return OnnxRuntimeBackend(model_name, max_length, snapshot_path=options.get("snapshot_path", ""))
+    if name == "fake":
+        return FakeBackend(model_name, max_length)
+    raise ValueError(f"알 수 없는 추론 백엔드: {name}")
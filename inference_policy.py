@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from profiling import percentile
+
+# ✅ 추론 실행 정책 설정
+# 동시에 생성할 수 있는 요청 수 (기본: 코어 4개당 1개)
+MAX_CONCURRENT_ENV = "MINDTALK_MAX_CONCURRENT_GENERATIONS"
+# 생성 1건이 쓰는 intra-op 스레드 수 (기본: 코어 수 / 동시 생성 수)
+INTRA_OP_THREADS_ENV = "MINDTALK_INTRA_OP_THREADS"
+# 이 프로세스가 쓸 CPU 코어 (예: "0-7" 또는 "0,2,4,6", 비어 있으면 제한 없음)
+CPU_AFFINITY_ENV = "MINDTALK_CPU_AFFINITY"
+
+# 대기 시간 통계에 쓰는 최근 표본 수
+WAIT_SAMPLE_SIZE = 512
+
+def parse_cpu_list(value: str) -> List[int]:
+    """'0-3,6' 형식의 CPU 목록 파싱"""
+    cpus = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+def available_cpus() -> List[int]:
+    """이 프로세스가 실제로 쓸 수 있는 CPU 코어 목록"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def set_cpu_affinity(cpus: List[int]) -> bool:
+    """프로세스를 지정한 코어에 고정 (지원하지 않는 OS에서는 무시)"""
+    if not cpus:
+        return False
+    try:
+        os.sched_setaffinity(0, set(cpus))
+        return True
+    except (AttributeError, OSError) as e:
+        print(f"⚠️ CPU 고정 실패: {e}")
+        return False
+
+def cpu_slice_for_worker(index: int, worker_count: int, cpus: Optional[List[int]] = None) -> List[int]:
+    """워커 풀에서 index번째 워커가 쓸 코어 묶음 (코어를 겹치지 않게 나눔)"""
+    cpus = cpus or available_cpus()
+    per_worker = max(1, len(cpus) // max(1, worker_count))
+    start = (index * per_worker) % len(cpus)
+    return cpus[start:start + per_worker]
+
+class ExecutionPolicy:
+    """생성 요청 동시 실행 수와 CPU 스레드 수를 함께 정하는 실행 정책
+
+    동시에 도는 생성 수 × 생성 1건의 스레드 수가 코어 수를 넘지 않게 해서
+    동시 접속이 몰려도 코어를 과하게 나눠 쓰지 않도록 한다.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, intra_op_threads: Optional[int] = None,
+                 cpu_affinity: Optional[List[int]] = None):
+        if cpu_affinity:
+            set_cpu_affinity(cpu_affinity)
+
+        cores = len(available_cpus())
+        self.cores = cores
+        self.max_concurrent = max(1, max_concurrent or max(1, cores // 4))
+        self.intra_op_threads = max(1, intra_op_threads or cores // self.max_concurrent)
+        self.inter_op_threads = 1
+
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._waits_ms = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._active = 0
+        self._waiting = 0
+        self._completed = 0
+        self._torch_configured = False
+
+    @classmethod
+    def from_env(cls) -> "ExecutionPolicy":
+        max_concurrent = os.environ.get(MAX_CONCURRENT_ENV)
+        intra_op_threads = os.environ.get(INTRA_OP_THREADS_ENV)
+        return cls(
+            max_concurrent=int(max_concurrent) if max_concurrent else None,
+            intra_op_threads=int(intra_op_threads) if intra_op_threads else None,
+            cpu_affinity=parse_cpu_list(os.environ.get(CPU_AFFINITY_ENV, ""))
+        )
+
+    def configure_torch(self):
+        """torch 스레드 수 설정 (프로세스 전체에 적용, 한 번만)"""
+        if self._torch_configured:
+            return
+        import torch
+
+        torch.set_num_threads(self.intra_op_threads)
+        try:
+            # interop 스레드는 병렬 작업이 시작되기 전에만 바꿀 수 있음
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError as e:
+            print(f"⚠️ torch interop 스레드 설정 실패: {e}")
+        self._torch_configured = True
+        print(f"🧵 추론 스레드 설정: 동시 생성 {self.max_concurrent}개 × {self.intra_op_threads}스레드 (코어 {self.cores}개)")
+
+    @contextmanager
+    def slot(self):
+        """생성 1건 실행 구간 (자리가 날 때까지 기다리고 대기 시간을 기록)"""
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        self._semaphore.acquire()
+        wait_ms = (time.perf_counter() - queued_at) * 1000
+        with self._lock:
+            self._waiting -= 1
+            self._active += 1
+            self._waits_ms.append(wait_ms)
+        try:
+            yield wait_ms
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+            self._semaphore.release()
+
+    def get_metrics(self) -> Dict:
+        """동시 실행/대기 현황과 최근 대기 시간 분포"""
+        with self._lock:
+            waits = list(self._waits_ms)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "cores": self.cores,
+                "active": self._active,
+                "waiting": self._waiting,
+                "completed": self._completed,
+                "queue_wait_p50_ms": round(percentile(waits, 50), 1),
+                "queue_wait_p95_ms": round(percentile(waits, 95), 1),
+                "queue_wait_max_ms": round(max(waits), 1) if waits else 0.0
+            }
+
+_policy = None
+_policy_lock = threading.Lock()
+
+def get_execution_policy() -> ExecutionPolicy:
+    """프로세스 전체에서 공유하는 실행 정책"""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = ExecutionPolicy.from_env()
+        return _policy
@@ -0,0 +1,377 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+from inference_policy import cpu_slice_for_worker, get_execution_policy, set_cpu_affinity
+from profiling import get_profiler
+
+# ✅ 추론 워커 설정
+# MINDTALK_INFERENCE_WORKERS="127.0.0.1:6010,127.0.0.1:6011" 처럼 지정하면
+# 웹 프로세스는 모델을 직접 로딩하지 않고 워커에 생성 요청을 보냄
+WORKER_ADDRESSES_ENV = "MINDTALK_INFERENCE_WORKERS"
+# 워커와 웹 프로세스가 같은 값을 써야 함 (워커는 받은 요청을 pickle로 풀기 때문에 기본값 없이 반드시 지정)
+WORKER_AUTHKEY_ENV = "MINDTALK_INFERENCE_AUTHKEY"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 6010
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1"}
+# 웹 프로세스가 워커 준비를 기다리는 최대 시간 (초, 모델 로딩 포함)
+WORKER_READY_TIMEOUT = float(os.environ.get("MINDTALK_WORKER_READY_TIMEOUT", "300"))
+
+HEALTH_CHECK_INTERVAL = 5.0
+HEALTH_CHECK_TIMEOUT = 3.0
+MAX_MISSED_HEALTH_CHECKS = 3
+
+# 워커가 외부에 열어주는 AIModelManager 메서드
+ALLOWED_METHODS = {
+    "generate_response",
+    "generate_with_usage",
+    "get_ai_response",
+    "generate_conversation_summary",
+    "update_conversation_memory",
+    "count_tokens",
+    "embedding_model_id",
+    "embed_texts"
+}
+
+def parse_addresses(value: str) -> List[Tuple[str, int]]:
+    """'host:port,host:port' 형식의 주소 목록 파싱"""
+    addresses = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":")
+        addresses.append((host or DEFAULT_HOST, int(port)))
+    return addresses
+
+def get_configured_addresses() -> List[Tuple[str, int]]:
+    return parse_addresses(os.environ.get(WORKER_ADDRESSES_ENV, ""))
+
+def get_authkey() -> bytes:
+    """워커 인증 키 (설정되어 있지 않으면 워커도 클라이언트도 시작하지 않음)"""
+    authkey = os.environ.get(WORKER_AUTHKEY_ENV, "")
+    if not authkey:
+        raise RuntimeError(f"{WORKER_AUTHKEY_ENV}를 설정해야 추론 워커를 쓸 수 있어요.")
+    return authkey.encode()
+
+# ✅ 워커 프로세스 (AIModelManager를 소유하고 요청을 처리)
+class InferenceWorker:
+    """AIModelManager 하나를 소유하고 로컬 소켓으로 생성 요청을 처리하는 워커"""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.manager = None
+        self.error = None
+        self.started_at = time.time()
+        self.requests_served = 0
+        self._ready_event = threading.Event()
+
+    def _load_model(self):
+        try:
+            from ai_models import AIModelManager
+            manager = AIModelManager()
+            # 더미 생성으로 커널/캐시를 미리 준비
+            manager.generate_response("사용자: 안녕하세요\n루나:", max_new_tokens=4)
+            self.manager = manager
+            print(f"✅ 추론 워커 준비 완료 ({self.address[0]}:{self.address[1]}, pid={os.getpid()})")
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ 추론 워커 모델 로딩 실패: {e}")
+        finally:
+            self._ready_event.set()
+
+    def health(self) -> Dict:
+        return {
+            "ready": self.manager is not None,
+            "loading": not self._ready_event.is_set(),
+            "error": self.error,
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests_served": self.requests_served,
+            "load": getattr(self.manager, "load_stats", {}),
+            "profile": get_profiler().summarize(),
+            "execution": get_execution_policy().get_metrics()
+        }
+
+    def _handle_request(self, request: Dict) -> Dict:
+        method = request.get("method")
+        if method == "health":
+            return {"ok": True, "result": self.health()}
+
+        if method not in ALLOWED_METHODS:
+            return {"ok": False, "error": f"허용되지 않은 메서드: {method}"}
+
+        self._ready_event.wait()
+        if self.manager is None:
+            return {"ok": False, "error": f"모델이 로드되지 않았습니다: {self.error}"}
+
+        result = getattr(self.manager, method)(*request.get("args", ()), **request.get("kwargs", {}))
+        self.requests_served += 1
+        return {"ok": True, "result": result}
+
+    def _serve_connection(self, conn):
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    break
+                try:
+                    response = self._handle_request(request)
+                except Exception as e:
+                    print(f"추론 워커 요청 처리 오류: {e}")
+                    response = {"ok": False, "error": str(e)}
+                conn.send(response)
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        # 소켓을 먼저 열어서 모델 로딩 중에도 헬스 체크에 응답
+        listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._load_model, name="mindtalk-worker-load", daemon=True).start()
+        print(f"🛰️ 추론 워커 대기 중... ({self.address[0]}:{self.address[1]})")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"추론 워커 연결 오류: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+def _worker_main(address: Tuple[str, int], authkey: bytes, cpus: Optional[List[int]] = None):
+    # 모델을 올리기 전에 코어를 고정해야 스레드 수가 고정된 코어 기준으로 정해짐
+    if cpus:
+        set_cpu_affinity(cpus)
+    InferenceWorker(address, authkey).serve_forever()
+
+# ✅ 워커 풀 (여러 워커 프로세스 실행, 헬스 체크, 비정상 종료 시 재시작)
+class WorkerPool:
+    """추론 워커 프로세스들을 실행하고 감시하는 슈퍼바이저"""
+
+    def __init__(self, addresses: List[Tuple[str, int]], authkey: bytes, pin_cpus: bool = False):
+        self.addresses = addresses
+        self.authkey = authkey
+        # 워커마다 겹치지 않는 코어 묶음을 배정
+        self._cpu_slices = {
+            address: cpu_slice_for_worker(index, len(addresses)) if pin_cpus else None
+            for index, address in enumerate(addresses)
+        }
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = {}
+        self._missed_checks = {}
+        self._stopping = False
+
+    def _start_worker(self, address: Tuple[str, int]):
+        process = self._context.Process(target=_worker_main, args=(address, self.authkey, self._cpu_slices.get(address)),
+                                        name=f"mindtalk-worker-{address[1]}", daemon=True)
+        process.start()
+        self._processes[address] = process
+        self._missed_checks[address] = 0
+        print(f"🚀 추론 워커 시작: {address[0]}:{address[1]} (pid={process.pid})")
+
+    def _restart_worker(self, address: Tuple[str, int], reason: str):
+        print(f"🔁 추론 워커 재시작: {address[0]}:{address[1]} ({reason})")
+        process = self._processes.get(address)
+        if process is not None and process.is_alive():
+            process.terminate()
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+        self._start_worker(address)
+
+    def start(self):
+        for address in self.addresses:
+            self._start_worker(address)
+
+    def check_workers(self):
+        """프로세스 생존 여부와 헬스 체크 응답을 확인해서 필요하면 재시작"""
+        for address in self.addresses:
+            process = self._processes.get(address)
+            if process is None or not process.is_alive():
+                exit_code = process.exitcode if process is not None else None
+                self._restart_worker(address, f"프로세스 종료, exitcode={exit_code}")
+                continue
+
+            health = _call_worker(address, self.authkey, {"method": "health"}, timeout=HEALTH_CHECK_TIMEOUT)
+            if health is None:
+                self._missed_checks[address] += 1
+                if self._missed_checks[address] >= MAX_MISSED_HEALTH_CHECKS:
+                    self._restart_worker(address, "헬스 체크 응답 없음")
+            else:
+                self._missed_checks[address] = 0
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stopping:
+                time.sleep(HEALTH_CHECK_INTERVAL)
+                self.check_workers()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout=10)
+
+def _call_worker(address: Tuple[str, int], authkey: bytes, request: Dict,
+                 timeout: Optional[float] = None) -> Optional[Dict]:
+    """워커에 요청 하나를 보내고 결과를 받음 (연결 실패/시간 초과 시 None)"""
+    try:
+        conn = Client(address, authkey=authkey)
+    except Exception:
+        return None
+    try:
+        conn.send(request)
+        if timeout is not None and not conn.poll(timeout):
+            return None
+        response = conn.recv()
+        return response.get("result") if response.get("ok") else None
+    except Exception:
+        return None
+    finally:
+        conn.close()
+
+# ✅ 웹 프로세스용 클라이언트 (AIModelManager와 같은 메서드 제공)
+class InferenceClient:
+    """추론 워커에 생성 요청을 보내는 가벼운 클라이언트"""
+
+    def __init__(self, addresses: List[Tuple[str, int]], authkey: bytes):
+        if not addresses:
+            raise ValueError("추론 워커 주소가 없습니다.")
+        self.addresses = addresses
+        self.authkey = authkey
+        self._next_address = itertools.cycle(range(len(addresses)))
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, *args, **kwargs):
+        # 라운드 로빈으로 워커를 고르고, 연결이 안 되면 다음 워커로 재시도
+        with self._lock:
+            start = next(self._next_address)
+
+        last_error = None
+        for offset in range(len(self.addresses)):
+            address = self.addresses[(start + offset) % len(self.addresses)]
+            try:
+                conn = Client(address, authkey=self.authkey)
+            except Exception as e:
+                last_error = e
+                continue
+            try:
+                conn.send({"method": method, "args": args, "kwargs": kwargs})
+                response = conn.recv()
+            except (EOFError, OSError) as e:
+                # 요청 도중 워커가 죽은 경우 (슈퍼바이저가 재시작함)
+                last_error = e
+                continue
+            finally:
+                conn.close()
+
+            if not response.get("ok"):
+                raise RuntimeError(response.get("error", "추론 워커 오류"))
+            return response["result"]
+
+        raise ConnectionError(f"사용 가능한 추론 워커가 없습니다: {last_error}")
+
+    def health(self) -> List[Dict]:
+        """워커별 헬스 체크 결과"""
+        results = []
+        for address in self.addresses:
+            health = _call_worker(address, self.authkey, {"method": "health"}, timeout=HEALTH_CHECK_TIMEOUT)
+            results.append({
+                "address": f"{address[0]}:{address[1]}",
+                "reachable": health is not None,
+                **(health or {})
+            })
+        return results
+
+    def is_ready(self) -> bool:
+        return any(worker.get("ready") for worker in self.health())
+
+    def wait_until_ready(self, timeout: Optional[float] = WORKER_READY_TIMEOUT, interval: float = 1.0):
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.is_ready():
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError("추론 워커가 아직 준비되지 않았어요.")
+            time.sleep(interval)
+        return self
+
+    def generate_response(self, *args, **kwargs) -> str:
+        return self._call("generate_response", *args, **kwargs)
+
+    def generate_with_usage(self, *args, **kwargs) -> Dict:
+        return self._call("generate_with_usage", *args, **kwargs)
+
+    def get_ai_response(self, *args, **kwargs) -> Dict:
+        try:
+            return self._call("get_ai_response", *args, **kwargs)
+        except Exception as e:
+            print(f"추론 워커 요청 오류: {e}")
+            return {
+                "response": "AI 친구와 연결이 잠시 끊겼어요. 다시 시도해주세요.",
+                "tokens_used": 0,
+                "success": False
+            }
+
+    def generate_conversation_summary(self, messages: List[Dict], current_mood: str = "보통", *args, **kwargs) -> Dict:
+        try:
+            return self._call("generate_conversation_summary", messages, current_mood, *args, **kwargs)
+        except Exception as e:
+            print(f"추론 워커 요청 오류: {e}")
+            # 워커 없이 생성할 때와 같은 기본 결과 (기분별 기본 키워드)
+            from ai_models import AIModelManager
+            return AIModelManager._default_summary_result("요약을 만드는 중에 문제가 생겼어요", current_mood)
+
+    def update_conversation_memory(self, previous_summary: str, *args, **kwargs) -> Dict:
+        try:
+            return self._call("update_conversation_memory", previous_summary, *args, **kwargs)
+        except Exception as e:
+            print(f"추론 워커 요청 오류: {e}")
+            return {"summary": previous_summary, "success": False}
+
+    def count_tokens(self, *args, **kwargs) -> int:
+        return self._call("count_tokens", *args, **kwargs)
+
+    def embedding_model_id(self) -> str:
+        return self._call("embedding_model_id")
+
+    def embed_texts(self, *args, **kwargs):
+        try:
+            return self._call("embed_texts", *args, **kwargs)
+        except Exception as e:
+            print(f"추론 워커 요청 오류: {e}")
+            return None
+
+def main():
+    parser = argparse.ArgumentParser(description="마음톡 추론 워커 풀")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="첫 번째 워커 포트 (워커마다 1씩 증가)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--pin-cpus", action="store_true", help="워커마다 겹치지 않는 CPU 코어에 고정")
+    args = parser.parse_args()
+
+    if not os.environ.get(WORKER_AUTHKEY_ENV):
+        parser.error(f"{WORKER_AUTHKEY_ENV}를 설정해야 해요 (워커는 받은 요청을 pickle로 풀기 때문에 인증 키가 필요함).")
+    if args.host not in LOOPBACK_HOSTS:
+        print(f"⚠️ 추론 워커가 {args.host}에서 요청을 받아요. {WORKER_AUTHKEY_ENV} 값을 충분히 길고 무작위로 정하세요.")
+
+    addresses = [(args.host, args.port + i) for i in range(args.workers)]
+    print(f"💡 웹 서버에서 {WORKER_ADDRESSES_ENV}=" + ",".join(f"{h}:{p}" for h, p in addresses) + " 로 설정하세요.")
+    WorkerPool(addresses, get_authkey(), pin_cpus=args.pin_cpus).run_forever()
+
+if __name__ == "__main__":
+    main()
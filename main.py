@@ -1,15 +1,28 @@
 import streamlit as st
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+import numpy as np
 import pandas as pd
 import json
 import re
 from typing import List, Dict, Optional
-import calendar as cal
 import time
+import os
+import inspect
 
 # 로컬 모듈 import
 from database import *
-from ai_models import AIModelManager
+from model_loader import ModelWarmup, WARMUP_ENABLED
+from conversation_memory import ConversationMemory
+from chat_jobs import ChatJobQueue
+from safety_scanner import scan_text
+from semantic_search import SemanticDiarySearch
+from diary_retrieval import DiaryRetriever, RetrievalCache
+from diary_calendar import MonthIndex, DayMoodGrid, HEATMAP_MOODS, MOOD_EMOJIS, render_month_grid, render_mood_heatmap
+from diary_stats import DiaryStats, apply_diary_event
+from diary_analytics import MoodAnalytics
+from diary_record import DiaryRecord
+from chat_render import render_message_html
+from profiling import get_profiler
 
 # ✅ 페이지 설정 (layout="centered"로 수정)
 st.set_page_config(
@@ -22,16 +35,16 @@ st.set_page_config(
 # ✅ 상수 설정
 APP_PASSWORD = "2752"
 MAX_FREE_TOKENS = 100000
-HARMFUL_KEYWORDS = [
-    "자살", "죽고싶다", "죽고 싶다", "자살하고", "자해", "손목", "극단적", "생을 마감",
-    "죽고 싶어", "사라지고 싶다", "끝내고 싶다", "힘들어서 죽을", "죽어버리고", 
-    "죽었으면", "살기 싫다", "살고 싶지", "베고 싶다", "목 매달아"
-]
-
-VIOLENCE_KEYWORDS = [
-    "때리고 싶다", "죽이고 싶다", "칼", "총", "성폭행", "강간", "폭행", "때렸다",
-    "맞았다", "협박", "폭력", "성추행", "칼로 찌르", "총으로 쏘"
-]
+# 관리자 화면(성능 측정) 비밀번호 (비어 있으면 관리자 화면을 숨김)
+ADMIN_PASSWORD = os.environ.get("MINDTALK_ADMIN_PASSWORD", "")
+# 대화 화면에 한 번에 그리는 최근 메시지 수 (이전 메시지는 "이전 대화 더 보기"로 펼침)
+CHAT_WINDOW_SIZE = 20
+# 답장을 기다리는 동안 몇 초마다 끝났는지 확인할지
+CHAT_JOB_POLL_SECONDS = float(os.environ.get("MINDTALK_CHAT_JOB_POLL_SECONDS", "1.0"))
+# 일기 검색 결과를 한 쪽에 몇 개씩 보여줄지
+SEARCH_PAGE_SIZE = 10
+# 글자를 칠 때마다 검색하되 입력이 300ms 멈췄을 때만 다시 그림 (live를 지원하지 않는 Streamlit에서는 Enter로 검색)
+SEARCH_INPUT_OPTIONS = {"live": "300ms"} if "live" in inspect.signature(st.text_input).parameters else {}
 
 # ✅ 기본 AI 이름 설정
 DEFAULT_AI_NAME = "루나"
@@ -72,10 +85,67 @@ THEMES = {
 # 데이터베이스 초기화
 init_database()
 
-# AI 모델 매니저 초기화
+# AI 모델 매니저 초기화 (서버 프로세스당 1회, 백그라운드 스레드에서 로딩)
 @st.cache_resource
+def get_model_warmup():
+    warmup = ModelWarmup()
+    if WARMUP_ENABLED:
+        warmup.start()
+    return warmup
+
 def get_ai_model():
-    return AIModelManager()
+    return get_model_warmup().wait_until_ready()
+
+# 첫 화면이 뜨는 시점에 모델 로딩을 미리 시작
+get_model_warmup()
+
+# 일기 의미 검색 인덱스 (서버 프로세스당 1회, 모든 세션이 공유)
+@st.cache_resource
+def get_semantic_search():
+    return SemanticDiarySearch()
+
+def index_diaries_in_background():
+    """모델이 준비되어 있으면 임베딩이 없는 일기를 백그라운드에서 계산"""
+    warmup = get_model_warmup()
+    if warmup.is_ready():
+        get_semantic_search().index_pending_in_background(warmup.manager)
+
+# 기분 흐름 분석 (데이터 버전마다 한 번만 계산하고 모든 세션이 결과를 공유)
+@st.cache_resource
+def get_mood_analytics():
+    return MoodAnalytics()
+
+# 답장 생성 작업 큐 (서버 프로세스당 1회, 세션은 작업 id만 들고 있음)
+@st.cache_resource
+def get_chat_jobs():
+    return ChatJobQueue()
+
+# 지난 일기 BM25 검색기 (인덱스는 모든 세션이 공유, 검색 결과 캐시는 세션별)
+@st.cache_resource
+def get_diary_retriever():
+    return DiaryRetriever()
+
+def remove_from_semantic_index(diary_ids):
+    """휴지통으로 옮긴 일기를 의미 검색 결과에서 뺌 (복원하면 새 id로 다시 계산됨)"""
+    ids = [diary_id for diary_id in diary_ids if diary_id is not None]
+    if ids:
+        get_semantic_search().remove(ids)
+
+def semantic_search_diaries(query, top_k=10):
+    """검색어와 뜻이 비슷한 일기 (모델이 아직 준비 중이면 None)"""
+    warmup = get_model_warmup()
+    if not warmup.is_ready():
+        return None
+    results = get_semantic_search().search(warmup.manager, query, top_k)
+    return load_diaries_by_ids_from_db([result['diary_id'] for result in results])
+
+def find_similar_diaries(diary_id, top_k=5):
+    """이 일기와 비슷한 날 (모델이 아직 준비 중이면 None)"""
+    warmup = get_model_warmup()
+    if not warmup.is_ready():
+        return None
+    results = get_semantic_search().similar_to(warmup.manager, diary_id, top_k)
+    return load_diaries_by_ids_from_db([result['diary_id'] for result in results])
 
 # ✅ 세션 상태 초기화
 def init_session_state():
@@ -85,13 +155,17 @@ def init_session_state():
         "current_step": "mood_selection",
         "current_mood": None,
         "chat_messages": [],
+        "chat_window": CHAT_WINDOW_SIZE,
+        "conversation_memory": ConversationMemory(),
         "diary_entries": [],
-        "conversation_context": [],
+        "diary_version": 0,
+        "retrieval_cache": RetrievalCache(),
         "token_usage": 0,
         "deleted_entries": [],
         "temp_diary_data": {},
         "ai_name": DEFAULT_AI_NAME,
-        "ai_typing": False,
+        "chat_job": None,
+        "chat_error": None,
         "menu_option": "🏠 홈",
         "selected_theme": "라벤더",
         "consecutive_days": 0,
@@ -110,15 +184,35 @@ def init_session_state():
     # 데이터 타입 검증 및 복구
     for key, default_value in defaults.items():
         try:
-            if key == "diary_entries" and not isinstance(st.session_state[key], list):
+            if key == "diary_entries" and not isinstance(st.session_state[key], (list, tuple)):
                 st.session_state[key] = []
-            elif key == "deleted_entries" and not isinstance(st.session_state[key], list):
+            elif key == "deleted_entries" and not isinstance(st.session_state[key], (list, tuple)):
                 st.session_state[key] = []
             elif key == "token_usage" and not isinstance(st.session_state[key], (int, float)):
                 st.session_state[key] = 0
         except Exception as e:
             st.session_state[key] = default_value
 
+# ✅ 감정 달력 색인 (세션별)
+def get_month_index():
+    """세션 일기 목록의 (연, 월) 색인 (일기 목록이 통째로 바뀌었을 때만 다시 만듦)
+
+    삭제/복원은 DB에서 목록을 새로 읽어 오므로 목록 객체가 바뀌고, 새로 쓴 일기는 저장할 때 add()로 반영한다.
+    """
+    entries = st.session_state.diary_entries
+    index = st.session_state.get('month_index')
+    if index is None or st.session_state.get('month_index_source') is not entries:
+        index = MonthIndex(entries)
+        st.session_state.month_index = index
+        st.session_state.month_index_source = entries
+    return index
+
+def add_to_month_index(entry, previous_entries):
+    """새로 쓴 일기를 색인에 바로 반영 (색인이 없거나 낡았으면 다음에 달력을 열 때 새로 만듦)"""
+    if st.session_state.get('month_index_source') is previous_entries:
+        st.session_state.month_index.add(entry)
+        st.session_state.month_index_source = st.session_state.diary_entries
+
 # ✅ 테마별 스타일 생성 함수
 def get_theme_style(theme_name):
     theme = THEMES.get(theme_name, THEMES["라벤더"])
@@ -271,38 +365,6 @@ def get_korean_postposition(name):
         # 한글이 아닌 경우 '가'를 기본으로 사용
         return "가"
 
-def check_harmful_content(text: str) -> bool:
-    """유해 콘텐츠 검사"""
-    if not text or not isinstance(text, str):
-        return False
-    
-    try:
-        text_lower = text.lower().replace(" ", "")
-        harmful_patterns = [
-            "자살", "죽고싶", "자해", "죽고싶어", "사라지고싶", "끝내고싶", 
-            "살기싫", "살고싶지", "죽어버리", "죽었으면", "베고싶", "자살하고"
-        ]
-        
-        return any(pattern in text_lower for pattern in harmful_patterns)
-    except Exception:
-        return False
-
-def check_violence_content(text: str) -> bool:
-    """폭력 콘텐츠 검사"""
-    if not text or not isinstance(text, str):
-        return False
-    
-    try:
-        text_lower = text.lower().replace(" ", "")
-        violence_patterns = [
-            "때리고싶", "죽이고싶", "칼", "총", "성폭행", "강간", "폭행", 
-            "때렸다", "맞았다", "협박", "폭력", "성추행"
-        ]
-        
-        return any(pattern in text_lower for pattern in violence_patterns)
-    except Exception:
-        return False
-
 def display_token_bar():
     """토큰 사용량 표시 (로컬 모델이므로 항상 충분함)"""
     try:
@@ -314,11 +376,19 @@ def display_token_bar():
         color = "#4CAF50"
         status = "무제한 (로컬 모델)"
         
+        # 오늘 사용량 (usage_log 일별 집계 기준, 모든 세션이 공유하는 스냅샷에서 읽음)
+        today_usage = load_daily_usage_snapshot(days=1)
+        today_usage = today_usage[0] if today_usage and today_usage[0]['date'] == datetime.now().strftime('%Y-%m-%d') else None
+        if today_usage:
+            usage_text = f"오늘 {today_usage['total_tokens']:,} 토큰 · {today_usage['avg_decode_tokens_per_sec']} 토큰/초"
+        else:
+            usage_text = f"누적 {token_usage:,} 토큰"
+        
         st.markdown(f"""
         <div class="token-bar">
             <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 5px;">
                 <span style="font-size: 14px; font-weight: bold;">💫 AI와 대화할 수 있는 에너지</span>
-                <span style="font-size: 12px; color: #666;">무제한 사용 가능</span>
+                <span style="font-size: 12px; color: #666;">{usage_text}</span>
             </div>
             <div style="background: #e0e0e0; height: 8px; border-radius: 10px;">
                 <div style="background: {color}; width: 100%; height: 100%; border-radius: 10px;"></div>
@@ -331,185 +401,63 @@ def display_token_bar():
     except Exception:
         pass
 
-def calculate_consecutive_days():
-    """연속 작성일 계산 (중복 날짜 제거 로직 수정)"""
-    try:
-        if not st.session_state.diary_entries:
-            return 0
-        
-        # 일기를 작성한 날짜만 추출하여 중복을 제거합니다.
-        entry_dates = {datetime.strptime(entry['date'], '%Y-%m-%d').date() 
-                      for entry in st.session_state.diary_entries if 'date' in entry}
-        
-        if not entry_dates:
-            return 0
-        
-        # 날짜를 최신순으로 정렬합니다.
-        sorted_dates = sorted(list(entry_dates), reverse=True)
-        
-        today = datetime.now().date()
-        
-        # 오늘 일기를 썼는지, 어제 썼는지에 따라 시작점을 정합니다.
-        if today not in sorted_dates:
-            # 오늘 일기를 안 썼다면, 어제부터 연속인지 확인합니다.
-            start_date = today - timedelta(days=1)
-            consecutive = 0
-        else:
-            # 오늘 일기를 썼다면, 오늘부터 연속인지 확인합니다.
-            start_date = today
-            consecutive = 1
-        
-        # 오늘(또는 어제)부터 하루씩 빼가며 연속되는지 확인합니다.
-        # 오늘 일기를 쓴 경우, 이미 1일로 시작했으므로 그 이전 날짜부터 확인합니다.
-        if consecutive == 1:
-            for i in range(1, len(sorted_dates)):
-                if sorted_dates[i] == start_date - timedelta(days=i):
-                    consecutive += 1
-                else:
-                    break
-        else: # 오늘 일기를 안 쓴 경우
-            for i, date in enumerate(sorted_dates):
-                if date == start_date - timedelta(days=i):
-                    consecutive += 1
-                else:
-                    break
-                    
-        return consecutive
-    except Exception as e:
-        print(f"연속 작성일 계산 오류: {e}")
-        return 0
-
-def generate_emotion_keywords(chat_messages, mood):
-    """대화 내용을 바탕으로 AI가 감정 키워드 5개 제시"""
+def display_model_status():
+    """AI 모델 준비 상태 표시 (로그인/기분 선택 화면용)"""
     try:
-        ai_model = get_ai_model()
-        
-        if not chat_messages:
-            # 기본 감정 키워드 (대화 내용이 없을 때)
-            default_keywords = {
-                "좋음": ["#기쁨", "#활기", "#만족", "#희망", "#평온"],
-                "보통": ["#평범", "#일상", "#차분", "#보통", "#안정"],
-                "나쁨": ["#우울", "#피곤", "#스트레스", "#불안", "#힘듦"]
-            }
-            return default_keywords.get(mood, ["#감정나눔", "#일상", "#생각", "#마음", "#기분"])
-        
-        # 대화 내용에서 사용자 메시지만 추출
-        user_messages = []
-        for msg in chat_messages:
-            if isinstance(msg, dict) and msg.get("role") == "user":
-                user_messages.append(msg.get("content", ""))
+        status = get_model_warmup().get_status()
         
-        conversation_text = "\n".join(user_messages)
-        if len(conversation_text) > 1500:
-            conversation_text = conversation_text[:1500] + "..."
-        
-        prompt = f"""다음 대화 내용을 분석해서 사용자의 감정을 나타내는 키워드 5개를 제시해주세요.
-
-대화 내용:
-{conversation_text}
-
-현재 기분: {mood}
+        if status["ready"]:
+            st.caption(f"🤖 {status['message']}")
+        elif status["state"] == "failed":
+            st.caption(f"⚠️ {status['message']} 대화를 시작하면 다시 시도할게요.")
+        elif status["state"] != "idle":
+            st.progress(status["progress"] / 100, text=f"🤖 {status['message']} ({status['elapsed_seconds']:.0f}초)")
+    except Exception:
+        pass
 
-요청사항:
-- 대화에서 느껴지는 구체적인 감정 키워드 5개
-- 각 키워드는 # 붙여서 해시태그 형태로
-- 사용자가 실제로 느꼈을 감정들 위주로
-- 너무 추상적이지 않고 구체적으로
+def get_diary_stats():
+    """세션의 감정 통계 (일기를 저장/삭제/복원할 때마다 그 일기만 반영, 버전이 어긋났을 때만 새로 만듦)"""
+    version = st.session_state.get('diary_version', 0)
+    stats = st.session_state.get('diary_stats')
+    if stats is None or stats.version != version:
+        stats = DiaryStats(st.session_state.diary_entries, version)
+        st.session_state.diary_stats = stats
+    return stats
 
-응답 형식:
-#키워드1, #키워드2, #키워드3, #키워드4, #키워드5"""
+def get_day_mood_grid():
+    """세션의 날짜별 기분 집계 (get_diary_stats와 같이 저장/삭제/복원 때는 그날 칸만 고침)"""
+    version = st.session_state.get('diary_version', 0)
+    grid = st.session_state.get('day_mood_grid')
+    if grid is None or grid.version != version:
+        grid = DayMoodGrid(st.session_state.diary_entries, version)
+        st.session_state.day_mood_grid = grid
+    return grid
 
-        result = ai_model.generate_response(prompt)
-        
-        # 키워드 파싱
-        keywords = [k.strip() for k in result.split(',') if k.strip().startswith('#')]
-        
-        # 5개가 안 나왔으면 기본값으로 채우기
-        if len(keywords) < 5:
-            default_extras = ["#감정나눔", "#일상", "#생각", "#마음", "#기분"]
-            keywords.extend(default_extras[:5-len(keywords)])
-        
-        return keywords[:5]
-        
+def calculate_consecutive_days():
+    """연속 작성일 계산 (오늘 안 썼으면 어제부터 거꾸로 셈)"""
+    try:
+        return get_diary_stats().consecutive_days(datetime.now().date())
     except Exception as e:
-        print(f"감정 키워드 생성 오류: {e}")
-        # 오류 시 기분별 기본 키워드
-        default_keywords = {
-            "좋음": ["#기쁨", "#활기", "#만족", "#희망", "#평온"],
-            "보통": ["#평범", "#일상", "#차분", "#보통", "#안정"],
-            "나쁨": ["#우울", "#피곤", "#스트레스", "#불안", "#힘듦"]
-        }
-        return default_keywords.get(mood, ["#감정나눔", "#일상", "#생각", "#마음", "#기분"])
+        print(f"연속 작성일 계산 오류: {e}")
+        return 0
 
 def generate_emotion_stats():
     """감정 통계 생성 (선택된 키워드 기준)"""
     try:
-        if not st.session_state.diary_entries:
-            return None
-        
-        # 기분별 통계
-        mood_counts = {}
-        # 감정 키워드별 통계
-        keyword_counts = {}
-        
-        for entry in st.session_state.diary_entries:
-            try:
-                # 기분 통계
-                mood = entry.get('mood', '알 수 없음')
-                mood_counts[mood] = mood_counts.get(mood, 0) + 1
-                
-                # 키워드 통계 (사용자가 선택한 것들)
-                keywords = entry.get('keywords', [])
-                for keyword in keywords:
-                    keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
-                    
-            except Exception:
-                continue
-        
-        # 기분 통계
-        total = sum(mood_counts.values())
-        mood_stats = []
-        for mood, count in mood_counts.items():
-            percentage = (count / total) * 100
-            mood_stats.append({
-                'mood': mood,
-                'count': count,
-                'percentage': round(percentage, 1)
-            })
-        
-        # 인기 키워드 통계 (상위 10개)
-        popular_keywords = sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return {
-            'mood_stats': sorted(mood_stats, key=lambda x: x['count'], reverse=True),
-            'popular_keywords': popular_keywords
-        }
-        
+        return get_diary_stats().emotion_stats()
     except Exception:
         return None
 
-def search_diaries(keyword):
-    """일기 검색"""
-    try:
-        if not keyword or not st.session_state.diary_entries:
-            return []
-        
-        results = []
-        keyword_lower = keyword.lower()
-        
-        for entry in st.session_state.diary_entries:
-            try:
-                summary = entry.get('summary', '').lower()
-                keywords = ' '.join(entry.get('keywords', [])).lower()
-                
-                if keyword_lower in summary or keyword_lower in keywords:
-                    results.append(entry)
-            except Exception:
-                continue
-        
-        return results
-    except Exception:
-        return []
+def search_diaries(keyword, moods=None, date_from=None, date_to=None, emotion=None, page=0):
+    """일기 검색 (DB 색인으로 한 쪽씩 찾음, 반환값: (일기 목록, 다음 쪽이 있는지))"""
+    return search_diaries_in_db(keyword, moods, date_from, date_to, emotion,
+                                limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE)
+
+def highlight_matches(text, keyword):
+    """검색어가 들어간 부분을 주황색 배경으로 표시 (대소문자 무시)"""
+    if not keyword or not text:
+        return text
+    return re.sub(re.escape(keyword), lambda match: f":orange-background[{match.group(0)}]", text, flags=re.IGNORECASE)
 
 def export_diary_data():
     """일기 데이터 내보내기 (휴지통 포함)"""
@@ -649,6 +597,8 @@ def show_login():
         
         password = st.text_input("비밀번호", type="password", placeholder="비밀번호를 입력하세요")
         
+        display_model_status()
+        
         if st.button("💜 마음톡 시작하기", use_container_width=True, key="login_button"):
             if password.strip() == APP_PASSWORD:
                 st.session_state.authenticated = True
@@ -747,6 +697,8 @@ def show_mood_selection():
     </div>
     """, unsafe_allow_html=True)
     
+    display_model_status()
+    
     # 메뉴 추가 (4개로 간소화)
     st.markdown("---")
     st.markdown("### 📋 메뉴")
@@ -778,61 +730,154 @@ def show_mood_selection():
         st.markdown("---")
         st.markdown("### 📚 최근에 쓴 일기들")
         
-        # 검색 기능 추가
-        search_keyword = st.text_input("🔍 일기 검색", placeholder="찾고 싶은 키워드를 써봐요", key="home_search_diary")
+        # 임베딩이 없는 일기(새로 쓴 일기, 복원한 일기)는 미리 계산해 둠
+        index_diaries_in_background()
         
-        # 표시할 일기들 선택
-        entries_to_show = st.session_state.diary_entries[-7:][::-1]  # 최근 7개, 최신순
+        # 검색어를 칠 때는 일기 목록만 다시 그림
+        show_diary_list()
+
+def change_search_page(step):
+    """검색 결과 쪽 넘기기 (버튼 콜백이라 목록을 그리기 전에 쪽 번호가 바뀜)"""
+    st.session_state.home_search_page = max(0, st.session_state.get('home_search_page', 0) + step)
+
+@st.fragment
+def show_diary_list():
+    # 검색 기능 추가
+    search_keyword = st.text_input("🔍 일기 검색", placeholder="찾고 싶은 키워드를 써봐요",
+                                   key="home_search_diary", **SEARCH_INPUT_OPTIONS).strip()
+    search_mode = st.radio("검색 방식", ["글자 그대로", "비슷한 뜻"], horizontal=True,
+                           key="home_search_mode", label_visibility="collapsed")
+    
+    with st.expander("🎛️ 검색 조건"):
+        search_moods = st.multiselect("기분", ["좋음", "보통", "나쁨"], key="home_search_moods")
+        search_dates = st.date_input("날짜", value=(), key="home_search_dates")
+        emotion_options = [""] + [keyword for keyword, _ in get_diary_stats().keyword_counts.most_common()]
+        search_emotion = st.selectbox("감정 키워드", emotion_options, key="home_search_emotion",
+                                      format_func=lambda keyword: keyword or "전체")
+    
+    # 날짜는 하나만 골랐으면 그날부터, 두 개 골랐으면 그 사이
+    search_dates = tuple(search_dates) if isinstance(search_dates, (list, tuple)) else (search_dates,)
+    date_from = search_dates[0] if len(search_dates) > 0 else None
+    date_to = search_dates[1] if len(search_dates) > 1 else None
+    has_filters = bool(search_moods or date_from or search_emotion)
+    
+    # 검색어나 조건이 바뀌면 첫 쪽부터
+    search_signature = (search_keyword, search_mode, tuple(search_moods), search_dates, search_emotion)
+    if st.session_state.get('home_search_signature') != search_signature:
+        st.session_state.home_search_signature = search_signature
+        st.session_state.home_search_page = 0
+    page = st.session_state.get('home_search_page', 0)
+    has_next = False
+    highlight_keyword = ""
+    
+    # 표시할 일기들 선택
+    entries_to_show = st.session_state.diary_entries[-7:][::-1]  # 최근 7개, 최신순
+    similar_to = st.session_state.get('similar_to_diary')
+    
+    if similar_to and not search_keyword and not has_filters:
+        similar_results = find_similar_diaries(similar_to['id'])
+        if similar_results is None:
+            st.info("🤖 AI 친구가 준비되면 비슷한 날을 찾아줄게요.")
+        else:
+            entries_to_show = similar_results
+            st.success(f"🔎 {similar_to['date']}와 비슷한 날: {len(similar_results)}개")
+        if st.button("✖️ 비슷한 날 보기 닫기", key="close_similar_diaries"):
+            del st.session_state['similar_to_diary']
+            st.rerun()
+    elif search_keyword and search_mode == "비슷한 뜻":
+        search_results = semantic_search_diaries(search_keyword)
+        if search_results is None:
+            st.info("🤖 AI 친구가 준비되면 뜻으로 찾아줄게요. 지금은 글자 그대로 찾아봤어요.")
+            search_results, _ = search_diaries(search_keyword)
+            highlight_keyword = search_keyword
+        entries_to_show = search_results
+        if search_results:
+            st.success(f"🔍 '{search_keyword}'와 비슷한 일기: {len(search_results)}개 발견!")
+        else:
+            st.info(f"🔍 '{search_keyword}'와 관련된 일기를 찾을 수 없어요.")
+    elif search_keyword or has_filters:
+        entries_to_show, has_next = search_diaries(search_keyword, search_moods, date_from, date_to,
+                                                   search_emotion, page)
+        highlight_keyword = search_keyword
+        search_label = f"'{search_keyword}' 검색 결과" if search_keyword else "검색 결과"
+        if entries_to_show:
+            st.success(f"🔍 {search_label}: {page + 1}쪽, {len(entries_to_show)}개" if page or has_next
+                       else f"🔍 {search_label}: {len(entries_to_show)}개 발견!")
+        elif page:
+            st.info("🔍 이 쪽에는 더 이상 일기가 없어요.")
+        else:
+            st.info(f"🔍 '{search_keyword}'와 관련된 일기를 찾을 수 없어요." if search_keyword
+                    else "🔍 조건에 맞는 일기를 찾을 수 없어요.")
+    
+    for i, entry in enumerate(entries_to_show):
+        mood_emoji = {"좋음": "😊", "보통": "😐", "나쁨": "😔"}.get(entry['mood'], "")
         
-        if search_keyword:
-            search_results = search_diaries(search_keyword)
-            entries_to_show = search_results[::-1] if search_results else []
-            if search_results:
-                st.success(f"🔍 '{search_keyword}' 검색 결과: {len(search_results)}개 발견!")
-            else:
-                st.info(f"🔍 '{search_keyword}'와 관련된 일기를 찾을 수 없어요.")
+        # 일기 제목에 삭제 버튼 추가
+        col1, col2 = st.columns([10, 1])
+        
+        with col1:
+            expander_title = f"{mood_emoji} {entry['date']} {entry.get('time', '')} - {entry['mood']}"
+        
+        with col2:
+            delete_key = f"home_delete_{entry['date']}_{entry.get('time', '')}_{i}_{hash(entry['summary'])}"
+            if st.button("🗑️", key=delete_key, help="임시 보관함으로 이동"):
+                if move_to_trash(entry):
+                    remove_from_semantic_index([entry.get('id')])
+                    st.success("📦 일기가 임시 보관함으로 이동했어요!")
+                    st.info("💡 30일 동안 보관하다가 자동으로 삭제될 거예요.")
+                    time.sleep(1)
+                    st.rerun()
+                else:
+                    st.error("❌ 일기 삭제 중에 문제가 생겼어요.")
         
-        for i, entry in enumerate(entries_to_show):
-            mood_emoji = {"좋음": "😊", "보통": "😐", "나쁨": "😔"}.get(entry['mood'], "")
+        # 일기 내용 표시
+        with st.expander(expander_title):
+            st.markdown(f"**📝 그날 있었던 일:** {highlight_matches(entry.get('summary', '내용 없음'), highlight_keyword)}")
             
-            # 일기 제목에 삭제 버튼 추가
-            col1, col2 = st.columns([10, 1])
+            # 선택된 감정 키워드 표시
+            if entry.get('keywords'):
+                st.markdown(f"**🏷️ 감정:** {', '.join(entry['keywords'])}")
             
-            with col1:
-                expander_title = f"{mood_emoji} {entry['date']} {entry.get('time', '')} - {entry['mood']}"
+            # AI가 제시했던 원본 키워드도 표시 (있다면)
+            if entry.get('suggested_keywords'):
+                with st.expander("🤖 AI가 추천했던 감정들"):
+                    st.write(' '.join(entry['suggested_keywords']))
             
-            with col2:
-                delete_key = f"home_delete_{entry['date']}_{entry.get('time', '')}_{i}_{hash(entry['summary'])}"
-                if st.button("🗑️", key=delete_key, help="임시 보관함으로 이동"):
-                    if move_to_trash(entry):
-                        st.success("📦 일기가 임시 보관함으로 이동했어요!")
-                        st.info("💡 30일 동안 보관하다가 자동으로 삭제될 거예요.")
-                        time.sleep(1)
-                        st.rerun()
-                    else:
-                        st.error("❌ 일기 삭제 중에 문제가 생겼어요.")
+            if entry.get('action_items'):
+                st.markdown("**💡 AI 친구의 조언:**")
+                for item in entry['action_items']:
+                    st.markdown(f"• {item}")
             
-            # 일기 내용 표시
-            with st.expander(expander_title):
-                st.markdown(f"**📝 그날 있었던 일:** {entry.get('summary', '내용 없음')}")
-                
-                # 선택된 감정 키워드 표시
-                if entry.get('keywords'):
-                    st.markdown(f"**🏷️ 감정:** {', '.join(entry['keywords'])}")
-                
-                # AI가 제시했던 원본 키워드도 표시 (있다면)
-                if entry.get('suggested_keywords'):
-                    with st.expander("🤖 AI가 추천했던 감정들"):
-                        st.write(' '.join(entry['suggested_keywords']))
-                
-                if entry.get('action_items'):
-                    st.markdown("**💡 AI 친구의 조언:**")
-                    for item in entry['action_items']:
-                        st.markdown(f"• {item}")
-        
-        # 더 많은 일기가 있을 때 안내
-        if len(st.session_state.diary_entries) > 7 and not search_keyword:
-            st.info(f"📚 총 {len(st.session_state.diary_entries)}개의 일기가 있어요! 검색으로 더 찾아보세요.")
+            # 그날 나눈 대화는 세션에 없으므로 펼쳐 볼 때만 DB에서 읽음
+            if entry.get('id') and st.checkbox("💬 그날 나눈 대화 보기", key=f"show_chat_{entry['id']}_{i}"):
+                chat_messages = load_chat_messages_from_db(entry['id'])
+                st.markdown(
+                    "\n".join(render_message_html(msg["role"], msg["content"], st.session_state.ai_name) for msg in chat_messages)
+                    or "저장된 대화가 없어요.",
+                    unsafe_allow_html=True
+                )
+            
+            if entry.get('id') and st.button("🔎 이날과 비슷한 날 찾기", key=f"similar_{entry['id']}_{i}"):
+                st.session_state.similar_to_diary = {'id': entry['id'], 'date': entry['date']}
+                st.rerun()
+    
+    # 검색 결과 쪽 넘기기
+    if page or has_next:
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if page:
+                st.button("◀ 이전", key="home_search_prev", use_container_width=True,
+                          on_click=change_search_page, args=(-1,))
+        with page_col:
+            st.markdown(f"<div style='text-align: center; padding-top: 0.4rem;'>{page + 1}쪽</div>", unsafe_allow_html=True)
+        with next_col:
+            if has_next:
+                st.button("다음 ▶", key="home_search_next", use_container_width=True,
+                          on_click=change_search_page, args=(1,))
+    
+    # 더 많은 일기가 있을 때 안내
+    if len(st.session_state.diary_entries) > 7 and not search_keyword and not has_filters:
+        st.info(f"📚 총 {len(st.session_state.diary_entries)}개의 일기가 있어요! 검색으로 더 찾아보세요.")
 
 def show_chat():
     current_mood = st.session_state.get('current_mood', '선택하지 않음')
@@ -863,56 +908,39 @@ def show_chat():
         return
     
     display_token_bar()
+    show_chat_pane()
 
-    chat_container = st.container()
-    with chat_container:
-        if not st.session_state.chat_messages:
-            mood_messages = {
-                "좋음": "오늘 기분이 좋았군요.",
-                "보통": "오늘은 평범한 하루였군요.",
-                "나쁨": "오늘 좀 힘드셨군요."
-            }
-            mood_message = mood_messages.get(st.session_state.current_mood, "오늘 하루 어땠어요?")
-            
-            st.markdown(f"""
-            <div class="ai-message">
-                <b>{st.session_state.ai_name}</b>: 안녕하세요! 저는 {st.session_state.ai_name}예요. 
-                {mood_message}. 오늘 무슨 일이 있었는지 편하게 얘기해볼까요? 😊
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            for msg in st.session_state.chat_messages:
-                if msg["role"] == "user":
-                    st.markdown(f"""
-                    <div class="user-message">
-                        {msg['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="ai-message">
-                        <b>{st.session_state.ai_name}</b>: {msg['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
+# 대화 영역만 따로 다시 실행되는 조각 (메시지를 보내도 테마 CSS, 토큰 바, 하단 안내는 다시 그리지 않음)
+@st.fragment
+def show_chat_pane():
+    with get_profiler().stage("ui", "chat_pane"):
+        render_chat_pane()
 
+def render_chat_pane():
+    chat_container = st.container()
     st.markdown("---")
     
     with st.form("chat_form_input", clear_on_submit=True):
-        user_input = st.text_area(
+        st.text_area(
             "💬 저에게 말해보세요.",
             height=80,
             placeholder="오늘 있었던 일, 지금 기분...편하게 말해보세요. 제가 잘 들어줄게요",
-            help=f"무슨 이야기든 좋아요! {st.session_state.ai_name}가 잘 들어줄게요 🌙"
+            help=f"무슨 이야기든 좋아요! {st.session_state.ai_name}가 잘 들어줄게요 🌙",
+            key="chat_input"
         )
         
         col1, col2, col3 = st.columns([1, 1, 1])
         
         with col1:
-            send_button = st.form_submit_button("📤 보내기", use_container_width=True)
+            # 답장을 기다리는 동안에는 보내지 않음 (쓰던 글은 입력창에 남아 있음)
+            st.form_submit_button("📤 보내기", use_container_width=True, on_click=submit_chat_message,
+                                  disabled=bool(st.session_state.chat_job))
         
         with col2:
             if st.form_submit_button("💾 일기로 저장하기", use_container_width=True):
-                if st.session_state.chat_messages:
+                if st.session_state.chat_job:
+                    st.warning(f"{st.session_state.ai_name}의 답장을 받은 뒤에 저장할 수 있어요!")
+                elif st.session_state.chat_messages:
                     st.session_state.current_step = "summary"
                     st.rerun()
                 else:
@@ -922,41 +950,153 @@ def show_chat():
             if st.form_submit_button("🏠 처음으로", use_container_width=True):
                 st.session_state.current_step = "mood_selection"
                 st.session_state.chat_messages = []
+                st.session_state.conversation_memory = ConversationMemory()
                 st.rerun()
-        
-        if send_button and user_input.strip():
-            history_for_ai = st.session_state.chat_messages.copy()
-            st.session_state.chat_messages.append({"role": "user", "content": user_input.strip()})
-
-            with st.spinner(f"{st.session_state.ai_name}가 답장을 쓰고 있어요..."):
-                # 유해 콘텐츠 검사
-                danger_context = ""
-                if check_harmful_content(user_input.strip()):
-                    danger_context = "\n\n중요: 사용자가 자해나 자살 관련 내용을 언급했습니다. 공감적으로 반응한 후 자연스럽게 전문 상담 연락처를 안내해주세요."
-                elif check_violence_content(user_input.strip()):
-                    danger_context = "\n\n중요: 사용자가 폭력이나 위험 상황을 언급했습니다. 안전을 우선시하며 적절한 도움 연락처를 안내해주세요."
-                
-                ai_model = get_ai_model()
-                ai_result = ai_model.get_ai_response(
-                    user_input.strip() + danger_context,
-                    history_for_ai,
-                    st.session_state.conversation_context,
-                    st.session_state.get('current_mood', '보통'),
-                    st.session_state.ai_name
-                )
+    
+    if st.session_state.chat_error:
+        st.error(f"❌ {st.session_state.chat_error}")
+        st.session_state.chat_error = None
+    
+    # 폼 위쪽에 비워 둔 자리에 대화 내용을 그림
+    with chat_container:
+        if not st.session_state.chat_messages:
+            st.session_state.chat_window = CHAT_WINDOW_SIZE
+            mood_messages = {
+                "좋음": "오늘 기분이 좋았군요.",
+                "보통": "오늘은 평범한 하루였군요.",
+                "나쁨": "오늘 좀 힘드셨군요."
+            }
+            mood_message = mood_messages.get(st.session_state.current_mood, "오늘 하루 어땠어요?")
             
-            if ai_result["success"]:
-                st.session_state.chat_messages.append({
-                    "role": "assistant",
-                    "content": ai_result["response"]
-                })
-                # 토큰 사용량 업데이트 (로컬 모델이므로 실제로는 무의미하지만 UI 유지)
-                st.session_state.token_usage += ai_result.get("tokens_used", 0)
-            else:
-                st.session_state.chat_messages.pop() # Remove user message if AI fails
-                st.error(f"❌ {ai_result['response']}")
+            st.markdown(f"""
+            <div class="ai-message">
+                <b>{st.session_state.ai_name}</b>: 안녕하세요! 저는 {st.session_state.ai_name}예요. 
+                {mood_message}. 오늘 무슨 일이 있었는지 편하게 얘기해볼까요? 😊
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            messages = st.session_state.chat_messages
+            window = st.session_state.get('chat_window', CHAT_WINDOW_SIZE)
+            if len(messages) > window:
+                if st.button("⬆️ 이전 대화 더 보기", use_container_width=True, key="load_earlier_messages"):
+                    window += CHAT_WINDOW_SIZE
+                    st.session_state.chat_window = window
             
-            st.rerun()
+            # 최근 메시지만 한 덩어리 HTML로 그림 (대화가 길어져도 한 턴에 그리는 양은 일정함)
+            ai_name = st.session_state.ai_name
+            st.markdown(
+                "\n".join(render_message_html(msg["role"], msg["content"], ai_name) for msg in messages[-window:]),
+                unsafe_allow_html=True
+            )
+        
+        if st.session_state.chat_job:
+            show_pending_reply()
+
+def submit_chat_message():
+    """보내기 버튼 콜백: 답장 생성을 백그라운드 작업으로 넣고 바로 돌아감 (결과는 show_pending_reply가 가져옴)
+
+    콜백은 화면을 그리기 전에 실행되므로 이번 실행부터 보내기 버튼이 꺼지고 답장 기다리는 표시가 보인다.
+    """
+    user_input = st.session_state.get("chat_input", "").strip()
+    if not user_input or st.session_state.chat_job:
+        return
+    
+    # 오래된 대화는 누적 요약으로 대신하고, 요약되지 않은 최근 대화만 전달
+    memory = st.session_state.conversation_memory.snapshot()
+    history_for_ai = st.session_state.chat_messages[memory["folded_until"]:]
+    st.session_state.chat_messages.append({"role": "user", "content": user_input})
+    
+    job_id = get_chat_jobs().submit(
+        generate_chat_reply,
+        get_model_warmup(),
+        get_diary_retriever(),
+        user_input,
+        history_for_ai,
+        st.session_state.get('current_mood', '보통'),
+        st.session_state.ai_name,
+        memory["summary"],
+        st.session_state.retrieval_cache
+    )
+    # 대화를 새로 시작하면 conversation_memory가 바뀌므로 이 대화의 답장인지 알 수 있음
+    st.session_state.chat_job = {"id": job_id, "memory": st.session_state.conversation_memory}
+
+@st.fragment(run_every=CHAT_JOB_POLL_SECONDS)
+def show_pending_reply():
+    """답장이 끝났는지 주기적으로 확인하고, 끝났으면 대화에 넣은 뒤 화면 전체를 다시 그림"""
+    chat_job = st.session_state.chat_job
+    if not chat_job:
+        return
+    
+    jobs = get_chat_jobs()
+    if chat_job["memory"] is not st.session_state.conversation_memory:
+        # 그사이 대화를 새로 시작했으면 이전 대화의 답장은 버림
+        jobs.discard(chat_job["id"])
+        st.session_state.chat_job = None
+        return
+    
+    ai_result = jobs.poll(chat_job["id"])
+    if ai_result is None:
+        st.markdown(
+            f'<div class="ai-message"><b>{st.session_state.ai_name}</b>: 답장을 쓰고 있어요... ✍️</div>',
+            unsafe_allow_html=True
+        )
+        return
+    
+    st.session_state.chat_job = None
+    get_profiler().record("chat", "job_total", ai_result["job_ms"])
+    if ai_result["success"]:
+        st.session_state.chat_messages.append({
+            "role": "assistant",
+            "content": ai_result["response"]
+        })
+        # 토큰 사용량 업데이트 (토크나이저 기준 실제 토큰 수)
+        st.session_state.token_usage += ai_result.get("tokens_used", 0)
+        record_usage_to_db("chat", ai_result.get("usage"))
+        # 오래된 대화가 쌓였으면 백그라운드에서 누적 요약에 합침
+        st.session_state.conversation_memory.maybe_fold(
+            st.session_state.chat_messages, get_ai_model(), st.session_state.ai_name
+        )
+    else:
+        if st.session_state.chat_messages and st.session_state.chat_messages[-1]["role"] == "user":
+            st.session_state.chat_messages.pop() # Remove user message if AI fails
+        st.session_state.chat_error = ai_result["response"]
+    st.rerun()
+
+def generate_chat_reply(warmup, retriever, user_message, history, mood, ai_name, memory_summary, retrieval_cache):
+    """안전 검사 → 지난 일기 검색 → 답장 생성
+
+    ChatJobQueue 스레드에서 실행되므로 세션 상태나 st.cache_resource 함수는 쓰지 않고 넘겨받은 것만 쓴다.
+    모델이 아직 로딩 중이면 이 스레드에서 기다린다.
+    """
+    profiler = get_profiler()
+    
+    # 유해 콘텐츠 검사 (자해/폭력 키워드를 한 번에 검사)
+    with profiler.stage("chat", "safety_scan"):
+        safety = scan_text(user_message)
+    danger_context = ""
+    if safety["self_harm"]:
+        danger_context = "\n\n중요: 사용자가 자해나 자살 관련 내용을 언급했습니다. 공감적으로 반응한 후 자연스럽게 전문 상담 연락처를 안내해주세요."
+    elif safety["violence"]:
+        danger_context = "\n\n중요: 사용자가 폭력이나 위험 상황을 언급했습니다. 안전을 우선시하며 적절한 도움 연락처를 안내해주세요."
+    
+    ai_model = warmup.wait_until_ready()
+    
+    # 지금 메시지와 관련된 지난 일기만 골라서 참고 (토큰 예산 안에서)
+    with profiler.stage("chat", "retrieval"):
+        past_context = retriever.retrieve(
+            user_message,
+            count_tokens=ai_model.count_tokens,
+            cache=retrieval_cache
+        )
+    
+    return ai_model.get_ai_response(
+        user_message + danger_context,
+        history,
+        past_context,
+        mood,
+        ai_name,
+        memory_summary
+    )
 
 def show_summary():
     if not st.session_state.chat_messages:
@@ -966,12 +1106,24 @@ def show_summary():
             st.rerun()
         return
     
-    # AI 요약 생성
-    if 'temp_summary' not in st.session_state:
-        with st.spinner("✨ AI가 오늘 있었던 일을 정리하고 있어요..."):
+    # AI 요약 + 감정 키워드 생성 (한 번의 생성으로 처리)
+    if 'temp_summary' not in st.session_state or 'suggested_emotions' not in st.session_state:
+        with st.spinner("✨ AI가 오늘 있었던 일과 감정을 정리하고 있어요..."):
             ai_model = get_ai_model()
-            summary_result = ai_model.generate_conversation_summary(st.session_state.chat_messages)
+            current_mood = st.session_state.get('current_mood', '보통')
+            # 진행 중인 누적 요약이 있으면 마저 끝낸 뒤 새 대화만 읽어서 요약
+            st.session_state.conversation_memory.wait(timeout=60)
+            memory = st.session_state.conversation_memory.snapshot()
+            summary_result = ai_model.generate_conversation_summary(
+                st.session_state.chat_messages, current_mood,
+                memory["summary"], memory["folded_until"]
+            )
             st.session_state.temp_summary = summary_result
+            if summary_result.get("usage"):
+                st.session_state.token_usage += summary_result["usage"]["total_tokens"]
+                record_usage_to_db("summary", summary_result["usage"])
+            # AI가 감정 키워드 5개 제시
+            st.session_state.suggested_emotions = summary_result.get('keywords', [])[:5]
     
     summary_data = st.session_state.temp_summary
     
@@ -982,13 +1134,15 @@ def show_summary():
     </div>
     """, unsafe_allow_html=True)
     
-    # AI가 감정 키워드 5개 제시
-    if 'suggested_emotions' not in st.session_state:
-        with st.spinner("🎨 어떤 감정이 느껴지는지 분석하고 있어요..."):
-            current_mood = st.session_state.get('current_mood', '보통')
-            suggested_emotions = generate_emotion_keywords(st.session_state.chat_messages, current_mood)
-            st.session_state.suggested_emotions = suggested_emotions
-    
+    show_emotion_selection(summary_data)
+
+# 감정 키워드 고르기 조각 (체크박스를 누를 때마다 이 부분만 다시 실행됨)
+@st.fragment
+def show_emotion_selection(summary_data):
+    with get_profiler().stage("ui", "emotion_selection"):
+        render_emotion_selection(summary_data)
+
+def render_emotion_selection(summary_data):
     st.markdown("### 🏷️ 감정 키워드")
     st.markdown("**AI가 대화 속에서 느껴졌던 감정들이랍니다. 마음에 드는 것들을 골라보세요.**")
     
@@ -1061,14 +1215,18 @@ def show_summary():
             }
             
             # SQLite에 일기 저장
-            if save_diary_to_db(diary_entry):
-                # 세션에도 추가 (즉시 반영을 위해)
-                st.session_state.diary_entries.append(diary_entry)
+            diary_id = save_diary_to_db(diary_entry)
+            if diary_id:
+                # 세션에도 추가 (즉시 반영을 위해, 대화 내용은 빼고 가벼운 기록으로)
+                # 목록은 다른 세션과 공유하는 스냅샷일 수 있으므로 고치지 않고 새로 만듦
+                record = DiaryRecord.from_dict({**diary_entry, 'id': diary_id})
+                previous_entries = st.session_state.diary_entries
+                st.session_state.diary_entries = tuple(previous_entries) + (record,)
+                add_to_month_index(record, previous_entries)
+                apply_diary_event(st.session_state, "add", record)
                 
-                st.session_state.conversation_context.append({
-                    'summary': summary_data['summary'],
-                    'action_items': summary_data.get('action_items', [])
-                })
+                # 의미 검색용 임베딩은 백그라운드에서 계산
+                index_diaries_in_background()
                 
                 st.session_state.consecutive_days = calculate_consecutive_days()
                 st.session_state.last_entry_date = today.strftime('%Y-%m-%d')
@@ -1085,6 +1243,7 @@ def show_summary():
                 st.balloons()
                 st.session_state.current_step = "mood_selection"
                 st.session_state.chat_messages = []
+                st.session_state.conversation_memory = ConversationMemory()
                 st.rerun()
             else:
                 st.error("❌ 일기 저장 중에 문제가 생겼어요.")
@@ -1092,6 +1251,7 @@ def show_summary():
         if st.button("🏠 처음으로", use_container_width=True, key="home_from_summary"):
             st.session_state.current_step = "mood_selection"
             st.session_state.chat_messages = []
+            st.session_state.conversation_memory = ConversationMemory()
             for key in ['temp_summary', 'suggested_emotions']:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -1108,8 +1268,8 @@ def show_trash():
     # 만료된 휴지통 항목 자동 정리
     clean_expired_trash()
     
-    # 최신 데이터 강제 새로고침
-    st.session_state.deleted_entries = load_deleted_entries_from_db()
+    # 최신 데이터 (바뀐 게 없으면 다른 세션과 공유하는 목록을 그대로 씀)
+    st.session_state.deleted_entries = load_deleted_entries_snapshot()
     
     # 휴지통 내용
     deleted_entries = st.session_state.deleted_entries
@@ -1131,20 +1291,14 @@ def show_trash():
     # 전체 비우기 버튼
     if st.button("🗑️ 휴지통 전체 비우기", type="secondary", key="empty_all_trash"):
         if st.checkbox("정말로 휴지통을 완전히 비울거예요? (다시 돌릴 수 없어요)", key="confirm_empty_all_trash"):
-            try:
-                # SQLite에서 모든 휴지통 항목 삭제
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM deleted_entries')
-                conn.commit()
-                conn.close()
-                
+            # SQLite에서 모든 휴지통 항목 삭제
+            if empty_trash_db():
                 # 세션에서도 업데이트
                 st.session_state.deleted_entries = []
                 st.success("🗑️ 휴지통이 완전히 비워졌어요.")
                 st.rerun()
-            except Exception as e:
-                st.error(f"❌ 휴지통 비우기 중 오류: {e}")
+            else:
+                st.error("❌ 휴지통 비우기 중 문제가 생겼어요.")
     
     st.markdown("---")
     
@@ -1192,7 +1346,7 @@ def show_calendar():
     st.markdown("""
     <div class="main-header">
         <h1>📅 감정 달력</h1>
-        <p>달마다 내 감정 패턴을 확인해봐요</p>
+        <p>달마다, 해마다 내 감정 패턴을 확인해봐요</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -1203,97 +1357,31 @@ def show_calendar():
             st.rerun()
         return
     
-    # 월 선택
     today = datetime.now()
-    selected_year = st.selectbox("연도", [today.year - 1, today.year, today.year + 1], index=1, key="calendar_year")
-    selected_month = st.selectbox("월", list(range(1, 13)), index=today.month - 1, key="calendar_month")
+    grid = get_day_mood_grid()
+    # 일기가 있는 해 + 올해 (앞뒤로 한 해씩 더)
+    diary_years = grid.years() or [today.year]
+    year_options = list(range(min(diary_years[0], today.year - 1), max(diary_years[-1], today.year + 1) + 1))
     
-    # 해당 월의 일기 데이터 (하루에 여러 개일 수 있으므로 list로 관리)
-    month_entries = {}
-    for entry in st.session_state.diary_entries:
-        try:
-            entry_date = datetime.strptime(entry['date'], '%Y-%m-%d')
-            if entry_date.year == selected_year and entry_date.month == selected_month:
-                day = entry_date.day
-                if day not in month_entries:
-                    month_entries[day] = []
-                month_entries[day].append(entry)
-        except:
-            continue
-    
-    # 캘린더 표시
-    st.markdown(f"### {selected_year}년 {selected_month}월")
+    view = st.radio("보기", ["한 달", "한 해", "전체"], horizontal=True, key="calendar_view")
     
-    # 달력 그리기 - Streamlit 컬럼 방식으로 변경
-    cal_obj = cal.monthcalendar(selected_year, selected_month)
+    if view != "한 달":
+        show_mood_heatmap(grid, view, year_options, diary_years, today.date())
+        if st.button("🏠 홈으로", key="home_from_calendar"):
+            st.session_state.current_step = "mood_selection"
+            st.rerun()
+        return
     
-    # 요일 헤더
-    weekdays = ["월", "화", "수", "목", "금", "토", "일"]
-    header_cols = st.columns(7)
+    # 월 선택
+    selected_year = st.selectbox("연도", year_options, index=year_options.index(today.year), key="calendar_year")
+    selected_month = st.selectbox("월", list(range(1, 13)), index=today.month - 1, key="calendar_month")
     
-    for i, day_name in enumerate(weekdays):
-        with header_cols[i]:
-            st.markdown(f"<div style='text-align: center; font-weight: bold; padding: 10px; background: #f8f9fa; border-radius: 5px;'>{day_name}</div>", unsafe_allow_html=True)
+    # 해당 월의 일기 데이터 (하루에 여러 개일 수 있으므로 list로 관리, 색인에서 바로 꺼냄)
+    month_entries = get_month_index().month(selected_year, selected_month)
     
-    # 달력 본체 - 주 단위로 행 생성
-    for week in cal_obj:
-        week_cols = st.columns(7)
-        
-        for i, day in enumerate(week):
-            with week_cols[i]:
-                if day == 0:
-                    # 빈 날짜
-                    st.markdown("<div style='height: 80px;'></div>", unsafe_allow_html=True)
-                else:
-                    # 날짜 표시
-                    mood_emoji = ""
-                    bg_color = "#f8f9fa"
-                    border_color = "#ddd"
-                    tooltip_text = "이날은 일기를 쓰지 않았어요."
-                    
-                    if day in month_entries:
-                        # 하루의 첫 번째 일기를 기준으로 대표 기분 설정
-                        first_entry = month_entries[day][0]
-                        mood = first_entry['mood']
-                        mood_emoji = {"좋음": "😊", "보통": "😐", "나쁨": "😔"}.get(mood, "")
-                        bg_colors = {"좋음": "#ffe4e6", "보통": "#e3f2fd", "나쁨": "#f3e5f5"}
-                        border_colors = {"좋음": "#ffb3ba", "보통": "#90caf9", "나쁨": "#ce93d8"}
-                        bg_color = bg_colors.get(mood, "#f8f9fa")
-                        border_color = border_colors.get(mood, "#ddd")
-                        
-                        # 툴팁에 표시할 모든 키워드 수집
-                        all_keywords = []
-                        for entry in month_entries[day]:
-                            all_keywords.extend(entry.get('keywords', []))
-                        
-                        if all_keywords:
-                            tooltip_text = ", ".join(set(all_keywords))
-                        else:
-                            tooltip_text = "선택한 감정 키워드가 없어요."
-
-                    # 오늘 날짜 표시
-                    today_mark = ""
-                    if (day == today.day and selected_month == today.month and selected_year == today.year):
-                        today_mark = " 🔵"
-                    
-                    st.markdown(f"""
-                    <div title='{tooltip_text}' style='
-                        background: {bg_color}; 
-                        padding: 15px; 
-                        text-align: center; 
-                        border-radius: 8px; 
-                        border: 2px solid {border_color};
-                        height: 80px;
-                        display: flex;
-                        flex-direction: column;
-                        justify-content: center;
-                        align-items: center;
-                        cursor: help;
-                    '>
-                        <div style='font-weight: bold; font-size: 16px;'>{day}{today_mark}</div>
-                        <div style='font-size: 24px; margin-top: 5px;'>{mood_emoji}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+    # 캘린더 표시 (요일 머리글과 날짜 칸 전체를 한 요소로)
+    st.markdown(f"### {selected_year}년 {selected_month}월")
+    st.markdown(render_month_grid(selected_year, selected_month, month_entries, today.date()), unsafe_allow_html=True)
     
     # 감정 예시
     st.markdown("---")
@@ -1361,6 +1449,30 @@ def show_calendar():
         st.session_state.current_step = "mood_selection"
         st.rerun()
 
+def show_mood_heatmap(grid, view: str, year_options: List[int], diary_years: List[int], today):
+    """한 해/전체 기분 지도 (날짜별 집계 배열에서 바로 그려 요소 하나로 표시)"""
+    if view == "한 해":
+        selected_year = st.selectbox("연도", year_options, index=year_options.index(today.year), key="heatmap_year")
+        years = [selected_year]
+        title = f"### {selected_year}년 기분 지도"
+    else:
+        years = diary_years
+        title = f"### 전체 기분 지도 ({diary_years[0]}년 ~ {diary_years[-1]}년)"
+    
+    st.markdown(title)
+    st.caption("칸 하나가 하루예요. 색은 그날 가장 많이 쓴 기분, 진하기는 그날 쓴 일기 수예요.")
+    st.markdown(render_mood_heatmap(grid, years, today), unsafe_allow_html=True)
+    
+    # 대표 기분별 날 수 (배열에서 한 번에 셈)
+    counts, dominant = grid.days(date(years[0], 1, 1), date(years[-1], 12, 31))
+    mood_days = np.bincount(dominant[dominant >= 0], minlength=len(HEATMAP_MOODS))
+    
+    stats_cols = st.columns(len(HEATMAP_MOODS) + 1)
+    with stats_cols[0]:
+        st.metric("📝 일기 쓴 날", f"{int((counts > 0).sum())}일", help=f"일기 {int(counts.sum())}개")
+    for i, mood in enumerate(HEATMAP_MOODS):
+        stats_cols[i + 1].metric(f"{MOOD_EMOJIS[mood]} {mood}", f"{int(mood_days[i])}일")
+
 def show_statistics():
     st.markdown("""
     <div class="main-header">
@@ -1389,8 +1501,8 @@ def show_statistics():
         st.metric("연속 작성일", f"{consecutive_days}일")
     
     with col3:
-        if st.session_state.diary_entries:
-            first_date_str = st.session_state.diary_entries[0]['date']
+        first_date_str = get_diary_stats().first_date
+        if first_date_str:
             first_date = datetime.strptime(first_date_str, '%Y-%m-%d').date()
             days_since_start = (datetime.now().date() - first_date).days + 1
             st.metric("일기 시작한 지", f"{days_since_start}일")
@@ -1420,6 +1532,34 @@ def show_statistics():
         for keyword, count in emotion_stats['popular_keywords']:
             st.markdown(f"**{keyword}**: {count}번")
     
+    # 기분 흐름 분석
+    analytics = get_mood_analytics().get()
+    if analytics:
+        st.markdown("### 📈 요즘 기분 흐름")
+        st.caption("좋음은 1, 보통은 0, 나쁨은 -1로 바꿔서 최근 7일/30일 동안의 평균을 냈어요.")
+        st.line_chart(analytics['rolling'])
+        
+        st.markdown("### 📅 요일별 · 시간대별 기분")
+        st.dataframe(analytics['weekday'].T, use_container_width=True)
+        st.dataframe(analytics['time_of_day'].T, use_container_width=True)
+        
+        if analytics['rising_keywords'] or analytics['falling_keywords']:
+            st.markdown("### 🔁 요즘 달라진 감정")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**🔺 늘어난 감정**")
+                for keyword, slope in analytics['rising_keywords']:
+                    st.markdown(f"{keyword}: 한 달에 +{slope}%p")
+            with col2:
+                st.markdown("**🔻 줄어든 감정**")
+                for keyword, slope in analytics['falling_keywords']:
+                    st.markdown(f"{keyword}: 한 달에 {slope}%p")
+        
+        if analytics['keyword_pairs']:
+            st.markdown("### 🔗 함께 자주 느낀 감정")
+            for first, second, count in analytics['keyword_pairs']:
+                st.markdown(f"**{first}** + **{second}**: {count}번")
+    
     if st.button("🏠 홈으로", key="home_from_statistics"):
         st.session_state.current_step = "mood_selection"
         st.rerun()
@@ -1489,11 +1629,14 @@ def show_settings():
                 if st.checkbox("정말로 모든 일기를 삭제할거예요? (임시 보관함으로 이동)", key=confirm_key):
                     # 모든 일기를 휴지통으로 이동
                     moved_count = 0
-                    entries_to_move = st.session_state.diary_entries.copy()
+                    moved_ids = []
+                    entries_to_move = list(st.session_state.diary_entries)
                     
                     for entry in entries_to_move:
                         if move_to_trash(entry):
                             moved_count += 1
+                            moved_ids.append(entry.get('id'))
+                    remove_from_semantic_index(moved_ids)
                     
                     if moved_count > 0:
                         st.success(f"📦 {moved_count}개의 일기가 임시 보관함으로 이동했어요.")
@@ -1501,7 +1644,6 @@ def show_settings():
                     else:
                         st.error("❌ 일기 삭제 중에 문제가 생겼어요.")
                     
-                    st.session_state.conversation_context = []
                     st.rerun()
             else:
                 st.info("삭제할 일기가 없어요.")
@@ -1525,20 +1667,14 @@ def show_settings():
             if st.button("🔥 보관함 완전히 비우기", key="empty_trash_from_settings"):
                 confirm_key = "confirm_empty_trash_from_settings"
                 if st.checkbox("보관함의 모든 일기를 완전히 삭제할거예요? (다시 돌릴 수 없어요)", key=confirm_key):
-                    try:
-                        # SQLite에서 모든 휴지통 항목 삭제
-                        conn = sqlite3.connect(DB_PATH)
-                        cursor = conn.cursor()
-                        cursor.execute('DELETE FROM deleted_entries')
-                        conn.commit()
-                        conn.close()
-                        
+                    # SQLite에서 모든 휴지통 항목 삭제
+                    if empty_trash_db():
                         # 세션에서도 업데이트
                         st.session_state.deleted_entries = []
                         st.success("🔥 보관함이 완전히 비워졌어요.")
                         st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ 보관함 비우기 중 오류: {e}")
+                    else:
+                        st.error("❌ 보관함 비우기 중 문제가 생겼어요.")
     else:
         st.info("🗑️ 임시 보관함이 비어있어요.")
     
@@ -1560,12 +1696,108 @@ def show_settings():
         with col3:
             st.metric("연속 작성일", f"{consecutive_days}일")
         with col4:
-            st.metric("AI 사용량", "무제한")
+            st.metric("AI 사용량", f"{int(token_usage):,} 토큰")
+        
+        # 일별 AI 사용량 (용량 계획용)
+        daily_usage = load_daily_usage_snapshot(days=30)
+        if daily_usage:
+            with st.expander("📈 최근 30일 AI 사용량"):
+                usage_df = pd.DataFrame(daily_usage).rename(columns={
+                    'date': '날짜',
+                    'requests': '요청 수',
+                    'prompt_tokens': '입력 토큰',
+                    'completion_tokens': '생성 토큰',
+                    'total_tokens': '전체 토큰',
+                    'avg_prefill_ms': '평균 프리필(ms)',
+                    'avg_decode_tokens_per_sec': '평균 생성 속도(토큰/초)',
+                    'avg_total_ms': '평균 응답(ms)',
+                    'max_total_ms': '최대 응답(ms)',
+                    'avg_queue_wait_ms': '평균 대기(ms)',
+                    'max_queue_wait_ms': '최대 대기(ms)',
+                    'tokens_budget_unused': '조기 종료로 남긴 생성 한도'
+                })
+                st.dataframe(usage_df, hide_index=True, use_container_width=True)
+    
+    # 관리자 화면 (MINDTALK_ADMIN_PASSWORD가 설정된 경우만)
+    if ADMIN_PASSWORD:
+        with st.expander("🛠️ 관리자"):
+            if st.session_state.get('is_admin'):
+                if st.button("📈 단계별 성능 보기", key="open_admin_metrics"):
+                    st.session_state.current_step = "admin_metrics"
+                    st.rerun()
+            else:
+                admin_password = st.text_input("관리자 비밀번호", type="password", key="admin_password_input")
+                if st.button("확인", key="admin_login"):
+                    if admin_password == ADMIN_PASSWORD:
+                        st.session_state.is_admin = True
+                        st.rerun()
+                    else:
+                        st.error("비밀번호가 달라요.")
     
     if st.button("🏠 홈으로", key="home_from_settings"):
         st.session_state.current_step = "mood_selection"
         st.rerun()
 
+def show_admin_metrics():
+    """관리자 전용: 호출 종류/단계별 지연 시간 분포와 생성 속도"""
+    if not ADMIN_PASSWORD or not st.session_state.get('is_admin'):
+        st.session_state.current_step = "settings"
+        st.rerun()
+        return
+    
+    st.markdown("""
+    <div class="main-header">
+        <h1>📈 단계별 성능</h1>
+        <p>최근 요청들의 단계별 지연 시간이에요</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    profiler = get_profiler()
+    column_names = {
+        'call_type': '호출',
+        'stage': '단계',
+        'count': '횟수',
+        'p50_ms': 'p50(ms)',
+        'p95_ms': 'p95(ms)',
+        'p99_ms': 'p99(ms)',
+        'tokens_per_sec': '토큰/초'
+    }
+    
+    summary = profiler.summarize()
+    if summary:
+        st.markdown("### 🖥️ 웹 서버")
+        st.dataframe(pd.DataFrame(summary).rename(columns=column_names), hide_index=True, use_container_width=True)
+        st.caption("ui/script_run은 화면 전체를 다시 실행한 시간, ui/chat_pane·emotion_selection은 해당 조각만 다시 실행한 시간이에요. chat/job_total은 답장을 보내고 받기까지(백그라운드 대기 포함), analytics/compute는 일기가 바뀐 뒤 기분 분석을 다시 계산하는 데 걸린 시간이에요.")
+    else:
+        st.info("아직 측정된 요청이 없어요.")
+    
+    # 추론 워커를 쓰는 경우 워커 프로세스의 측정값도 표시
+    manager = get_model_warmup().manager
+    if manager is not None and hasattr(manager, "health"):
+        for worker in manager.health():
+            if worker.get("profile"):
+                st.markdown(f"### 🧠 추론 워커 {worker['address']}")
+                st.dataframe(pd.DataFrame(worker["profile"]).rename(columns=column_names),
+                             hide_index=True, use_container_width=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "💾 JSON 내보내기",
+            data=profiler.export_json(),
+            file_name=f"mindtalk_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    with col2:
+        if st.button("🧹 측정값 비우기", use_container_width=True, key="reset_profile"):
+            profiler.reset()
+            st.rerun()
+    with col3:
+        if st.button("⚙️ 설정으로", use_container_width=True, key="settings_from_admin"):
+            st.session_state.current_step = "settings"
+            st.rerun()
+
 # 하단 면책조항 함수
 def show_footer():
     """브라우저 하단에 면책조항 표시"""
@@ -1582,6 +1814,11 @@ def show_footer():
 
 # ✅ 메인 함수
 def main():
+    # 상호작용 1번당 전체 스크립트 실행 시간 (조각만 다시 실행될 때는 각 조각 단계로 따로 기록됨)
+    with get_profiler().stage("ui", "script_run"):
+        run_app()
+
+def run_app():
     if 'app_initialized' not in st.session_state:
         init_session_state()
 
@@ -1596,6 +1833,7 @@ def main():
             st.session_state.current_mood = mood_map[mood_value]
             st.session_state.current_step = "chat"
             st.session_state.chat_messages = []
+            st.session_state.conversation_memory = ConversationMemory()
             
             # 풍선 효과를 보여줍니다.
             st.balloons()
@@ -1632,6 +1870,8 @@ def main():
         show_calendar()
     elif st.session_state.current_step == "settings":
         show_settings()
+    elif st.session_state.current_step == "admin_metrics":
+        show_admin_metrics()
     else:
         show_mood_selection()
 
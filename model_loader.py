@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from inference_worker import InferenceClient, get_authkey, get_configured_addresses
+
+# ✅ 워밍업 설정 (MINDTALK_MODEL_WARMUP=0 이면 첫 대화 요청 때 로딩)
+WARMUP_ENABLED = os.environ.get("MINDTALK_MODEL_WARMUP", "1") != "0"
+WARMUP_PROMPT = "사용자: 안녕하세요\n루나:"
+
+# 단계별 진행률 (모델 로딩 자체는 세부 진행률을 알 수 없어서 단계 단위로 표시)
+STAGE_PROGRESS = {
+    "idle": 0,
+    "importing": 10,
+    "loading": 30,
+    "warming_up": 80,
+    "ready": 100,
+    "failed": 0
+}
+
+STAGE_MESSAGES = {
+    "idle": "AI 친구가 아직 준비를 시작하지 않았어요",
+    "importing": "AI 친구를 깨우는 중이에요...",
+    "loading": "AI 친구가 준비 중이에요... (처음에는 몇 분 걸릴 수 있어요)",
+    "warming_up": "AI 친구가 목을 풀고 있어요...",
+    "ready": "AI 친구가 대화할 준비가 되었어요!",
+    "failed": "AI 친구를 불러오지 못했어요"
+}
+
+class ModelWarmup:
+    """AI 모델 백그라운드 로딩 및 준비 상태 관리 클래스"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._thread = None
+        self.manager = None
+        self.state = "idle"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """백그라운드 스레드에서 모델 로딩 시작 (이미 진행 중이면 무시, 실패했으면 재시도)"""
+        with self._lock:
+            if self._thread is not None and self.state != "failed":
+                return
+            self.state = "importing"
+            self.error = None
+            self.started_at = time.time()
+            self.finished_at = None
+            self._ready_event.clear()
+            self._thread = threading.Thread(target=self._run, name="mindtalk-model-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """모델 import → 로딩 → 더미 생성(커널 준비) 순서로 실행"""
+        try:
+            # 추론 워커가 설정되어 있으면 모델을 직접 올리지 않고 워커 준비만 기다림
+            worker_addresses = get_configured_addresses()
+            if worker_addresses:
+                self._set_state("loading")
+                self.manager = InferenceClient(worker_addresses, get_authkey()).wait_until_ready()
+                self._set_state("ready")
+                print(f"✅ 추론 워커 연결 완료! ({len(worker_addresses)}개)")
+                return
+            
+            # torch/transformers import 자체도 수 초가 걸리므로 백그라운드에서 처리
+            from ai_models import AIModelManager
+
+            self._set_state("loading")
+            manager = AIModelManager()
+
+            # 더미 생성으로 커널/캐시를 미리 준비
+            self._set_state("warming_up")
+            manager.generate_response(WARMUP_PROMPT, max_new_tokens=4, temperature=0.7)
+
+            self.manager = manager
+            self._set_state("ready")
+            print(f"✅ AI 모델 워밍업 완료! ({self.finished_at - self.started_at:.1f}초)")
+        except Exception as e:
+            print(f"❌ AI 모델 워밍업 실패: {e}")
+            self.error = str(e)
+            self._set_state("failed")
+        finally:
+            self._ready_event.set()
+
+    def _set_state(self, state: str):
+        with self._lock:
+            self.state = state
+            if state in ("ready", "failed"):
+                self.finished_at = time.time()
+
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def get_status(self) -> Dict:
+        """로그인/기분 선택 화면에 표시할 준비 상태"""
+        with self._lock:
+            state = self.state
+            started_at = self.started_at
+            finished_at = self.finished_at
+
+        elapsed = 0.0
+        if started_at:
+            elapsed = (finished_at or time.time()) - started_at
+
+        return {
+            "state": state,
+            "ready": state == "ready",
+            "progress": STAGE_PROGRESS.get(state, 0),
+            "message": STAGE_MESSAGES.get(state, ""),
+            "elapsed_seconds": round(elapsed, 1),
+            "error": self.error
+        }
+
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """모델이 준비될 때까지 기다린 뒤 AIModelManager 반환"""
+        if self.state in ("idle", "failed"):
+            self.start()
+
+        if not self._ready_event.wait(timeout):
+            raise TimeoutError("AI 모델 로딩이 아직 끝나지 않았어요.")
+
+        if self.manager is None:
+            raise RuntimeError(f"AI 모델을 불러오는데 실패했습니다: {self.error}")
+
+        return self.manager
@@ -0,0 +1,174 @@
+"""미리 받아 둔 모델 스냅샷 관리
+
+사용법:
+    python model_snapshot.py fetch --path models/ax-4.0-light
+    python model_snapshot.py verify --path models/ax-4.0-light --checksums
+
+MINDTALK_MODEL_SNAPSHOT 에 스냅샷 폴더를 지정하면 허브에 접속하지 않고
+safetensors 가중치를 메모리 매핑으로 바로 불러온다.
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, List
+
+# ✅ 로컬 스냅샷 설정
+# 모델 스냅샷 폴더 (비어 있으면 허깅페이스 허브/캐시에서 로드)
+MODEL_SNAPSHOT_PATH = os.environ.get("MINDTALK_MODEL_SNAPSHOT", "")
+# 로딩 전에 sha256 체크섬까지 확인할지 (가중치 전체를 읽으므로 기본은 헤더 검사만)
+VERIFY_CHECKSUMS = os.environ.get("MINDTALK_VERIFY_CHECKSUMS", "0") == "1"
+
+# 스냅샷에 받을 파일 (pytorch_model.bin 등 pickle 가중치는 받지 않음)
+SNAPSHOT_PATTERNS = ["*.json", "*.safetensors", "*.py", "*.model", "*.txt", "*.tiktoken"]
+CHECKSUM_FILE = "mindtalk_checksums.json"
+SAFETENSORS_INDEX_FILE = "model.safetensors.index.json"
+
+def peak_rss_mb() -> float:
+    """이 프로세스의 최대 메모리 사용량(MB), 측정할 수 없으면 0"""
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # 리눅스는 KB, macOS는 바이트 단위
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except (ImportError, AttributeError):
+        return 0.0
+
+def _sha256(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_safetensors_header(path: str) -> Dict:
+    """safetensors 파일 앞부분의 텐서 목록(JSON 헤더)만 읽음"""
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        if header_size <= 0 or header_size > os.path.getsize(path) - 8:
+            raise ValueError("헤더 길이가 파일 크기와 맞지 않아요")
+        return json.loads(f.read(header_size))
+
+def _weight_files(path: str) -> List[str]:
+    """스냅샷이 써야 하는 safetensors 파일 목록 (샤딩된 경우 인덱스 기준)"""
+    index_path = os.path.join(path, SAFETENSORS_INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            weight_map = json.load(f).get("weight_map", {})
+        return sorted(set(weight_map.values()))
+    return sorted(name for name in os.listdir(path) if name.endswith(".safetensors"))
+
+def validate_snapshot(path: str, verify_checksums: bool = False) -> List[str]:
+    """스냅샷 폴더 검사 (문제가 없으면 빈 목록)
+
+    설정/토크나이저 파일과 가중치 샤드가 모두 있는지, safetensors 헤더의 텐서 범위가
+    파일 크기 안에 있는지 확인한다. 잘린 다운로드는 로딩 도중이 아니라 여기서 걸러진다.
+    """
+    if not os.path.isdir(path):
+        return [f"스냅샷 폴더가 없어요: {path}"]
+
+    problems = []
+    if not os.path.exists(os.path.join(path, "config.json")):
+        problems.append("config.json 이 없어요")
+    if not any(name.startswith("tokenizer") for name in os.listdir(path)):
+        problems.append("토크나이저 파일이 없어요")
+
+    weight_files = _weight_files(path)
+    if not weight_files:
+        problems.append("safetensors 가중치가 없어요 (pickle 가중치는 지원하지 않아요)")
+
+    for name in weight_files:
+        weight_path = os.path.join(path, name)
+        if not os.path.exists(weight_path):
+            problems.append(f"가중치 샤드가 없어요: {name}")
+            continue
+        try:
+            header = read_safetensors_header(weight_path)
+            # 마지막 텐서가 끝나는 위치가 헤더 뒤 데이터 영역 안에 있어야 함
+            with open(weight_path, "rb") as f:
+                data_size = os.path.getsize(weight_path) - 8 - struct.unpack("<Q", f.read(8))[0]
+            data_end = max(
+                (info["data_offsets"][1] for key, info in header.items() if key != "__metadata__"),
+                default=0
+            )
+            if data_end > data_size:
+                problems.append(f"가중치 파일이 잘렸어요: {name}")
+        except Exception as e:
+            problems.append(f"가중치 헤더를 읽을 수 없어요: {name} ({e})")
+
+    if verify_checksums and not problems:
+        problems.extend(verify_checksum_manifest(path))
+
+    return problems
+
+def write_checksum_manifest(path: str) -> Dict[str, str]:
+    """스냅샷 파일들의 sha256 목록 저장 (받은 직후 한 번)"""
+    checksums = {}
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name == CHECKSUM_FILE:
+                continue
+            file_path = os.path.join(root, name)
+            checksums[os.path.relpath(file_path, path)] = _sha256(file_path)
+
+    with open(os.path.join(path, CHECKSUM_FILE), "w", encoding="utf-8") as f:
+        json.dump(checksums, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return checksums
+
+def verify_checksum_manifest(path: str) -> List[str]:
+    """저장해 둔 sha256 목록과 실제 파일 비교"""
+    manifest_path = os.path.join(path, CHECKSUM_FILE)
+    if not os.path.exists(manifest_path):
+        return [f"체크섬 목록이 없어요: {CHECKSUM_FILE}"]
+
+    with open(manifest_path, encoding="utf-8") as f:
+        checksums = json.load(f)
+
+    problems = []
+    for name, expected in checksums.items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path):
+            problems.append(f"파일이 없어요: {name}")
+        elif _sha256(file_path) != expected:
+            problems.append(f"체크섬이 달라요: {name}")
+    return problems
+
+def fetch_snapshot(model_name: str, path: str) -> str:
+    """허깅페이스 허브에서 safetensors 스냅샷을 받아 폴더에 저장"""
+    from huggingface_hub import snapshot_download
+
+    print(f"📥 모델 스냅샷 받는 중... ({model_name} → {path})")
+    snapshot_download(repo_id=model_name, local_dir=path, allow_patterns=SNAPSHOT_PATTERNS)
+
+    problems = validate_snapshot(path)
+    if problems:
+        raise RuntimeError("스냅샷 검사 실패: " + ", ".join(problems))
+
+    write_checksum_manifest(path)
+    print("✅ 모델 스냅샷 저장 완료!")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="마음톡 모델 스냅샷 관리")
+    parser.add_argument("command", choices=["fetch", "verify"])
+    parser.add_argument("--model", default="skt/A.X-4.0-Light", help="허깅페이스 모델 이름 (fetch용)")
+    parser.add_argument("--path", default=MODEL_SNAPSHOT_PATH or "models/ax-4.0-light", help="스냅샷 폴더")
+    parser.add_argument("--checksums", action="store_true", help="sha256 체크섬까지 확인 (verify용)")
+    args = parser.parse_args()
+
+    if args.command == "fetch":
+        fetch_snapshot(args.model, args.path)
+        return
+
+    problems = validate_snapshot(args.path, verify_checksums=args.checksums)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        raise SystemExit(1)
+    print("✅ 스냅샷에 문제가 없어요")
+
+if __name__ == "__main__":
+    main()
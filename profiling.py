@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# ✅ 단계별 지연 시간 측정 설정
+# 최근 몇 개의 측정값을 들고 있을지 (오래된 것부터 버림)
+PROFILE_BUFFER_SIZE = int(os.environ.get("MINDTALK_PROFILE_BUFFER", "5000"))
+# MINDTALK_PROFILING=0 이면 측정하지 않음
+PROFILING_ENABLED = os.environ.get("MINDTALK_PROFILING", "1") != "0"
+
+def percentile(values: List[float], percent: float) -> float:
+    """가장 가까운 순위 방식의 백분위수 (값이 없으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+class Profiler:
+    """호출 종류(chat, summary 등) × 단계(tokenize, prefill, decode 등)별 지연 시간 기록기
+
+    측정값은 고정 크기 링 버퍼에 쌓고, 요약은 관리자 화면을 열 때만 계산한다.
+    """
+
+    def __init__(self, buffer_size: int = PROFILE_BUFFER_SIZE, enabled: bool = PROFILING_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=buffer_size)
+        self._counts = {}
+
+    def record(self, call_type: str, stage: str, ms: float, tokens: int = 0):
+        """이미 잰 시간 기록 (백엔드가 따로 잰 프리필/디코드 시간 등)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples.append((call_type, stage, ms, tokens, time.time()))
+            key = (call_type, stage)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    @contextmanager
+    def stage(self, call_type: str, stage: str):
+        """구간 시간 측정 (with 블록 안에서 sample["tokens"]에 처리한 토큰 수를 넣을 수 있음)"""
+        sample = {"tokens": 0}
+        started = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            self.record(call_type, stage, (time.perf_counter() - started) * 1000, sample["tokens"])
+
+    def samples(self, since: Optional[float] = None) -> List[Dict]:
+        with self._lock:
+            samples = list(self._samples)
+        return [
+            {"call_type": call_type, "stage": stage, "ms": round(ms, 3), "tokens": tokens, "timestamp": timestamp}
+            for call_type, stage, ms, tokens, timestamp in samples
+            if since is None or timestamp >= since
+        ]
+
+    def summarize(self) -> List[Dict]:
+        """호출 종류/단계별 p50/p95/p99와 초당 토큰 수 (링 버퍼에 남아 있는 측정값 기준)"""
+        with self._lock:
+            samples = list(self._samples)
+            counts = dict(self._counts)
+
+        grouped = {}
+        for call_type, stage, ms, tokens, _ in samples:
+            group = grouped.setdefault((call_type, stage), {"ms": [], "tokens": 0})
+            group["ms"].append(ms)
+            group["tokens"] += tokens
+
+        rows = []
+        for (call_type, stage), group in sorted(grouped.items()):
+            total_seconds = sum(group["ms"]) / 1000
+            rows.append({
+                "call_type": call_type,
+                "stage": stage,
+                "count": counts.get((call_type, stage), len(group["ms"])),
+                "p50_ms": round(percentile(group["ms"], 50), 1),
+                "p95_ms": round(percentile(group["ms"], 95), 1),
+                "p99_ms": round(percentile(group["ms"], 99), 1),
+                "tokens_per_sec": round(group["tokens"] / total_seconds, 2) if group["tokens"] and total_seconds > 0 else 0.0
+            })
+        return rows
+
+    def export_json(self) -> str:
+        """요약과 원본 측정값을 JSON 문자열로 내보내기"""
+        return json.dumps({
+            "exported_at": time.time(),
+            "pid": os.getpid(),
+            "summary": self.summarize(),
+            "samples": self.samples()
+        }, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+_profiler = Profiler()
+
+def get_profiler() -> Profiler:
+    """프로세스 전체에서 공유하는 측정기"""
+    return _profiler
@@ -0,0 +1,288 @@
+import re
+from typing import Dict, List, Tuple
+
+# ✅ 위험 키워드 설정 (카테고리별, 자모 분리/반복 글자/기호는 검사할 때 정규화됨)
+# 키워드 안의 띄어쓰기는 단어 경계라서 붙여 써도, 띄어 써도 걸림.
+# 띄어쓰기가 없는 곳은 한 단어라서 단어 사이를 넘어 걸리지 않음 ("남자 해외여행"은 "자해"가 아님)
+SAFETY_KEYWORDS = {
+    "self_harm": [
+        # "손목", "극단적"은 일상 문장("손목시계", "극단적인 다이어트")에도 나오므로 자해 표현으로만 찾음
+        "자살", "죽고 싶다", "죽고 싶", "자살하고", "자해", "손목을 긋", "손목 긋", "손목을 그",
+        "극단적 선택", "극단적인 선택", "생을 마감",
+        "죽고 싶어", "사라지고 싶", "끝내고 싶", "힘들어서 죽을", "죽어 버리", "죽었으면",
+        "살기 싫", "살고 싶지", "베고 싶", "목 매달아"
+    ],
+    "violence": [
+        # "칼", "총"만으로는 "칼국수", "총 3개"도 걸리므로 행동과 함께 쓴 표현만 찾음
+        "때리고 싶", "죽이고 싶", "성폭행", "강간", "폭행", "때렸다",
+        "맞았다", "협박", "폭력", "성추행", "칼로 찌르", "총으로 쏘"
+    ]
+}
+
+# 단어 안에 끼워 넣어도 무시하는 문자 (제로폭 문자, 구분용 기호)
+IGNORED_CHARS = set("\u200b\u200c\u200d\u2060\ufeff.,_-~*·'\"`^")
+# 띄어쓰기로 나뉜 단어 (단어 사이 띄어쓰기는 정규화 후 " " 하나로 남음)
+_WORD_PATTERN = re.compile(r"\S+")
+
+# 한글 호환 자모 (ㄱ, ㅏ 등) 조합표
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+_CHOSEONG_INDEX = {char: index for index, char in enumerate(CHOSEONG)}
+_JUNGSEONG_INDEX = {char: index for index, char in enumerate(JUNGSEONG)}
+_JONGSEONG_INDEX = {char: index for index, char in enumerate(JONGSEONG) if index}
+_HANGUL_BASE = 0xAC00
+# 따로 쓴 자모가 있는지 (없으면 조합 단계를 건너뜀)
+_JAMO_PATTERN = re.compile("[\u1100-\u11ff\u3131-\u318e]")
+
+def _to_compatibility_jamo(char: str) -> str:
+    """조합형 자모(U+1100대)를 호환 자모로 바꿈 (그 외 글자는 그대로)"""
+    code = ord(char)
+    if 0x1100 <= code <= 0x1112:
+        return CHOSEONG[code - 0x1100]
+    if 0x1161 <= code <= 0x1175:
+        return JUNGSEONG[code - 0x1161]
+    if 0x11A8 <= code <= 0x11C2:
+        return JONGSEONG[code - 0x11A8 + 1]
+    return char
+
+def _is_open_syllable(char: str) -> bool:
+    """받침 없는 완성형 한글 음절인지"""
+    code = ord(char) - _HANGUL_BASE
+    return 0 <= code < 11172 and code % 28 == 0
+
+def _is_jamo(char: str) -> bool:
+    """따로 쓴 자모(ㄱ, ㅏ 등)인지"""
+    return _JAMO_PATTERN.match(char) is not None
+
+def _joins_words(previous: List[Tuple[str, int]], current: List[Tuple[str, int]]) -> bool:
+    """두 단어 사이 띄어쓰기를 무시할지 (한 글자씩 띄어 쓴 "죽 고 싶 다", 따로 쓴 자모 "ㅈㅏ ㅎㅐ")"""
+    if len(previous) == 1 and len(current) == 1:
+        return True
+    return _is_jamo(previous[-1][0]) or _is_jamo(current[0][0])
+
+def _letters(text: str) -> List[Tuple[str, int]]:
+    """(글자, 원문 위치) 목록 (무시할 문자는 빼고, 이어지지 않는 단어 사이에는 " "를 하나 넣음)"""
+    letters = []
+    previous = None
+    for match in _WORD_PATTERN.finditer(text):
+        word = [(char.lower(), match.start() + offset)
+                for offset, char in enumerate(match.group()) if char not in IGNORED_CHARS]
+        if not word:
+            continue
+        if previous is not None and not _joins_words(previous, word):
+            letters.append((" ", word[0][1] - 1))
+        letters.extend(word)
+        previous = word
+    return letters
+
+def normalize_text(text: str) -> Tuple[str, List[List[int]]]:
+    """검사용 정규화 (소문자, 기호 제거, 자모 조합, 반복 글자 축약, 단어 사이 띄어쓰기는 " " 하나로)
+
+    정규화된 글자마다 원문에서의 구간 [시작, 끝)을 함께 돌려줘서 검사 결과를 원문 구간으로 되돌릴 수 있다.
+    """
+    letters = _letters(text)
+
+    # 대부분의 문장은 자모를 따로 쓰지 않으므로 반복 축약만 함
+    if not _JAMO_PATTERN.search(text):
+        normalized = []
+        spans = []
+        for char, index in letters:
+            if normalized and normalized[-1] == char:
+                spans[-1][1] = index + 1
+                continue
+            normalized.append(char)
+            spans.append([index, index + 1])
+        return "".join(normalized), spans
+
+    chars = [(_to_compatibility_jamo(char), index) for char, index in letters]
+
+    normalized = []
+    spans = []
+    i = 0
+    while i < len(chars):
+        char, start = chars[i]
+        end = start + 1
+        next_char = chars[i + 1][0] if i + 1 < len(chars) else ""
+
+        # 초성 + 중성 (+ 다음 글자가 모음이 아닌 종성) → 완성형 음절
+        if char in _CHOSEONG_INDEX and next_char in _JUNGSEONG_INDEX:
+            jong = 0
+            consumed = 2
+            if i + 2 < len(chars):
+                final_char = chars[i + 2][0]
+                after_final = chars[i + 3][0] if i + 3 < len(chars) else ""
+                if final_char in _JONGSEONG_INDEX and after_final not in _JUNGSEONG_INDEX:
+                    jong = _JONGSEONG_INDEX[final_char]
+                    consumed = 3
+            char = chr(_HANGUL_BASE + (_CHOSEONG_INDEX[char] * 21 + _JUNGSEONG_INDEX[next_char]) * 28 + jong)
+            end = chars[i + consumed - 1][1] + 1
+            i += consumed
+        # 받침 없는 음절 뒤에 따로 쓴 자음 → 받침으로 합침 ("사ㄹ" → "살")
+        elif (char in _JONGSEONG_INDEX and normalized and _is_open_syllable(normalized[-1])
+              and next_char not in _JUNGSEONG_INDEX):
+            normalized[-1] = chr(ord(normalized[-1]) + _JONGSEONG_INDEX[char])
+            spans[-1][1] = end
+            i += 1
+            continue
+        else:
+            i += 1
+
+        # 같은 글자 반복은 한 번으로 ("죽고싶어어어" → "죽고싶어")
+        if normalized and normalized[-1] == char:
+            spans[-1][1] = end
+            continue
+        normalized.append(char)
+        spans.append([start, end])
+
+    return "".join(normalized), spans
+
+def _spacing_variants(keyword: str) -> List[str]:
+    """키워드의 단어 경계마다 띄어 쓴 경우와 붙여 쓴 경우를 모두 만듦 ("죽고 싶" → "죽고 싶", "죽고싶")"""
+    if not keyword:
+        return []
+    variants = [""]
+    for part_index, part in enumerate(keyword.split(" ")):
+        if part_index:
+            variants = [variant + joiner for variant in variants for joiner in (" ", "")]
+        variants = [variant + part for variant in variants]
+    return variants
+
+class KeywordAutomaton:
+    """여러 키워드를 한 번의 순회로 찾는 Aho–Corasick 오토마톤"""
+
+    def __init__(self, keywords_by_category: Dict[str, List[str]]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+
+        for category, keywords in keywords_by_category.items():
+            for keyword in keywords:
+                normalized, _ = normalize_text(keyword)
+                for pattern in _spacing_variants(normalized):
+                    self._add(pattern, category, keyword)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, category: str, keyword: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((category, keyword, len(pattern)))
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # 실패 링크 쪽에서 끝나는 키워드도 함께 보고
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[str, str, int, int]]:
+        """(카테고리, 키워드, 시작, 끝) 목록 (위치는 text 기준)"""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for category, keyword, length in self._outputs[state]:
+                matches.append((category, keyword, position - length + 1, position + 1))
+        return matches
+
+# import 시 한 번만 만들어서 모든 검사에서 재사용
+_AUTOMATON = KeywordAutomaton(SAFETY_KEYWORDS)
+
+def _tolerant_pattern(keywords: List[str]) -> "re.Pattern":
+    """정규화하지 않은 문장에서 바로 찾는 정규식 (무시할 문자와 반복 글자를 허용)
+
+    단어 안에서는 기호만 끼어도 되고, 띄어쓰기는 단어 첫 글자부터 한 글자씩 띄어 쓴 경우만 허용함
+    ("죽 고 싶"). 빠른 확인용이라 조금 넓게 잡고, 정확한 단어 경계 규칙은 normalize_text가 적용한다.
+    """
+    ignored = re.escape("".join(sorted(IGNORED_CHARS)))
+    word_gap = f"[{ignored}]*"
+    spaced_gap = rf"[\s{ignored}]*"
+    alternatives = []
+    for keyword in sorted({normalize_text(keyword)[0] for keyword in keywords} - {""}, key=len, reverse=True):
+        words = []
+        for word in keyword.split(" "):
+            first = re.escape(word[0])
+            joined = "".join(f"{word_gap}{re.escape(char)}(?:{word_gap}{re.escape(char)})*" for char in word[1:])
+            if len(word) > 1:
+                # 정규식이 첫 글자로 후보를 빨리 거를 수 있게 첫 글자는 밖으로 빼고, 띄어 쓴 경우는 첫 글자가 단어 시작일 때만
+                spelled = "".join(f"{spaced_gap}{re.escape(char)}(?:{spaced_gap}{re.escape(char)})*" for char in word[1:])
+                joined = rf"(?:{joined}|(?<![^\s{ignored}]{first}){spelled})"
+            words.append(f"{first}(?:{word_gap}{first})*{joined}")
+        alternatives.append(spaced_gap.join(words))
+    return re.compile("|".join(alternatives))
+
+# 걸리는 게 있는지만 C 속도로 확인하는 정규식
+_ANY_KEYWORD_PATTERN = _tolerant_pattern([keyword for keywords in SAFETY_KEYWORDS.values() for keyword in keywords])
+
+def _may_match(text: str) -> bool:
+    """키워드가 있을 수도 있는지 빠르게 확인 (False면 확실히 없음)
+
+    대부분의 메시지는 위험 키워드가 없으므로, 글자마다 원문 위치를 기록하는 정규화와
+    오토마톤 순회는 여기서 걸린 문장만 한다. 따로 쓴 자모가 있으면 조합이 필요하므로 항상 True.
+    """
+    if _JAMO_PATTERN.search(text):
+        return True
+    return _ANY_KEYWORD_PATTERN.search(text.lower()) is not None
+
+def scan_text(text: str) -> Dict:
+    """위험 키워드 검사 (빠른 확인에서 걸린 문장만 정규화 1번 + 오토마톤 순회 1번)
+
+    반환값: flagged, categories(걸린 카테고리 목록), matches(카테고리/키워드/원문 구간),
+    self_harm, violence, success
+    """
+    result = {
+        "flagged": False,
+        "categories": [],
+        "matches": [],
+        "self_harm": False,
+        "violence": False,
+        "success": True
+    }
+    if not text or not isinstance(text, str):
+        result["success"] = False
+        result["error"] = "Empty or invalid text"
+        return result
+
+    try:
+        if not _may_match(text):
+            return result
+
+        normalized, spans = normalize_text(text)
+        for category, keyword, start, end in _AUTOMATON.find(normalized):
+            # 정규화된 구간을 원문 구간으로 되돌림
+            original_start = spans[start][0]
+            original_end = spans[end - 1][1]
+            result["matches"].append({
+                "category": category,
+                "keyword": keyword,
+                "start": original_start,
+                "end": original_end,
+                "text": text[original_start:original_end]
+            })
+            if category not in result["categories"]:
+                result["categories"].append(category)
+
+        result["flagged"] = bool(result["categories"])
+        result["self_harm"] = "self_harm" in result["categories"]
+        result["violence"] = "violence" in result["categories"]
+        return result
+    except Exception as e:
+        print(f"안전 검사 오류: {e}")
+        result["success"] = False
+        result["error"] = str(e)
+        return result
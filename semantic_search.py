@@ -0,0 +1,267 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database import (
+    load_diaries_without_embedding_from_db,
+    load_diary_embeddings_from_db,
+    save_diary_embeddings_to_db
+)
+
+# ✅ 의미 검색 설정
+# 이 개수보다 많으면 전체 비교 대신 IVF(군집별 역색인)로 후보만 비교
+IVF_MIN_ENTRIES = 4096
+# 검색할 때 살펴보는 군집 수 (최소 IVF_NPROBE개, 전체 군집의 IVF_PROBE_RATIO만큼)
+# 많을수록 정확하지만 느림
+IVF_NPROBE = 8
+IVF_PROBE_RATIO = 0.1
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 20000
+# 한 번에 임베딩을 계산할 일기 수 (저장/백필 1회당)
+BACKFILL_BATCH = 256
+
+def diary_embedding_text(summary: str, keywords: List[str]) -> str:
+    """임베딩을 계산할 일기 문장 (요약 + 감정 키워드)"""
+    return f"{summary} {' '.join(keywords or [])}".strip()
+
+class VectorIndex:
+    """정규화된 임베딩의 코사인 유사도 검색 인덱스
+
+    항목이 적으면 float32 행렬 하나로 전체 비교하고, 많아지면 float16으로 보관하면서
+    k-means 군집 중심을 먼저 비교해 가까운 군집(IVF_NPROBE개) 안에서만 정확히 비교한다.
+    """
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, 0), dtype=np.float16)
+        self._dense = None
+        self._centroids = None
+        self._lists = []
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids: np.ndarray, vectors: np.ndarray):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = np.asarray(vectors, dtype=np.float16)
+        self._rebuild()
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        """새 임베딩 추가 (같은 id가 있으면 교체)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float16)
+        if not len(self.ids) or self.vectors.shape[1] != vectors.shape[1]:
+            self.build(ids, vectors)
+            return
+
+        replaced = np.isin(self.ids, ids)
+        if replaced.any():
+            # 교체는 드물어서 전체를 다시 구성
+            self.build(np.concatenate([self.ids[~replaced], ids]),
+                       np.concatenate([self.vectors[~replaced], vectors]))
+            return
+
+        offset = len(self.ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.vectors = np.concatenate([self.vectors, vectors])
+
+        if self._dense is not None and len(self.ids) < IVF_MIN_ENTRIES:
+            self._dense = np.concatenate([self._dense, vectors.astype(np.float32)])
+        elif self._centroids is not None and len(self.ids) < self._trained_size * 2:
+            # 크기가 두 배가 되기 전까지는 군집을 다시 학습하지 않고 가까운 군집에만 배정
+            for position, label in enumerate(self._labels(vectors)):
+                self._lists[label] = np.append(self._lists[label], offset + position)
+        else:
+            self._rebuild()
+
+    def remove(self, ids: np.ndarray):
+        """임베딩 삭제 (휴지통으로 옮긴 일기, 군집 중심은 그대로 두고 위치만 고침)"""
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        if keep.all():
+            return
+        self.ids = self.ids[keep]
+        self.vectors = self.vectors[keep]
+        if self._dense is not None:
+            self._dense = self._dense[keep]
+        elif self._centroids is not None:
+            new_positions = np.cumsum(keep) - 1
+            self._lists = [new_positions[members[keep[members]]] for members in self._lists]
+
+    def _rebuild(self):
+        self._dense = None
+        self._centroids = None
+        self._lists = []
+        if len(self.ids) < IVF_MIN_ENTRIES:
+            self._dense = self.vectors.astype(np.float32)
+            return
+        self._train_centroids()
+        self._lists = self._assign(self.vectors)
+
+    def _train_centroids(self):
+        """표본으로 k-means 군집 중심 학습 (군집 수 ≈ √N)"""
+        count = len(self.ids)
+        cluster_count = max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(count, min(count, KMEANS_SAMPLE_SIZE), replace=False)].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), cluster_count, replace=False)]
+
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(cluster_count):
+                members = sample[labels == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-6)
+
+        self._centroids = centroids
+        self._trained_size = count
+
+    def _labels(self, vectors: np.ndarray) -> np.ndarray:
+        """각 임베딩이 속할 군집 번호"""
+        labels = np.empty(len(vectors), dtype=np.int64)
+        # 메모리를 아끼려고 나눠서 float32로 변환
+        for start in range(0, len(vectors), 8192):
+            chunk = vectors[start:start + 8192].astype(np.float32)
+            labels[start:start + 8192] = np.argmax(chunk @ self._centroids.T, axis=1)
+        return labels
+
+    def _assign(self, vectors: np.ndarray) -> List[np.ndarray]:
+        labels = self._labels(vectors)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(len(self._centroids) + 1))
+        return [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def search(self, query: np.ndarray, top_k: int = 5, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(일기 id, 유사도) 목록, 유사도 높은 순"""
+        if not len(self.ids):
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.vectors.shape[1]:
+            return []
+
+        if self._dense is not None:
+            candidates = np.arange(len(self.ids))
+            scores = self._dense @ query
+        else:
+            probe_count = max(IVF_NPROBE, int(np.ceil(len(self._centroids) * IVF_PROBE_RATIO)))
+            nearest_clusters = np.argsort(-(self._centroids @ query))[:probe_count]
+            candidates = np.concatenate([self._lists[cluster] for cluster in nearest_clusters])
+            # 가까운 군집이 모두 비어 있으면 (삭제 등) 후보 없음
+            if not len(candidates):
+                return []
+            scores = self.vectors[candidates].astype(np.float32) @ query
+
+        if exclude_id is not None:
+            scores = np.where(self.ids[candidates] == exclude_id, -np.inf, scores)
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self.ids[candidates[i]]), float(scores[i])) for i in best if np.isfinite(scores[i])]
+
+    def vector_of(self, diary_id: int) -> Optional[np.ndarray]:
+        positions = np.nonzero(self.ids == diary_id)[0]
+        if not len(positions):
+            return None
+        return self.vectors[positions[0]].astype(np.float32)
+
+class SemanticDiarySearch:
+    """일기 임베딩을 DB와 메모리 인덱스에 함께 관리하는 의미 검색 (프로세스 전체에서 공유)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.index = VectorIndex()
+        self.model_id = None
+
+    def _ensure_loaded(self, ai_model):
+        """모델이 바뀌었거나 처음이면 DB에 저장된 임베딩으로 인덱스 구성"""
+        model_id = ai_model.embedding_model_id()
+        with self._lock:
+            if self.model_id == model_id:
+                return
+            ids, vectors = load_diary_embeddings_from_db(model_id)
+            self.index = VectorIndex()
+            if ids is not None:
+                self.index.build(ids, vectors)
+            self.model_id = model_id
+
+    def is_indexing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def index_pending(self, ai_model) -> int:
+        """임베딩이 없는 일기(새로 저장/복원된 일기 포함)를 배치로 계산해서 저장"""
+        self._ensure_loaded(ai_model)
+        indexed = 0
+        while True:
+            pending = load_diaries_without_embedding_from_db(self.model_id, limit=BACKFILL_BATCH)
+            if not pending:
+                return indexed
+
+            texts = [diary_embedding_text(summary, keywords) for _, summary, keywords in pending]
+            vectors = ai_model.embed_texts(texts)
+            if vectors is None:
+                return indexed
+
+            diary_ids = [diary_id for diary_id, _, _ in pending]
+            if not save_diary_embeddings_to_db(self.model_id, diary_ids, vectors):
+                return indexed
+            with self._lock:
+                self.index.add(np.array(diary_ids), vectors)
+            indexed += len(diary_ids)
+
+    def index_pending_in_background(self, ai_model) -> bool:
+        """일기 저장 직후 등 화면을 막지 않고 임베딩 계산 (이미 진행 중이면 무시)"""
+        if self.is_indexing():
+            return False
+        self._thread = threading.Thread(
+            target=self._run_indexing,
+            args=(ai_model,),
+            name="mindtalk-diary-embedding",
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _run_indexing(self, ai_model):
+        try:
+            indexed = self.index_pending(ai_model)
+            if indexed:
+                print(f"🧠 일기 임베딩 {indexed}개 계산 완료")
+        except Exception as e:
+            print(f"일기 임베딩 계산 오류: {e}")
+
+    def remove(self, diary_ids: List[int]):
+        """휴지통으로 옮긴 일기를 인덱스에서 뺌 (DB의 임베딩은 delete_diary_from_db가 지움)"""
+        with self._lock:
+            self.index.remove(np.array(diary_ids, dtype=np.int64))
+
+    def search(self, ai_model, query: str, top_k: int = 5) -> List[Dict]:
+        """검색어와 뜻이 비슷한 일기 [{'diary_id', 'score'}]"""
+        try:
+            self._ensure_loaded(ai_model)
+            vectors = ai_model.embed_texts([query])
+            if vectors is None:
+                return []
+            with self._lock:
+                results = self.index.search(vectors[0], top_k)
+            return [{"diary_id": diary_id, "score": score} for diary_id, score in results]
+        except Exception as e:
+            print(f"의미 검색 오류: {e}")
+            return []
+
+    def similar_to(self, ai_model, diary_id: int, top_k: int = 5) -> List[Dict]:
+        """이 일기와 비슷한 날 (자기 자신은 제외)"""
+        try:
+            self._ensure_loaded(ai_model)
+            with self._lock:
+                vector = self.index.vector_of(diary_id)
+                if vector is None:
+                    return []
+                results = self.index.search(vector, top_k, exclude_id=diary_id)
+            return [{"diary_id": found_id, "score": score} for found_id, score in results]
+        except Exception as e:
+            print(f"비슷한 일기 검색 오류: {e}")
+            return []
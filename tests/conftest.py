@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 모듈이 저장소 최상위에 있으므로 테스트에서 바로 import할 수 있게 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 모델 없이 돌도록 가짜 백엔드 사용 (ai_models가 import될 때 읽음)
+os.environ.setdefault("MINDTALK_INFERENCE_BACKEND", "fake")
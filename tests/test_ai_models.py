@@ -0,0 +1,179 @@
+import pytest
+
+from ai_models import DEFAULT_MOOD_KEYWORDS, STOP_POLICIES, AIModelManager, PromptBuilder
+from inference_backends import find_stop_reason
+
+@pytest.fixture(scope="module")
+def manager():
+    return AIModelManager(backend_name="fake")
+
+# ✅ 가짜 백엔드로 생성
+def test_generate_with_usage_counts_tokens(manager):
+    result = manager.generate_with_usage("사용자: 수학 시험 봤어\n루나:", max_new_tokens=50)
+
+    assert result["success"]
+    assert "수학 시험 봤어" in result["text"]
+    usage = result["usage"]
+    assert usage["prompt_tokens"] == len("사용자: 수학 시험 봤어\n루나:")
+    assert 0 < usage["completion_tokens"] <= 50
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+def test_get_ai_response_keeps_prompt_within_budget(manager):
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}번째 메시지 " + "가" * 200}
+        for i in range(20)
+    ]
+    context = [{"date": "2024-01-01", "summary": "지난번 이야기 " + "나" * 300, "action_items": []}]
+
+    result = manager.get_ai_response("오늘은 어땠냐면", history, context, "보통", "루나", "앞에서 시험 이야기를 했어요")
+
+    assert result["success"]
+    stats = result["prompt_stats"]
+    used = stats["system_tokens"] + stats["current_tokens"] + stats["history_tokens"] + stats["context_tokens"]
+    assert used <= stats["budget"]
+    assert stats["history_dropped"] > 0
+    # 가장 최근 메시지는 남음
+    assert stats["history_used"] > 0
+
+# ✅ 프롬프트 토큰 예산
+def _builder(budget):
+    def truncate(text, max_tokens, keep="start"):
+        if len(text) <= max_tokens:
+            return text
+        return "…" + text[-(max_tokens - 1):] if keep == "end" else text[:max_tokens - 1] + "…"
+    return PromptBuilder(len, truncate, budget)
+
+def test_prompt_builder_drops_oldest_history_first():
+    history = [f"사용자: 메시지{i} " + "가" * 40 for i in range(10)]
+    built = _builder(300).build(lambda context_text: "시스템" + context_text, [], history, "사용자: 지금\n루나:")
+
+    stats = built["stats"]
+    assert stats["history_dropped"] > 0
+    assert len(built["prompt"]) <= 300
+    assert "메시지9" in built["prompt"]
+    assert "메시지0" not in built["prompt"]
+    assert built["prompt"].endswith("사용자: 지금\n루나:")
+
+def test_prompt_builder_condenses_the_message_that_does_not_fit():
+    history = ["사용자: 오래된 " + "가" * 200, "사용자: 최근 " + "나" * 20]
+    built = _builder(150).build(lambda context_text: "시스템", [], history, "사용자: 지금\n루나:")
+
+    assert built["stats"]["condensed"] == 1
+    assert "…" in built["prompt"]
+    assert len(built["prompt"]) <= 150
+
+def test_prompt_builder_limits_context_share():
+    context = [f"참고{i} " + "다" * 50 for i in range(5)]
+    history = [f"사용자: 메시지{i} " + "가" * 30 for i in range(10)]
+    built = _builder(400).build(lambda context_text: "시스템" + context_text, context, history, "사용자: 지금\n루나:")
+
+    stats = built["stats"]
+    available = 400 - PromptBuilder.SAFETY_MARGIN - len("시스템") - len("사용자: 지금\n루나:")
+    assert stats["context_tokens"] <= int(available * PromptBuilder.CONTEXT_SHARE) + len("이전 대화 참고:") + 4
+    assert stats["history_used"] > 0
+    assert len(built["prompt"]) <= 400
+
+def test_prompt_builder_keeps_the_end_of_a_long_current_message():
+    current = "사용자: " + "가" * 500 + " 질문은 이거예요\n루나:"
+    built = _builder(200).build(lambda context_text: "시스템", [], ["사용자: 예전"], current)
+
+    assert built["prompt"].endswith("질문은 이거예요\n루나:")
+    assert built["stats"]["history_used"] == 0
+    assert len(built["prompt"]) <= 200
+
+# ✅ 요약 응답 파싱과 키워드 채우기
+def test_parse_summary_response_reads_each_section(manager):
+    text = """**요약**: 시험을 망쳐서 속상했어요.
+감정 키워드: #속상함, #걱정, #속상함
+#피곤
+액션아이템:
+1. 따뜻한 물을 마셔요
+- 일찍 자요
+• 친구에게 이야기해봐요"""
+
+    parsed = manager._parse_summary_response(text)
+
+    assert parsed["summary"] == "시험을 망쳐서 속상했어요."
+    assert parsed["keywords"] == ["#속상함", "#걱정", "#피곤"]
+    assert parsed["action_items"] == ["따뜻한 물을 마셔요", "일찍 자요", "친구에게 이야기해봐요"]
+
+def test_parse_summary_response_summary_on_next_line_and_loose_hashtags(manager):
+    parsed = manager._parse_summary_response("요약:\n산책을 했어요\n오늘은 #평온 #기쁨 한 날")
+
+    assert parsed["summary"] == "산책을 했어요"
+    assert parsed["keywords"] == ["#평온", "#기쁨"]
+    assert parsed["action_items"] == []
+
+def test_parse_summary_response_handles_empty_text(manager):
+    assert manager._parse_summary_response("") == {"summary": "", "keywords": [], "action_items": []}
+
+def test_fill_keywords_pads_with_mood_defaults(manager):
+    keywords = manager._fill_keywords(["#우울"], "나쁨")
+
+    assert len(keywords) == 5
+    assert keywords[0] == "#우울"
+    assert len(set(keywords)) == 5
+    assert set(keywords[1:]) <= set(DEFAULT_MOOD_KEYWORDS["나쁨"])
+
+def test_fill_keywords_keeps_only_five(manager):
+    keywords = [f"#키워드{i}" for i in range(7)]
+    assert manager._fill_keywords(keywords, "좋음") == keywords[:5]
+
+def test_generate_conversation_summary_on_fake_backend(manager):
+    messages = [{"role": "user", "content": "오늘 시험을 봤어"}, {"role": "assistant", "content": "어땠어요?"}]
+    result = manager.generate_conversation_summary(messages, "좋음")
+
+    assert result["success"]
+    assert result["summary"] == "오늘 있었던 일을 함께 이야기했어요."
+    assert len(result["keywords"]) == 5
+    assert len(result["action_items"]) == 3
+
+def test_generate_conversation_summary_without_user_messages(manager):
+    result = manager.generate_conversation_summary([{"role": "assistant", "content": "안녕"}], "보통")
+
+    assert not result["success"]
+    assert result["keywords"] == DEFAULT_MOOD_KEYWORDS["보통"]
+
+# ✅ 조기 종료 정책
+@pytest.mark.parametrize("call_type", sorted(STOP_POLICIES))
+def test_every_policy_stops_at_the_next_speaker(call_type):
+    policy = STOP_POLICIES[call_type]
+    assert find_stop_reason("잘 들었어요\n사용자: 그리고", policy) == "stop_sequence"
+    assert find_stop_reason("잘 들었어요", policy) is None
+    assert find_stop_reason("", policy) is None
+
+def test_chat_policy_stops_after_three_distinct_sentences():
+    policy = STOP_POLICIES["chat"]
+    assert find_stop_reason("좋아요. 좋아요. 그랬군요. 어땠", policy) is None
+    assert find_stop_reason("좋아요. 그랬군요. 어땠어요. ", policy) == "max_sentences"
+
+def test_summary_policy_stops_after_three_action_items():
+    policy = STOP_POLICIES["summary"]
+    text = "요약: 좋았어요\n감정키워드: #기쁨\n액션아이템:\n- 하나\n- 둘\n"
+    assert find_stop_reason(text, policy) is None
+    # 셋째 줄이 끝나야(줄바꿈) 멈춤
+    assert find_stop_reason(text + "- 셋", policy) is None
+    assert find_stop_reason(text + "- 셋\n", policy) == "max_list_items"
+
+def test_memory_policy_stops_at_blank_line():
+    policy = STOP_POLICIES["memory"]
+    assert find_stop_reason("첫 문단이에요.\n둘째 줄", policy) is None
+    assert find_stop_reason("첫 문단이에요.\n\n다음", policy) == "stop_sequence"
+
+def test_no_policy_never_stops():
+    assert find_stop_reason("사용자: 안녕", None) is None
+
+# ✅ 누적 대화 요약
+def test_update_conversation_memory_summarizes_new_messages(manager):
+    result = manager.update_conversation_memory(
+        "앞에서 시험 이야기를 했어요",
+        [{"role": "user", "content": "친구랑 화해했어"}, {"role": "assistant", "content": "다행이에요"}]
+    )
+
+    assert result["success"]
+    assert result["summary"] == "사용자는 오늘 있었던 일과 감정을 이야기했어요."
+    assert result["usage"]["completion_tokens"] > 0
+
+def test_update_conversation_memory_without_messages_keeps_previous(manager):
+    result = manager.update_conversation_memory("이전 요약", [{"role": "user", "content": ""}])
+    assert result == {"summary": "이전 요약", "success": False}
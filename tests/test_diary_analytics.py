@@ -0,0 +1,77 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from diary_analytics import DiaryColumns, _mood_scores, _parse_hours, compute_mood_analytics
+from diary_record import DiaryRecord
+
+KEYWORDS = ["#기쁨", "#안도", "#걱정", "#설렘", "#피곤", "#속상함", "#뿌듯함", "#평온"]
+
+def _diaries(count, first_id=1, seed=0):
+    rng = random.Random(seed)
+    return [
+        DiaryRecord(
+            first_id + i,
+            (date(2024, 1, 1) + timedelta(days=i // 2)).isoformat(),
+            f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            rng.choice(["좋음", "보통", "나쁨"]),
+            "",
+            rng.sample(KEYWORDS, rng.randrange(0, 4))
+        )
+        for i in range(count)
+    ]
+
+def _restored(entry, new_id):
+    # 휴지통에서 복원하면 같은 내용이 새 id로 저장됨
+    return DiaryRecord(new_id, entry.date, entry.time, entry.mood, entry.summary, entry.keywords)
+
+def _assert_same_analytics(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(value, actual[key])
+        else:
+            assert value == actual[key], key
+
+def test_incremental_update_matches_fresh_rebuild():
+    entries = _diaries(400)
+    columns = DiaryColumns()
+    compute_mood_analytics(entries, columns)
+
+    # 추가
+    entries = entries + _diaries(50, first_id=1000, seed=1)
+    _assert_same_analytics(compute_mood_analytics(entries), compute_mood_analytics(entries, columns))
+
+    # 휴지통으로 이동
+    trashed = entries[10:60]
+    entries = entries[:10] + entries[60:]
+    _assert_same_analytics(compute_mood_analytics(entries), compute_mood_analytics(entries, columns))
+
+    # 복원 (새 id)
+    entries = entries + [_restored(entry, 2000 + i) for i, entry in enumerate(trashed)]
+    _assert_same_analytics(compute_mood_analytics(entries), compute_mood_analytics(entries, columns))
+    assert len(columns.ids) == len(entries)
+
+def test_odd_time_does_not_shift_later_rows():
+    assert list(_parse_hours(["09:00", "9:00", "10:000", "23:59", "24:00", "ab:cd", "12:30"])) == [9, -1, 10, 23, -1, -1, 12]
+
+def test_unknown_mood_does_not_shift_later_rows():
+    scores = _mood_scores(["좋음", "나쁨!", "보통", "나쁨", "?"])
+    assert np.array_equal(scores, [1.0, np.nan, 0.0, -1.0, np.nan], equal_nan=True)
+
+def test_duplicate_keywords_count_once_per_diary():
+    entries = [
+        DiaryRecord(i + 1, f"2024-0{month}-01", "12:00", "좋음", "", keywords)
+        for i, (month, keywords) in enumerate([
+            (1, ["#기쁨", "#설렘", "#기쁨"]),
+            (2, ["#기쁨", "#설렘"]),
+            (3, ["#기쁨", "#기쁨"]),
+        ])
+    ]
+    analytics = compute_mood_analytics(entries)
+
+    assert analytics["keyword_pairs"] == [("#기쁨", "#설렘", 2)]
+    # 매달 모든 일기에 #기쁨이 있으므로 비율은 100%로 그대로
+    assert all(keyword != "#기쁨" for keyword, _ in analytics["rising_keywords"] + analytics["falling_keywords"])
@@ -0,0 +1,37 @@
+import threading
+
+from diary_retrieval import RetrievalCache
+
+def test_retrieval_cache_evicts_least_recently_used():
+    cache = RetrievalCache(max_size=2)
+    cache.put("a", [{"summary": "a"}])
+    cache.put("b", [{"summary": "b"}])
+    assert cache.get("a") == [{"summary": "a"}]
+
+    cache.put("c", [])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") == []
+    assert len(cache) == 2
+
+def test_retrieval_cache_is_shared_safely_between_threads():
+    cache = RetrievalCache(max_size=8)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(2000):
+                key = (offset + i) % 20
+                if cache.get(key) is None:
+                    cache.put(key, [key])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(cache) == 8
@@ -0,0 +1,44 @@
+from ai_models import STOP_POLICIES
+from inference_backends import _PolicyStoppingCriteria, find_stop_reason
+
+class _ByteTokenizer:
+    """UTF-8 바이트 하나가 토큰 하나인 토크나이저 (한글 한 글자가 토큰 3개로 나뉨)"""
+
+    def __init__(self):
+        self.decoded_tokens = 0
+
+    def encode(self, text):
+        return list(text.encode("utf-8"))
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        self.decoded_tokens += len(token_ids)
+        return bytes(token_ids).decode("utf-8", errors="replace")
+
+def _feed(criteria, token_ids, prompt_length):
+    for end in range(prompt_length + 1, len(token_ids) + 1):
+        if criteria._append_new_text(token_ids[:end]):
+            criteria.reason = find_stop_reason(criteria.text, criteria.policy)
+
+def test_policy_stopping_criteria_decodes_incrementally():
+    tokenizer = _ByteTokenizer()
+    prompt = tokenizer.encode("사용자: 안녕\n루나:")
+    completion = "반가워요. 오늘 하루는 어땠어요? " * 20
+    token_ids = prompt + tokenizer.encode(completion)
+    criteria = _PolicyStoppingCriteria(tokenizer, len(prompt), None)
+
+    _feed(criteria, token_ids, len(prompt))
+
+    assert criteria.text == completion
+    # 매 단계 전체를 다시 디코딩하면 토큰 수의 제곱에 비례함
+    assert tokenizer.decoded_tokens < 10 * len(token_ids)
+
+def test_policy_stopping_criteria_finds_stop_reason_on_running_text():
+    tokenizer = _ByteTokenizer()
+    prompt = tokenizer.encode("사용자: 안녕\n루나:")
+    token_ids = prompt + tokenizer.encode("좋아요. 그랬군요. 어땠어요. 그리고")
+    criteria = _PolicyStoppingCriteria(tokenizer, len(prompt), STOP_POLICIES["chat"])
+
+    _feed(criteria, token_ids, len(prompt))
+
+    assert criteria.reason == "max_sentences"
+    assert criteria.text.startswith("좋아요. 그랬군요. 어땠어요.")
@@ -0,0 +1,57 @@
+import pytest
+
+from safety_scanner import normalize_text, scan_text
+
+# 위험 키워드가 단어 사이에 걸쳐 있거나 일상 단어에 들어 있는 문장
+CLEAN_TEXTS = [
+    "남자 해외여행 가고 싶다",
+    "여자 해변에서 놀았어",
+    "모자 해서 나갔어",
+    "저 자리 자 해도 돼?",
+    "오늘 칼국수 먹었어",
+    "총 3개 샀어",
+    "손목이 아파요",
+    "손목시계 샀어",
+    "극단적인 다이어트 중",
+    "오늘 학교에서 친구랑 떡볶이 먹었어요",
+]
+
+FLAGGED_TEXTS = [
+    ("그냥 죽고 싶어요", {"self_harm"}),
+    ("죽고싶어어어어", {"self_harm"}),
+    ("죽 고 싶 다", {"self_harm"}),
+    ("ㅈㅏㅅㅏㄹ 생각이 나요", {"self_harm"}),
+    ("ㅈ ㅏ ㅎ ㅐ", {"self_harm"}),
+    ("자.해.하고 싶은 날", {"self_harm"}),
+    ("자​해", {"self_harm"}),
+    ("요즘 살기 싫어", {"self_harm"}),
+    ("손목을 긋고 싶어", {"self_harm"}),
+    ("극단적인 선택을 할까 봐 무서워", {"self_harm"}),
+    ("걔를 때리고 싶다", {"violence"}),
+    ("칼로 찌르고 싶어", {"violence"}),
+    ("너무 화나서 죽이고 싶어, 나도 죽고 싶고", {"self_harm", "violence"}),
+]
+
+@pytest.mark.parametrize("text", CLEAN_TEXTS)
+def test_clean_text_is_not_flagged(text):
+    result = scan_text(text)
+    assert result["success"]
+    assert not result["flagged"], result["matches"]
+
+@pytest.mark.parametrize("text, categories", FLAGGED_TEXTS)
+def test_flagged_text(text, categories):
+    result = scan_text(text)
+    assert result["flagged"]
+    assert set(result["categories"]) == categories
+
+def test_match_points_back_to_original_text():
+    result = scan_text("그냥 죽고   싶어요")
+    assert "죽고   싶어" in [match["text"] for match in result["matches"]]
+
+def test_normalize_keeps_one_space_between_words():
+    assert normalize_text("남자   해외여행")[0] == "남자 해외여행"
+    assert normalize_text("죽 고 싶 다")[0] == "죽고싶다"
+    assert normalize_text("ㅈㅏ ㅎㅐ")[0] == "자해"
+
+def test_empty_text_is_an_error():
+    assert not scan_text("")["success"]